@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+FileQueue scaling
+
+    python benchmarks/file_queue.py
+    python benchmarks/file_queue.py --sizes 25000 50000 100000 --remove 10000
+
+Adds N paths (with a share of duplicate spellings) to a FileQueue, then removes a random selection of rows in one
+batch, and reports time per item. Linear behaviour shows up as a flat per-item time across sizes. The same workload
+on the previous implementation (linear contains, one reindex per removed row) runs at smaller sizes for comparison.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.file_models import FileQueue, VideoFile, canonical_path     # noqa: E402
+
+
+class ScanningQueue:
+    """The queue as it was before the canonical index: the quadratic baseline"""
+
+    def __init__(self):
+        self.files = []
+
+    def contains(self, filepath):
+        key = canonical_path(filepath)
+        return any(f.canonical == key for f in self.files)
+
+    def add_files(self, filepaths):
+        for filepath in filepaths:
+            if not self.contains(filepath):
+                self.files.append(VideoFile(filepath, len(self.files)))
+
+    def remove_indices(self, indices):
+        for index in sorted(indices, reverse=True):
+            del self.files[index]
+            for i, file in enumerate(self.files):
+                file.index = i
+
+
+def make_paths(count: int):
+    paths = [os.path.join(os.sep, 'archive', f"show{i // 500:04d}", f"episode{i:06d}.mkv") for i in range(count)]
+    # Every 20th entry is the same file spelled differently, as a re-dropped folder would produce
+    duplicates = [path.replace(os.sep + 'archive', os.sep + 'archive' + os.sep + '.') for path in paths[::20]]
+    mixed = paths + duplicates
+    random.shuffle(mixed)
+    return mixed
+
+
+def run(queue, paths, remove: int):
+    start = time.perf_counter()
+    queue.add_files(paths)
+    added = time.perf_counter() - start
+    indices = random.sample(range(len(queue.files)), min(remove, len(queue.files)))
+    start = time.perf_counter()
+    queue.remove_indices(indices)
+    removed = time.perf_counter() - start
+    return added, removed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[25000, 50000, 100000])
+    parser.add_argument('--remove', type=int, default=10000, help="rows removed in one batch (default 10000)")
+    parser.add_argument('--baseline-sizes', type=int, nargs='*', default=[2000, 4000, 8000])
+    args = parser.parse_args()
+
+    print(f"{'queue':>9} {'paths':>8} {'add s':>8} {'us/path':>8} {'removed':>8} {'remove s':>9} {'us/row':>8}")
+    for label, factory, sizes in (('FileQueue', FileQueue, args.sizes),
+                                  ('scanning', ScanningQueue, args.baseline_sizes)):
+        for size in sizes:
+            random.seed(size)
+            paths = make_paths(size)
+            remove = min(args.remove, size // 10) if label == 'scanning' else args.remove
+            added, removed = run(factory(), paths, remove)
+            print(f"{label:>9} {len(paths):>8} {added:>8.3f} {added / len(paths) * 1e6:>8.1f} "
+                  f"{remove:>8} {removed:>9.3f} {removed / max(1, remove) * 1e6:>8.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
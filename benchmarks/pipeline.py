@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Pipeline overlap: does the next file's pre-transcode, and the last file's VMAF pass, run during an encode? (POSIX)
+
+    python benchmarks/pipeline.py
+    python benchmarks/pipeline.py --files 6 --seconds 2 --threads 16 --workers 2
+
+Runs the queue engine over --files sources with a raw pre-transcode and VMAF turned on, against stand-in ffmpeg
+and ffprobe scripts that print -progress lines for --seconds per step and log when each step starts and ends.
+Reports, for every encode, whether the pre-transcode of the file after it and the VMAF pass of the file before
+it ran while it did, and the run's wall time next to the time the same steps take one after the other. With the
+stages overlapping, three files take about five steps' time rather than nine.
+"""
+import argparse
+import os
+import stat
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DEFAULT_SETTINGS                         # noqa: E402
+from models.file_models import FileQueue                    # noqa: E402
+from modules.queue_runner import QueueRunner, RunQueue      # noqa: E402
+from utils import encode_manifest, probe_cache              # noqa: E402
+
+FFMPEG = ("#!{python}\n"
+          "import os, sys, time\n"
+          "args = sys.argv[1:]\n"
+          "source = os.path.basename(args[args.index('-i') + 1])\n"
+          "output = args[-2] if args[-1] == '-y' else args[-1]\n"
+          "step = 'vmaf' if 'libvmaf' in ' '.join(args) else 'transcode' if '.trans.' in output else 'encode'\n"
+          "log = open({log!r}, 'a')\n"
+          "log.write(f'{{time.time()}} start {{step}} {{source}}\\n'); log.flush()\n"
+          "for n in range(int({seconds} / 0.1)):\n"
+          "    print(f'frame={{n}}\\nout_time_us={{n * 100000}}\\ntotal_size={{n * 100}}\\nprogress=continue', "
+          "flush=True)\n"
+          "    time.sleep(0.1)\n"
+          "print('progress=end', flush=True)\n"
+          "if step == 'vmaf':\n"
+          "    print('VMAF score: 95.0', flush=True)\n"
+          "else:\n"
+          "    open(output, 'wb').write(b'x' * 2048)\n"
+          "log.write(f'{{time.time()}} end {{step}} {{source}}\\n')\n")
+
+FFPROBE = ("#!{python}\n"
+           "import json\n"
+           "print(json.dumps({{'format': {{'duration': '{seconds}', 'bit_rate': '1000000'}}, 'streams': [\n"
+           "    {{'codec_type': 'video', 'codec_name': 'h264', 'width': 640, 'height': 480,\n"
+           "     'avg_frame_rate': '25/1', 'pix_fmt': 'yuv420p'}}, {{'codec_type': 'audio', 'codec_name': 'aac'}}]}}))\n")
+
+
+def write_tool(folder: str, name: str, source: str):
+    path = os.path.join(folder, name)
+    with open(path, 'w') as handle:
+        handle.write(source)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+
+
+def file_number(source: str) -> int:
+    """'03.avi', '03.trans.avi', '03_libx265_...mkv' -> 3"""
+    return int(source.split('.')[0].split('_')[0])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=3)
+    parser.add_argument('--seconds', type=float, default=1.0, help="length of every step (default 1)")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp:
+        tools, media, log = os.path.join(temp, 'bin'), os.path.join(temp, 'media'), os.path.join(temp, 'steps.log')
+        os.mkdir(tools)
+        os.mkdir(media)
+        write_tool(tools, 'ffmpeg', FFMPEG.format(python=sys.executable, log=log, seconds=args.seconds))
+        write_tool(tools, 'ffprobe', FFPROBE.format(python=sys.executable, seconds=args.seconds))
+        os.environ['PATH'] = tools + os.pathsep + os.environ.get('PATH', '')
+        # keep the run's cache and manifest out of the application directory
+        probe_cache._cache = probe_cache.ProbeCache(os.path.join(temp, 'probe_cache.sqlite3'))
+        encode_manifest._manifest = encode_manifest.EncodeManifest(os.path.join(temp, 'manifest.sqlite3'))
+
+        paths = []
+        for n in range(1, args.files + 1):
+            paths.append(os.path.join(media, f"{n:02d}.avi"))
+            with open(paths[-1], 'wb') as handle:
+                handle.write(os.urandom(4096))
+        files = FileQueue()
+        files.add_files(paths)
+        settings = dict(DEFAULT_SETTINGS, threads=args.threads, workers=args.workers, transcode_video=True,
+                        calculate_vmaf=True)
+        runner = QueueRunner(RunQueue(files.get_all()), settings)
+        start = time.time()
+        runner.run()
+        wall = time.time() - start
+
+        steps = {}
+        with open(log) as handle:
+            for line in handle:
+                at, edge, step, source = line.split()
+                steps.setdefault((step, file_number(source)), {})[edge] = float(at)
+
+    def overlaps(a, b) -> bool:
+        return (a in steps and b in steps
+                and steps[a]['start'] < steps[b]['end'] and steps[b]['start'] < steps[a]['end'])
+
+    print(f"{args.files} files, {args.workers} worker(s), {args.threads} threads, {args.seconds:g} s per step")
+    for n in range(1, args.files + 1):
+        parts = []
+        if n < args.files:
+            during = overlaps(('encode', n), ('transcode', n + 1))
+            parts.append(f"transcode {n + 1} {'during' if during else 'not during'}")
+        if n > 1:
+            during = overlaps(('encode', n), ('vmaf', n - 1))
+            parts.append(f"VMAF {n - 1} {'during' if during else 'not during'}")
+        print(f"  encode {n}: " + (", ".join(parts) or "alone"))
+    serial = sum(step['end'] - step['start'] for step in steps.values() if 'end' in step)
+    print(f"wall {wall:.2f} s, the same {len(steps)} steps one after the other {serial:.2f} s, "
+          f"{runner.success_count}/{args.files} encoded")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
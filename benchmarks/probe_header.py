@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Header reader vs ffprobe
+
+    python benchmarks/probe_header.py                  # synthetic MKV + MP4 library in a temp folder
+    python benchmarks/probe_header.py /media/library   # real files (recursive)
+    python benchmarks/probe_header.py --count 20000 --ffprobe-sample 100
+
+Times utils.media_header.read_header over every file and ffprobe (the path probe_duration takes on a cache miss)
+over a sample, then projects both to the whole set. With real files and ffprobe available it also checks that the
+two agree on duration, dimensions and codec.
+"""
+import argparse
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ffmpeg_utils import find_ffprobe, run_ffprobe_media       # noqa: E402
+from utils.file_utils import walk_video_files                         # noqa: E402
+from utils.media_header import HEADER_EXTENSIONS, read_header         # noqa: E402
+
+
+# ---- synthetic files ----------------------------------------------------
+def _ebml(element_id: int, payload: bytes) -> bytes:
+    size = len(payload)
+    return (element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+            + (size | (1 << 56)).to_bytes(8, 'big') + payload)
+
+
+def _ebml_uint(element_id: int, value: int) -> bytes:
+    return _ebml(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big'))
+
+
+def make_mkv(path: str, seconds: float, width: int, height: int):
+    info = _ebml(0x1549A966, _ebml_uint(0x2AD7B1, 1_000_000) + _ebml(0x4489, struct.pack('>d', seconds * 1000)))
+    video = _ebml(0xAE, _ebml_uint(0xD7, 1) + _ebml_uint(0x83, 1) + _ebml(0x86, b'V_MPEG4/ISO/AVC')
+                  + _ebml_uint(0x23E383, 41_708_333)
+                  + _ebml(0xE0, _ebml_uint(0xB0, width) + _ebml_uint(0xBA, height) + _ebml_uint(0x9A, 2)))
+    audio = _ebml(0xAE, _ebml_uint(0xD7, 2) + _ebml_uint(0x83, 2) + _ebml(0x86, b'A_AAC')
+                  + _ebml(0xE1, _ebml_uint(0x9F, 2) + _ebml(0xB5, struct.pack('>d', 48000.0))))
+    segment = _ebml(0x18538067, info + _ebml(0x1654AE6B, video + audio) + _ebml(0x1F43B675, bytes(4096)))
+    with open(path, 'wb') as f:
+        f.write(_ebml(0x1A45DFA3, _ebml(0x4282, b'matroska')) + segment)
+
+
+def _box(box_type: str, payload: bytes) -> bytes:
+    return struct.pack('>I', 8 + len(payload)) + box_type.encode('latin-1') + payload
+
+
+def make_mp4(path: str, seconds: float, width: int, height: int):
+    timescale, frames = 24000, int(seconds * 24000 / 1001)
+    mvhd = _box('mvhd', bytes(4) + struct.pack('>IIII', 0, 0, 1000, int(seconds * 1000)) + bytes(80))
+    entry = _box('avc1', bytes(6) + struct.pack('>H', 1) + bytes(16) + struct.pack('>HH', width, height)
+                 + bytes(50) + _box('pasp', struct.pack('>II', 1, 1)))
+    stbl = _box('stbl', _box('stsd', bytes(4) + struct.pack('>I', 1) + entry)
+                + _box('stts', bytes(4) + struct.pack('>III', 1, frames, 1001)))
+    mdia = _box('mdia', _box('mdhd', bytes(4) + struct.pack('>IIII', 0, 0, timescale, frames * 1001) + bytes(4))
+                + _box('hdlr', bytes(8) + b'vide' + bytes(13)) + _box('minf', stbl))
+    trak = _box('trak', _box('tkhd', b'\0\0\0\x03' + bytes(80)) + mdia)
+    with open(path, 'wb') as f:
+        f.write(_box('ftyp', b'isom\0\0\0\x01isomavc1') + _box('moov', mvhd + trak) + _box('mdat', bytes(4096)))
+
+
+def build_library(folder: str, count: int):
+    sizes = [(1920, 1080), (1280, 720), (3840, 2160), (720, 576)]
+    for i in range(count):
+        seconds = random.uniform(60, 7200)
+        width, height = random.choice(sizes)
+        if i % 2:
+            make_mp4(os.path.join(folder, f"clip{i:05d}.mp4"), seconds, width, height)
+        else:
+            make_mkv(os.path.join(folder, f"clip{i:05d}.mkv"), seconds, width, height)
+
+
+# ---- benchmark ----------------------------------------------------------
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('folder', nargs='?', help="folder of real files (default: a synthetic library)")
+    parser.add_argument('--count', type=int, default=2000, help="synthetic files to generate (default 2000)")
+    parser.add_argument('--ffprobe-sample', type=int, default=50, help="files probed with ffprobe (default 50)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp:
+        folder = args.folder
+        if not folder:
+            folder = temp
+            build_library(folder, args.count)
+        files = sorted(walk_video_files(folder))
+        if not files:
+            print("no video files found")
+            return 1
+        handled = [f for f in files if os.path.splitext(f)[1].lower() in HEADER_EXTENSIONS]
+
+        start = time.perf_counter()
+        results = {path: read_header(path) for path in files}
+        header_time = time.perf_counter() - start
+        answered = sum(1 for value in results.values() if value is not None)
+        per_file = header_time / len(files)
+        print(f"files: {len(files)} ({len(handled)} Matroska/MP4)")
+        print(f"header reader: {header_time:.3f} s total, {per_file * 1e6:.0f} us/file, answered {answered}, "
+              f"left to ffprobe {len(files) - answered}; 20k files ~ {per_file * 20000:.1f} s")
+
+        if not find_ffprobe():
+            print("ffprobe: not found, comparison skipped")
+            return 0
+        sample = random.sample(files, min(args.ffprobe_sample, len(files)))
+        start = time.perf_counter()
+        probed = {path: run_ffprobe_media(path) for path in sample}
+        ffprobe_time = time.perf_counter() - start
+        per_probe = ffprobe_time / len(sample)
+        print(f"ffprobe: {per_probe * 1e3:.1f} ms/file over {len(sample)} files; 20k files ~ {per_probe * 20000:.0f} s "
+              f"({per_probe / per_file:.0f}x slower)")
+
+        mismatches = 0
+        for path, reference in probed.items():
+            mine = results.get(path)
+            if not mine or not reference:
+                continue
+            ref_video = next((s for s in reference.get('streams', []) if s.get('codec_type') == 'video'), {})
+            my_video = next(s for s in mine['streams'] if s['codec_type'] == 'video')
+            same = (abs(float(mine['format']['duration']) - float(reference['format'].get('duration') or 0)) < 0.5
+                    and (my_video.get('width'), my_video.get('height'), my_video.get('codec_name'))
+                    == (ref_video.get('width'), ref_video.get('height'), ref_video.get('codec_name')))
+            if not same:
+                mismatches += 1
+                print(f"  differs: {path}")
+        print(f"agreement on the sample: {len(probed) - mismatches}/{len(probed)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Pause and kill latency for a process tree: killpg vs a psutil walk (POSIX)
+
+    python benchmarks/process_groups.py
+    python benchmarks/process_groups.py --depth 6 --fanout 2 --rounds 20
+
+Starts a tree of --depth levels with --fanout children per process (what FFmpeg running an AviSynth+ script, or a
+wrapper script around an encoder, looks like), then times suspending and resuming it both ways: one killpg() on
+the group childproc.popen gives every child, and the psutil walk used where there are no process groups. A
+suspend is checked by reading every member's state from /proc afterwards. Finally a tree is killed each way and
+timed until its last member is gone. Times run from the call to the moment /proc shows every member stopped,
+running again, or gone.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil                                                # noqa: E402
+
+from utils import childproc                                  # noqa: E402
+
+TREE = ("import subprocess, sys, time\n"
+        "depth, fanout = int(sys.argv[1]), int(sys.argv[2])\n"
+        "kids = [subprocess.Popen([sys.executable, '-c', sys.argv[3], str(depth - 1), str(fanout), sys.argv[3]])\n"
+        "        for _ in range(fanout)] if depth > 1 else []\n"
+        "print('up', flush=True)\n"
+        "time.sleep(3600)\n")
+
+
+def start_tree(depth: int, fanout: int):
+    proc = childproc.popen([sys.executable, '-c', TREE, str(depth), str(fanout), TREE], stdout=subprocess.DEVNULL)
+    expected = sum(fanout ** level for level in range(depth))
+    members = []
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        members = [proc.pid] + [p.pid for p in psutil.Process(proc.pid).children(recursive=True)]
+        # everyone forked and asleep in time.sleep(), not still loading the interpreter
+        if len(members) >= expected and all(state == 'S' for state in states(members)):
+            break
+        time.sleep(0.05)
+    return proc, members
+
+
+def states(pids):
+    """One-letter /proc state per member; 'X' once it is gone (or a zombie)"""
+    result = []
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                state = f.read().rsplit(')', 1)[1].split()[0]
+        except OSError:
+            state = 'X'
+        result.append('X' if state == 'Z' else state)
+    return result
+
+
+def settle(action, pids, done, timeout: float = 10.0) -> float:
+    """Seconds from calling action() until done(states) holds (inf if it never does)"""
+    start = time.perf_counter()
+    action()
+    while not done(states(pids)):
+        if time.perf_counter() - start > timeout:
+            return float('inf')
+        time.sleep(0.0005)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    if os.name != 'posix':
+        print("process groups are POSIX only; Windows always uses the psutil walk")
+        return 0
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--depth', type=int, default=5)
+    parser.add_argument('--fanout', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    proc, members = start_tree(args.depth, args.fanout)
+    handle = psutil.Process(proc.pid)
+    print(f"tree: depth {args.depth}, fanout {args.fanout}, {len(members)} processes")
+    stopped = lambda st: all(s == 'T' for s in st)          # noqa: E731
+    running = lambda st: all(s != 'T' for s in st)          # noqa: E731
+    for name, suspend, resume in (
+            ("killpg", lambda: os.killpg(proc.pid, signal.SIGSTOP), lambda: os.killpg(proc.pid, signal.SIGCONT)),
+            ("psutil walk", lambda: childproc._signal_tree(proc, True, handle),
+             lambda: childproc._signal_tree(proc, False, handle))):
+        paused, resumed = [], []
+        for _ in range(args.rounds):
+            paused.append(settle(suspend, members, stopped))
+            resumed.append(settle(resume, members, running))
+        print(f"{name:12s} pause {sum(paused) / args.rounds * 1e3:7.2f} ms   "
+              f"resume {sum(resumed) / args.rounds * 1e3:7.2f} ms  (until every member is stopped / running)")
+    childproc.kill(proc)
+
+    gone = lambda st: all(s == 'X' for s in st)             # noqa: E731
+    for name in ("killpg", "psutil walk"):
+        proc, members = start_tree(args.depth, args.fanout)
+        if name != "killpg":
+            with childproc._lock:
+                childproc._grouped.discard(proc)       # force the fallback path
+        elapsed = settle(lambda: childproc.kill(proc), members, gone)
+        left = sum(1 for s in states(members) if s != 'X')
+        if left:
+            os.killpg(proc.pid, signal.SIGKILL)
+        print(f"{name:12s} kill until the last member is gone: {elapsed * 1e3:7.2f} ms"
+              + (f" ({left} left running)" if left else ""))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
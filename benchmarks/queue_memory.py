@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Memory per queued file
+
+    python benchmarks/queue_memory.py
+    python benchmarks/queue_memory.py --count 100000
+
+Builds N VideoFile records the way FileQueue does (canonical path resolved once by the queue) and reports the bytes
+each one costs, measured with tracemalloc, plus construction time. The previous representation — a plain class with a
+__dict__, eager error buffers and eagerly derived path strings — is rebuilt here for the comparison. The last line is
+the whole FileQueue (records, list and canonical-path index) per file.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.file_models import FileQueue, VideoFile, MAX_ERRORS_TAIL, canonical_path     # noqa: E402
+
+
+class DictVideoFile:
+    """VideoFile as it was: every field in the instance __dict__, everything created up front"""
+
+    def __init__(self, filepath: str, index: int = 0, canonical: str = None):
+        self.index = index
+        self.filepath = filepath
+        self.canonical = canonical or canonical_path(filepath)
+        self.filename = os.path.basename(filepath)
+        self.directory = os.path.dirname(os.path.abspath(filepath))
+        self.basename = os.path.splitext(self.filename)[0]
+        self.extension = os.path.splitext(self.filename)[1]
+        self.output_name = self.transcode_name = self.avs_file = self.error_file = self.ffindex_file = None
+        self.status = 'pending'
+        self.has_error = False
+        self.error_messages = []
+        self._error_tail = deque(maxlen=MAX_ERRORS_TAIL)
+        self.error_count = 0
+        self.logger: logging.Logger = None
+        self.probed = False
+        self.duration = self.width = self.height = self.fps = self.bitrate = self.codec = None
+        self.frame_count = self.pix_fmt = self.field_order = None
+        self.video_streams = self.audio_streams = self.subtitle_streams = None
+        self.sample_aspect_ratio = self.display_aspect_ratio = self.pixel_aspect_ratio = None
+        self.vmaf_score = None
+
+
+def make_paths(count: int):
+    return [os.path.join(os.sep, 'archive', f"show{i // 500:04d}", f"season{i % 7}", f"episode{i:06d}.mkv")
+            for i in range(count)]
+
+
+def measure(label: str, build, count: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} {current / count:>8.0f} B/file {elapsed / count * 1e6:>8.2f} us/file")
+    return kept
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+
+    paths = make_paths(args.count)
+    keys = [canonical_path(path) for path in paths]     # resolved up front: measure the records, not realpath
+    pairs = list(zip(paths, keys))
+    print(f"{args.count} files")
+    measure("dict record (before)", lambda: [DictVideoFile(p, i, k) for i, (p, k) in enumerate(pairs)], args.count)
+    measure("slotted record (after)", lambda: [VideoFile(p, i, k) for i, (p, k) in enumerate(pairs)], args.count)
+
+    def build_queue():
+        queue = FileQueue()
+        queue.add_files(paths)
+        return queue
+    measure("FileQueue incl. realpath + index", build_queue, args.count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Run journal restore time
+
+    python benchmarks/run_journal.py
+    python benchmarks/run_journal.py --count 50000 --edits 200
+
+Writes a journal the way a long run would (the queue, a number of queue edits, a running/success pair per finished
+file), then times what a restart does with it: RunJournal.load replaying it, and FileQueue.add_files taking the
+restored paths with their canonical keys. Also reports the cost of one fsynced state line on this disk.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DEFAULT_SETTINGS                          # noqa: E402
+from models.file_models import FileQueue, QueueDelta, VideoFile     # noqa: E402
+from utils.run_journal import RunJournal                     # noqa: E402
+
+
+def make_files(count: int, offset: int = 0):
+    return [VideoFile(os.path.join(os.sep, 'archive', f"show{i // 500:04d}", f"episode{i:06d}.mkv"), i,
+                      canonical=os.path.join(os.sep, 'archive', f"show{i // 500:04d}", f"episode{i:06d}.mkv"))
+            for i in range(offset, offset + count)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=50000)
+    parser.add_argument('--finished', type=float, default=0.5, help="share of files finished (default 0.5)")
+    parser.add_argument('--edits', type=int, default=200, help="queue edits during the run (default 200)")
+    args = parser.parse_args()
+
+    random.seed(args.count)
+    files = make_files(args.count)
+    done = int(args.count * args.finished)
+    with tempfile.TemporaryDirectory() as temp:
+        path = os.path.join(temp, 'run_journal.jsonl')
+        journal = RunJournal(path)
+        start = time.perf_counter()
+        journal.begin(files, dict(DEFAULT_SETTINGS))
+        began = time.perf_counter() - start
+
+        length = len(files)
+        for n in range(args.edits):
+            if n % 2:
+                journal.record_delta(QueueDelta.inserted(length, make_files(5, args.count + n * 5)))
+                length += 5
+            else:
+                journal.record_delta(QueueDelta.moved([random.randrange(done, length)], done))
+        start = time.perf_counter()
+        for file in files[:done]:
+            journal.record_state(file, 'running')
+            journal.record_state(file, 'success')
+        per_state = (time.perf_counter() - start) / max(1, 2 * done)
+        journal.close(complete=False)
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        state = RunJournal.load(path)
+        loaded = time.perf_counter() - start
+        start = time.perf_counter()
+        queue = FileQueue()
+        for file in queue.add_files(state.paths, keys=state.keys):
+            if state.states.get(file.canonical) == 'success':
+                file.status = 'success'
+        restored = time.perf_counter() - start
+
+    print(f"journal: {len(state.paths)} files, {args.edits} edits, {2 * done} state lines, {size / 1e6:.1f} MB")
+    print(f"begin (queue written + fsync): {began * 1e3:.1f} ms")
+    print(f"state line (fsynced): {per_state * 1e6:.0f} us")
+    print(f"load: {loaded * 1e3:.0f} ms, queue rebuilt: {restored * 1e3:.0f} ms, "
+          f"total {(loaded + restored) * 1e3:.0f} ms ({state.finished_count} finished, "
+          f"{state.unfinished_count} to go)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Process supervisor: threads and Stop latency with many children
+
+    python benchmarks/supervisor.py
+    python benchmarks/supervisor.py --children 64 --rate 100
+
+Starts --children processes that each print a -progress style line --rate times a second (what chunked encoding
+with many parallel chunks looks like), watches all of them with one ProcessSupervisor, and reports the threads the
+process used while they ran, how many lines were interpreted, and how long a Stop took to release every waiter.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import childproc                                  # noqa: E402
+from utils.process_supervisor import ProcessSupervisor       # noqa: E402
+
+CHILD = ("import sys, time\n"
+         "n = 0\n"
+         "while True:\n"
+         "    n += 1\n"
+         "    sys.stdout.write(f'out_time_us={n}\\nprogress=continue\\n'); sys.stdout.flush()\n"
+         "    time.sleep({delay})\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--children', type=int, default=40)
+    parser.add_argument('--rate', type=float, default=50, help="lines per second per child (default 50)")
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    supervisor = ProcessSupervisor()
+    lines = [0]
+    code = CHILD.replace('{delay}', repr(1.0 / args.rate))
+    processes = [childproc.popen([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 bufsize=0) for _ in range(args.children)]
+    watches = [supervisor.watch(process, lambda line: lines.__setitem__(0, lines[0] + 1)) for process in processes]
+    waiters = [threading.Thread(target=watch.wait, daemon=True) for watch in watches]
+    for waiter in waiters:
+        waiter.start()
+
+    time.sleep(args.seconds)
+    # the waiters stand in for the encode threads that block on their watch; everything else is overhead
+    threads = threading.active_count() - len(waiters)
+    start = time.perf_counter()
+    supervisor.stop()
+    for waiter in waiters:
+        waiter.join()
+    stopped = time.perf_counter() - start
+    for process in processes:
+        childproc.kill(process)
+    supervisor.close()
+
+    print(f"{args.children} children, {lines[0]} lines interpreted in {args.seconds:.1f}s")
+    print(f"threads besides the waiters: {threads} (a reader thread per child would add {args.children})")
+    print(f"stop released all {args.children} waiters in {stopped * 1e3:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
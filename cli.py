@@ -0,0 +1,221 @@
+"""
+Headless batch runner for videer
+
+    videer-cli -p presets/hq.json /media/incoming/*.mkv /media/show/
+    videer-cli --set video_codec=libsvtav1 --set crf=30 --workers 4 film.mkv
+
+Runs the same queue engine as the GUI (command builder, CPU budget, stall watchdog, .part-then-rename,
+cleanup) and writes one JSON object per line to stdout: start, warning, file_started, progress, info,
+vmaf, file_finished, file_skipped, finished. Qt is never imported, so the process starts in a fraction of a second.
+
+Exit status: 0 every file encoded, 1 some failed, 2 usage error, 3 FFmpeg not found,
+128 + signal number when interrupted (130 for Ctrl+C, 143 for SIGTERM).
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import APP_NAME, APP_VERSION, DEFAULT_SETTINGS, PROBE_WORKERS_WHILE_ENCODING
+from models.file_models import FileQueue
+from modules.queue_runner import QueueRunner, RunQueue, RunnerEvents, validate_settings
+from utils.ffmpeg_utils import find_ffmpeg
+from utils.file_utils import is_video_file, walk_video_files
+from utils.naturalsort import path_key
+from utils.probe_cache import get_probe_cache
+from utils.probe_pool import ProbePool
+from utils import childproc
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NO_FFMPEG = 3
+
+
+class JsonLinesEvents(RunnerEvents):
+    """Writes the runner's events to a stream as JSON lines (one writer at a time; workers call concurrently)"""
+
+    def __init__(self, queue: RunQueue, stream=None, progress_interval: float = 1.0):
+        self._queue = queue
+        self._stream = stream or sys.stdout
+        self._lock = threading.Lock()
+        self._progress_interval = progress_interval
+        self._last_progress: Dict[int, float] = {}
+        self.failed: List[str] = []
+
+    def emit(self, event: str, **fields: Any):
+        record = {'event': event, 'time': round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                self._stream.write(line + '\n')
+                self._stream.flush()
+            except (OSError, ValueError):
+                pass    # stdout closed by the consumer; the run itself carries on
+
+    def progress(self, snapshot: Dict[str, Any]):
+        index = snapshot.get('file_index', 0)
+        now = time.time()
+        final = snapshot.get('percent') == 100.0
+        if not final and now - self._last_progress.get(index, 0.0) < self._progress_interval:
+            return
+        self._last_progress[index] = now
+        self.emit('progress', **{key: value for key, value in snapshot.items() if value is not None})
+
+    def info(self, message: str):
+        self.emit('info', message=message)
+
+    def file_started(self, index: int):
+        file = self._queue.get_file_at(index)
+        self.emit('file_started', index=index, file=file.filepath if file else None)
+
+    def file_finished(self, index: int, success: bool):
+        self._last_progress.pop(index, None)
+        file = self._queue.get_file_at(index)
+        if file is None:
+            self.emit('file_finished', index=index, success=success)
+            return
+        if not success:
+            self.failed.append(file.filepath)
+        output = file.get_full_output_path() if file.output_name else None
+        self.emit('file_finished', index=index, file=file.filepath, success=success,
+                  output=output if success else None, vmaf=file.vmaf_score, errors=file.error_count)
+
+    def file_skipped(self, index: int, output: str):
+        self._last_progress.pop(index, None)
+        file = self._queue.get_file_at(index)
+        self.emit('file_skipped', index=index, file=file.filepath if file else None, output=output)
+
+    def vmaf_calculated(self, index: int, score: float):
+        self.emit('vmaf', index=index, score=score)
+
+    def finished(self, success_count: int, total_count: int):
+        self.emit('finished', success=success_count, total=total_count, probe_cache=get_probe_cache().stats())
+
+
+def load_preset(path: str) -> Dict[str, Any]:
+    """
+    Settings from a preset file: the {"name", "version", "settings"} layout PresetManager saves, or a plain
+    settings object (e.g. defaults.json)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("preset must be a JSON object")
+    settings = data.get('settings', data)
+    if not isinstance(settings, dict):
+        raise ValueError("'settings' must be a JSON object")
+    return settings
+
+
+def parse_assignment(text: str) -> tuple:
+    """KEY=VALUE with VALUE read as JSON when it parses (numbers, true/false), otherwise as a string"""
+    key, sep, value = text.partition('=')
+    if not sep or not key.strip():
+        raise ValueError(f"expected KEY=VALUE, got '{text}'")
+    try:
+        return key.strip(), json.loads(value)
+    except ValueError:
+        return key.strip(), value
+
+
+def collect_files(paths: List[str]) -> FileQueue:
+    """Files and folders (recursive) to a de-duplicated queue; each argument's files in natural order"""
+    queue = FileQueue()
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = list(walk_video_files(path))
+        elif is_video_file(path):
+            candidates = [path]
+        else:
+            continue
+        queue.add_files(sorted(candidates, key=path_key))
+    return queue
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='videer-cli', description=f"{APP_NAME} {APP_VERSION} headless batch encoder (JSON lines on stdout)")
+    parser.add_argument('paths', nargs='+', help="video files and/or folders (searched recursively)")
+    parser.add_argument('-p', '--preset', help="preset JSON saved by videer (or a plain settings object)")
+    parser.add_argument('-s', '--set', action='append', default=[], metavar='KEY=VALUE',
+                        help="override one setting, e.g. --set crf=20 --set video_codec=libsvtav1")
+    parser.add_argument('-w', '--workers', type=int, help="files encoded at the same time")
+    parser.add_argument('--progress-interval', type=float, default=1.0, metavar='SECONDS',
+                        help="minimum time between progress lines per file (default 1)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        if args.preset:
+            settings.update(load_preset(args.preset))
+        for assignment in args.set:
+            key, value = parse_assignment(assignment)
+            settings[key] = value
+    except (OSError, ValueError) as e:
+        parser.print_usage(sys.stderr)
+        print(f"videer-cli: error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if args.workers is not None:
+        settings['workers'] = max(1, args.workers)
+
+    files = collect_files(args.paths)
+    queue = RunQueue(files.get_all())
+    events = JsonLinesEvents(queue, progress_interval=max(0.0, args.progress_interval))
+
+    if not find_ffmpeg():
+        events.emit('error', message="FFmpeg not found in PATH or the application directory")
+        return EXIT_NO_FFMPEG
+
+    events.emit('start', version=APP_VERSION, files=len(files), workers=settings.get('workers', 1),
+                preset=args.preset)
+    for issue in validate_settings(settings):
+        events.emit('warning', message=issue)
+    if not len(files):
+        events.emit('finished', success=0, total=0)
+        return EXIT_OK
+
+    runner = QueueRunner(queue, settings, events)
+    # Probe the files further down the queue while the first ones encode
+    prober = ProbePool(PROBE_WORKERS_WHILE_ENCODING, on_probed=queue.note_probed)
+    prober.submit(files.get_all())
+    interrupted: List[int] = []
+
+    def on_signal(signum, frame):
+        if not interrupted:
+            events.emit('info', message=f"Stopping on {signal.Signals(signum).name}")
+        interrupted.append(signum)
+        runner.stop()
+
+    # The runner works on its own thread so that the signal handler, which Python always runs on the main
+    # thread, can never interrupt it while it holds its own lock.
+    worker = threading.Thread(target=runner.run, name="queue-runner", daemon=True)
+    previous = {sig: signal.signal(sig, on_signal) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        worker.start()
+        while worker.is_alive():
+            worker.join(timeout=0.5)
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        prober.close()
+        childproc.kill_all()
+
+    if interrupted:
+        return 128 + interrupted[0]
+    return EXIT_FAILED if events.failed else EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -170,6 +170,46 @@ DEFAULT_FORMAT = "MKV"
 MAX_THREADS = multiprocessing.cpu_count()
 DEFAULT_THREADS = MAX_THREADS
 
+# Files encoded at the same time. One encode of a low-resolution source cannot keep a many-core machine busy.
+DEFAULT_WORKERS = 1
+MAX_WORKERS = max(1, MAX_THREADS)
+
+# Chunked encoding: a long file is split at keyframes and the pieces are encoded side by side, because one
+# encoder process stops scaling long before a big machine runs out of cores. Files shorter than
+# CHUNK_MIN_DURATION are encoded in one piece.
+CHUNK_TARGET_SECONDS = 120
+CHUNK_MIN_DURATION = 10 * 60
+DEFAULT_CHUNK_JOBS = 4
+
+# The queue runs as a pipeline: while files encode, the next one is probed and pre-transcoded and the previous one
+# gets VMAF and its replace/delete. Each buffer between two stages holds at most this many files, so a slow encode
+# holds up preparation (and its raw intermediates on disk) instead of letting them pile up.
+PIPELINE_BUFFER = 1
+
+# Stall detection by headway: a damaged source can keep FFmpeg printing errors and -progress blocks with a frozen
+# position for hours. Once a step has advanced at all, it is stopped when out_time, frame and size all stand still
+# for HEADWAY_FACTOR times the longest wait it has shown between two advances, but never sooner than
+# HEADWAY_MIN_SECONDS, so a QTGMC encode at a frame every few seconds is not mistaken for a stuck one.
+HEADWAY_MIN_SECONDS = 3 * 60
+HEADWAY_FACTOR = 20
+
+# Oversize abort (abort_oversize): once OVERSIZE_MIN_PROGRESS of a file has been encoded, its final size is projected
+# from the running size per second of output. An encode projected past the limit (a percentage of the source size)
+# by OVERSIZE_MARGIN, or already past it outright, is abandoned and the original kept.
+DEFAULT_OVERSIZE_PERCENT = 100
+OVERSIZE_MIN_PROGRESS = 0.2
+OVERSIZE_MARGIN = 1.1
+
+# Background probing of queued files. ffprobe mostly waits on the disk, so a few run side by side while idle;
+# once an encode is running only one does, so a 5,000-file drop cannot take cores or I/O from it.
+PROBE_WORKERS = max(2, min(4, MAX_THREADS // 2))
+PROBE_WORKERS_WHILE_ENCODING = 1
+
+# Watch folder: a new file is queued once its size and mtime have not changed for WATCH_SETTLE_SECONDS, so a copy
+# still in progress is never picked up. Folders inotify cannot follow (network mounts, non-Linux) are polled.
+WATCH_SETTLE_SECONDS = 5.0
+WATCH_POLL_INTERVAL = 2.0
+
 # Logging
 LOG_FORMAT = "%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s"
 
@@ -193,7 +233,15 @@ DEFAULT_SETTINGS = {
     "corrupt_fix": False,
     "replace_files": False,
     "delete_source": False,
+    "skip_encoded": False,
+    "abort_oversize": False,
+    "oversize_percent": DEFAULT_OVERSIZE_PERCENT,
+    "oversize_copy": False,
     "threads": DEFAULT_THREADS,
+    "workers": DEFAULT_WORKERS,
+    "chunked": False,
+    "chunk_jobs": DEFAULT_CHUNK_JOBS,
+    "resumable": False,
     "par_mode": "auto",
     "par_value": "1:1",
     "dar_mode": "auto",
@@ -209,6 +257,19 @@ DEFAULT_SETTINGS = {
 # Path to user defaults file (next to this config file, i.e. app directory)
 DEFAULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "defaults.json")
 
+# ffprobe results cached across runs (app directory, next to presets/). Entries are invalidated when a file's size
+# or mtime changes; past the limit the oldest are dropped.
+PROBE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "probe_cache.sqlite3")
+PROBE_CACHE_MAX_ENTRIES = 200_000
+
+# Journal of the current GUI run (queue, settings, per-file states), so a run cut short by a crash or reboot can be
+# restored and continued at the next start. Removed once a run has nothing left to do.
+RUN_JOURNAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_journal.jsonl")
+
+# Every successful encode, by source fingerprint and settings hash, so re-running a preset skips finished files
+ENCODE_MANIFEST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "encode_manifest.sqlite3")
+ENCODE_MANIFEST_MAX_ENTRIES = 500_000
+
 # Preset configurations
 QUALITY_PRESETS = {
     "web": {
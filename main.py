@@ -18,6 +18,7 @@ from modules.preset_manager import PresetManager
 from utils.ffmpeg_utils import check_ffmpeg_status
 from config import APP_NAME, APP_VERSION, WINDOW_MIN_WIDTH, WINDOW_MIN_HEIGHT
 from utils import childproc
+from utils.run_journal import RunJournal
 
 
 class MainWindow(QMainWindow):
@@ -28,6 +29,7 @@ class MainWindow(QMainWindow):
         self.setWindowTitle(f"{APP_NAME} v{APP_VERSION}")
         self.setAcceptDrops(True)
         self.settings = QSettings(APP_NAME, "Settings")
+        self._close_when_stopped = False    # the window was closed during a run: close once it has unwound
         
         # Set minimum window size
         self.setMinimumWidth(WINDOW_MIN_WIDTH)
@@ -54,15 +56,21 @@ class MainWindow(QMainWindow):
     def connect_signals(self):
         """Connect all signals between managers"""
         # File manager signals
-        self.file_manager.files_updated.connect(self.ui_manager.update_file_list)
+        self.file_manager.queue_changed.connect(self.ui_manager.queue_model.apply_delta)
         self.file_manager.file_count_changed.connect(self.ui_manager.update_file_count)
         self.file_manager.duplicates_skipped.connect(self._on_duplicates_skipped)
+        self.file_manager.file_probed.connect(self.ui_manager.update_file_info)
+        self.file_manager.file_probed.connect(self.process_manager.note_probed)
+        self.file_manager.scan_progress.connect(self.ui_manager.update_scan_progress)
+        self.file_manager.scan_finished.connect(self.ui_manager.finish_scan)
+        self.file_manager.watch_changed.connect(self.ui_manager.update_watch)
         
         # Process manager signals
         self.process_manager.progress_updated.connect(self.ui_manager.update_progress)
         self.process_manager.status_updated.connect(self.ui_manager.update_status)
         self.process_manager.stats_updated.connect(self.ui_manager.update_stats)
         self.process_manager.file_state_changed.connect(self.ui_manager.set_file_state)
+        self.process_manager.file_state_changed.connect(self._on_file_state_changed)
         self.process_manager.vmaf_calculated.connect(self.ui_manager.set_file_vmaf)
         self.process_manager.processing_finished.connect(self.on_processing_finished)
         
@@ -71,13 +79,16 @@ class MainWindow(QMainWindow):
         self.ui_manager.stop_processing.connect(self.stop_processing)
         self.ui_manager.pause_clicked.connect(self.toggle_pause)
         self.process_manager.paused_state_changed.connect(self.ui_manager.set_paused_state)
+        self.process_manager.stopping_state_changed.connect(self.ui_manager.set_stopping_state)
         self.ui_manager.files_added.connect(self.file_manager.add_files)
         self.ui_manager.files_removed.connect(self._on_files_removed)
         self.ui_manager.queue_cleared.connect(self.file_manager.clear_queue)
-        self.ui_manager.files_reordered.connect(self.file_manager.move_file)
+        self.ui_manager.scan_cancelled.connect(self.file_manager.cancel_scan)
+        self.ui_manager.watch_requested.connect(self._on_watch_requested)
+        self.ui_manager.files_reordered.connect(self._on_files_reordered)
 
-        # Route newly-added files to the running process queue
-        self.file_manager.files_updated.connect(self._on_files_updated_during_processing)
+        # Route queue edits to the running process queue
+        self.file_manager.queue_changed.connect(self._on_queue_changed_during_processing)
     
     def check_dependencies(self):
         """Check if required dependencies are available"""
@@ -92,8 +103,8 @@ class MainWindow(QMainWindow):
                 "Install FFmpeg (or place the ffmpeg binary next to main.py)."
             )
     
-    def start_processing(self):
-        """Start processing the file queue"""
+    def start_processing(self, resume=False):
+        """Start processing the file queue (resume: continue a restored run after its finished files)"""
         if not self.file_manager.has_files():
             QMessageBox.warning(self, "No Files", "Please add files to process.")
             return
@@ -115,9 +126,31 @@ class MainWindow(QMainWindow):
             if reply != QMessageBox.StandardButton.Yes:
                 return
 
-        self.process_manager.start_processing(files, settings)
+        self.process_manager.start_processing(files, settings, resume=resume)
         self.ui_manager.set_processing_state(True)
+        self.file_manager.set_encoding(self.process_manager.is_processing())
     
+    def offer_restore(self):
+        """A run was cut short (crash, reboot, or stopped and closed): offer to restore its queue and continue"""
+        state = RunJournal.load()
+        if state is None or state.unfinished_count == 0:
+            RunJournal.discard()
+            return
+        reply = QMessageBox.question(
+            self,
+            "Resume Previous Run",
+            f"The previous run did not finish: {state.finished_count} of {len(state.paths)} files were done.\n\n"
+            "Restore its queue and settings and continue with the remaining files?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.Yes
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            RunJournal.discard()
+            return
+        self.preset_manager.apply_settings(state.settings)
+        self.file_manager.restore_files(state.paths, state.keys, state.states)
+        self.start_processing(resume=True)
+
     def stop_processing(self):
         """
         Ask the run to stop. The UI is *not* switched back to idle here — that happens in
@@ -133,10 +166,21 @@ class MainWindow(QMainWindow):
         else:
             self.process_manager.pause_processing()
     
-    def _on_files_updated_during_processing(self, files):
+    def _on_queue_changed_during_processing(self, delta):
         """Keep the running queue's pending tail in sync with the UI queue"""
         if self.process_manager.is_processing():
-            self.process_manager.sync_pending(files)
+            self.process_manager.apply_delta(delta, self.file_manager.get_queue)
+
+    def _on_watch_requested(self, folder):
+        """Watch a folder for new files ('' stops the watch); files it finds join the queue, running or not"""
+        if not folder:
+            self.file_manager.stop_watch()
+        elif not self.file_manager.watch_folder(folder):
+            self.ui_manager.update_watch('', f"cannot watch {folder}: not a folder")
+
+    def _on_file_state_changed(self, index: int, state: str):
+        """Tell the file manager which outputs the run produces, so a watched folder does not queue them"""
+        self.file_manager.note_output(self.process_manager.get_file_at(index))
 
     def _on_duplicates_skipped(self, paths):
         """Tell the user which dropped/selected files were already in the queue"""
@@ -148,20 +192,41 @@ class MainWindow(QMainWindow):
     def _on_files_removed(self, indices):
         """Safe removal: block removal of already-processed or in-progress files"""
         if self.process_manager.is_processing():
-            current_index = self.process_manager.current_file_index
-            safe = [i for i in indices if i > current_index]
-            blocked = [i for i in indices if i <= current_index]
+            # No worker may claim a file between the check and the removal reaching the running queue
+            with self.process_manager.queue_edit():
+                current_index = self.process_manager.current_file_index
+                safe = [i for i in indices if i > current_index]
+                blocked = [i for i in indices if i <= current_index]
+                if safe:
+                    self.process_manager.hand_back(min(safe))
+                    self.file_manager.remove_files(safe)
             if blocked:
                 QMessageBox.warning(self, "Cannot Remove",
                     f"{len(blocked)} file(s) already processed or in progress.")
-            if safe:
-                self.file_manager.remove_files(safe)
         else:
             self.file_manager.remove_files(indices)
 
+    def _on_files_reordered(self, indices, to_index):
+        """Safe reordering: files already processed or in progress keep their place, nothing moves above them"""
+        if self.process_manager.is_processing():
+            with self.process_manager.queue_edit():
+                current_index = self.process_manager.current_file_index
+                if min(indices, default=0) <= current_index:
+                    self.ui_manager.update_status("Files already processed or in progress cannot be moved")
+                    return
+                to_index = max(to_index, current_index + 1)
+                self.process_manager.hand_back(min(min(indices), to_index))
+                self.file_manager.move_files(indices, to_index)
+        else:
+            self.file_manager.move_files(indices, to_index)
+
     def on_processing_finished(self, success_count, total_count):
         """Handle processing completion — the single place the UI returns to idle"""
         self.ui_manager.set_processing_state(False)
+        self.file_manager.set_encoding(False)
+        if self._close_when_stopped:
+            self.close()
+            return
 
         QMessageBox.information(
             self,
@@ -186,19 +251,25 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event):
         """Handle application close event"""
         if self.process_manager.is_processing():
-            reply = QMessageBox.question(
-                self,
-                "Processing in Progress",
-                "Processing is still in progress. Are you sure you want to exit?",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-            
-            if reply == QMessageBox.StandardButton.No:
-                event.ignore()
-                return
-            
-            self.process_manager.stop_processing()
+            if not self._close_when_stopped:
+                reply = QMessageBox.question(
+                    self,
+                    "Processing in Progress",
+                    "Processing is still in progress. Are you sure you want to exit?",
+                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+                )
+
+                if reply == QMessageBox.StandardButton.No:
+                    event.ignore()
+                    return
+
+                # Stop without blocking the window; on_processing_finished closes it once the run has unwound
+                self._close_when_stopped = True
+                self.process_manager.stop_processing()
+            event.ignore()
+            return
         
+        self.file_manager.shutdown()
         self.save_settings()
         event.accept()
 
@@ -223,6 +294,8 @@ def main():
     selftest = os.environ.get("VIDEER_SELFTEST")
     if selftest:
         _run_selftest(window, selftest)
+    else:
+        window.offer_restore()
     sys.exit(app.exec())
 
 
@@ -7,7 +7,7 @@ import os
 import logging
 import logging.handlers
 from collections import deque
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence, Set
 
 # A damaged source encoded with -err_detect can make FFmpeg emit an error line per packet. Keeping all of them
 # costs gigabytes of RAM per hour and drives the machine into swap, so keep a head (what went wrong first) and
@@ -19,6 +19,10 @@ MAX_ERRORS_TAIL = 200
 LOG_MAX_BYTES = 5 * 1024 * 1024
 LOG_BACKUPS = 2
 
+# A file in one of these states is done with: encoded, or passed over (already encoded, or the original kept).
+# A resumed run does not touch it again.
+FINISHED_STATES = ('success', 'skipped')
+
 
 class BoundedFileHandler(logging.handlers.RotatingFileHandler):
     """
@@ -43,6 +47,35 @@ class BoundedFileHandler(logging.handlers.RotatingFileHandler):
         return super().shouldRollover(record)
 
 
+def _parse_rate(value: Optional[str]) -> Optional[float]:
+    """'30000/1001' or '25' -> frames per second; None for '0/0' and garbage"""
+    if not value:
+        return None
+    try:
+        if '/' in value:
+            num, den = value.split('/', 1)
+            return float(num) / float(den) if float(den) else None
+        return float(value) or None
+    except ValueError:
+        return None
+
+
+def _parse_number(value: Any, kind=float) -> Optional[Any]:
+    try:
+        return kind(value) if value not in (None, '', 'N/A') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_clock(value: Optional[str]) -> Optional[float]:
+    """Matroska DURATION tag '01:02:03.500000000' -> seconds"""
+    try:
+        hours, minutes, seconds = (value or '').split(':')
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return None
+
+
 def canonical_path(filepath: str) -> str:
     """
     Identity key for duplicate detection: absolute, symlink-resolved,
@@ -56,16 +89,26 @@ def canonical_path(filepath: str) -> str:
 
 
 class VideoFile:
-    """Represents a video file to be processed"""
+    """
+    Represents a video file to be processed.
+
+    Archive-scale queues hold 100k of these, so the record is slotted: no per-instance __dict__, the error
+    buffers only exist once a file has reported an error, and the names derived from the path (filename,
+    directory, ...) are computed when asked for rather than stored. The canonical path (a realpath, i.e. syscalls)
+    is taken from the caller when it already has it — FileQueue does — and resolved on first use otherwise.
+    """
+
+    __slots__ = ('index', 'filepath', '_canonical',
+                 'output_name', 'transcode_name', 'avs_file', 'error_file', 'ffindex_file',
+                 'status', 'has_error', 'error_count', '_errors', '_error_tail', 'logger',
+                 'probed', 'duration', 'width', 'height', 'fps', 'bitrate', 'codec', 'frame_count', 'pix_fmt',
+                 'field_order', 'video_streams', 'audio_streams', 'subtitle_streams',
+                 'sample_aspect_ratio', 'display_aspect_ratio', 'pixel_aspect_ratio', 'vmaf_score')
     
-    def __init__(self, filepath: str, index: int = 0):
+    def __init__(self, filepath: str, index: int = 0, canonical: Optional[str] = None):
         self.index = index
         self.filepath = filepath
-        self.canonical = canonical_path(filepath)
-        self.filename = os.path.basename(filepath)
-        self.directory = os.path.dirname(os.path.abspath(filepath))
-        self.basename = os.path.splitext(self.filename)[0]
-        self.extension = os.path.splitext(self.filename)[1]
+        self._canonical = canonical
         
         # Output names
         self.output_name: Optional[str] = None
@@ -74,23 +117,30 @@ class VideoFile:
         self.error_file: Optional[str] = None
         self.ffindex_file: Optional[str] = None
         
-        # Processing state: 'pending' | 'running' | 'success' | 'failed'
+        # Processing state: 'pending' | 'running' | 'success' | 'failed' | 'skipped'
         self.status = 'pending'
         self.has_error = False
-        self.error_messages: List[str] = []          # bounded head; see add_error / get_error_report
-        self._error_tail: deque = deque(maxlen=MAX_ERRORS_TAIL)
         self.error_count = 0                         # total seen, including the ones not retained
+        self._errors: Optional[List[str]] = None     # bounded head; see add_error / get_error_report
+        self._error_tail: Optional[deque] = None
         
         # Logger
         self.logger: Optional[logging.Logger] = None
         
-        # Video properties
+        # Video properties (filled from one ffprobe pass by apply_probe)
+        self.probed = False
         self.duration: Optional[float] = None
         self.width: Optional[int] = None
         self.height: Optional[int] = None
         self.fps: Optional[float] = None
         self.bitrate: Optional[int] = None
         self.codec: Optional[str] = None
+        self.frame_count: Optional[int] = None
+        self.pix_fmt: Optional[str] = None
+        self.field_order: Optional[str] = None      # progressive | tt | bb | tb | bt
+        self.video_streams: Optional[int] = None
+        self.audio_streams: Optional[int] = None
+        self.subtitle_streams: Optional[int] = None
         
         # PAR/DAR properties
         self.sample_aspect_ratio: Optional[str] = None
@@ -99,7 +149,97 @@ class VideoFile:
 
         # Quality metrics
         self.vmaf_score: Optional[float] = None
+
+    # ---- derived from the path -------------------------------------------
+    @property
+    def canonical(self) -> str:
+        if self._canonical is None:
+            self._canonical = canonical_path(self.filepath)
+        return self._canonical
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.filepath)
+
+    @property
+    def directory(self) -> str:
+        return os.path.dirname(os.path.abspath(self.filepath))
+
+    @property
+    def basename(self) -> str:
+        return os.path.splitext(self.filename)[0]
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.filepath)[1]
+
+    @property
+    def error_messages(self) -> List[str]:
+        """The retained head of the error lines (read-only view; add_error records them)"""
+        return self._errors if self._errors is not None else []
     
+    def apply_probe(self, data: Optional[Dict[str, Any]]) -> bool:
+        """
+        Fill the media properties from `ffprobe -show_format -show_streams -of json` output (the first video
+        stream describes the file). Returns False, leaving everything unset, when there is nothing to apply.
+        """
+        if not data:
+            return False
+        fmt = data.get('format') or {}
+        streams = data.get('streams') or []
+        video = [s for s in streams if s.get('codec_type') == 'video'
+                 and not (s.get('disposition') or {}).get('attached_pic')]
+        self.video_streams = len(video)
+        self.audio_streams = sum(1 for s in streams if s.get('codec_type') == 'audio')
+        self.subtitle_streams = sum(1 for s in streams if s.get('codec_type') == 'subtitle')
+
+        stream = video[0] if video else {}
+        tags = stream.get('tags') or {}
+        self.duration = (_parse_number(fmt.get('duration')) or _parse_number(stream.get('duration'))
+                         or _parse_clock(tags.get('DURATION') or tags.get('DURATION-eng')))
+        self.width = _parse_number(stream.get('width'), int)
+        self.height = _parse_number(stream.get('height'), int)
+        self.fps = _parse_rate(stream.get('avg_frame_rate')) or _parse_rate(stream.get('r_frame_rate'))
+        self.bitrate = _parse_number(fmt.get('bit_rate'), int) or _parse_number(stream.get('bit_rate'), int)
+        self.codec = stream.get('codec_name')
+        self.pix_fmt = stream.get('pix_fmt')
+        self.field_order = stream.get('field_order')
+        self.frame_count = (_parse_number(stream.get('nb_frames'), int)
+                            or _parse_number(tags.get('NUMBER_OF_FRAMES') or tags.get('NUMBER_OF_FRAMES-eng'), int))
+        sar = stream.get('sample_aspect_ratio')
+        self.sample_aspect_ratio = sar if sar and sar != '0:1' else None
+        dar = stream.get('display_aspect_ratio')
+        self.display_aspect_ratio = dar if dar and dar != '0:1' else None
+        self.pixel_aspect_ratio = self.sample_aspect_ratio
+        self.probed = True
+        return True
+
+    def describe_media(self) -> str:
+        """One-line summary of the probed properties for the log"""
+        if not self.probed:
+            return "not probed"
+        parts = []
+        if self.width and self.height:
+            parts.append(f"{self.width}x{self.height}")
+        if self.codec:
+            parts.append(self.codec)
+        if self.fps:
+            parts.append(f"{self.fps:.3f} fps")
+        if self.sample_aspect_ratio or self.display_aspect_ratio:
+            parts.append(f"SAR {self.sample_aspect_ratio or '?'} DAR {self.display_aspect_ratio or '?'}")
+        if self.pix_fmt:
+            parts.append(self.pix_fmt)
+        if self.field_order:
+            parts.append(self.field_order)
+        if self.duration:
+            parts.append(f"{self.duration:.2f} s")
+        if self.frame_count:
+            parts.append(f"{self.frame_count} frames")
+        if self.bitrate:
+            parts.append(f"{self.bitrate // 1000} kb/s")
+        parts.append(f"{self.audio_streams} audio / {self.subtitle_streams} subtitle streams")
+        return ", ".join(parts)
+
     def create_logger(self):
         """Create a rotating logger for this file"""
         log_formatter = logging.Formatter(
@@ -172,11 +312,26 @@ class VideoFile:
             return os.path.join(output_dir, self.output_name)
         return os.path.join(self.directory, self.output_name)
 
+    def get_kept_original_path(self) -> str:
+        """Where oversize_copy puts the original of an abandoned encode: the output name, the source's extension"""
+        return os.path.splitext(self.get_full_output_path())[0] + self.extension
+
     def get_temp_output_path(self, output_dir: Optional[str] = None) -> str:
         """Where FFmpeg writes while encoding: <name>.part.<ext> (same extension, so the container is inferred)"""
         stem, ext = os.path.splitext(self.get_full_output_path(output_dir))
         return f"{stem}.part{ext}"
     
+    def working_paths(self) -> Set[str]:
+        """
+        Every path processing this file writes (output, its .part and chunk folder, log, pre-transcode, AviSynth
+        script), normalized for comparison. Two sources that differ only in extension share all of them.
+        """
+        paths = [os.path.join(self.directory, f"{self.basename}.log"), self.transcode_name, self.avs_file]
+        if self.output_name:
+            temp = self.get_temp_output_path()
+            paths += [self.get_full_output_path(), temp, os.path.splitext(temp)[0] + '.chunks']
+        return {os.path.normcase(os.path.abspath(path)) for path in paths if path}
+
     def get_file_size_mb(self) -> float:
         """Get file size in MB"""
         try:
@@ -192,9 +347,13 @@ class VideoFile:
         """
         self.has_error = True
         self.error_count += 1
-        if len(self.error_messages) < MAX_ERRORS_HEAD:
-            self.error_messages.append(message)
+        if self._errors is None:
+            self._errors = []
+        if len(self._errors) < MAX_ERRORS_HEAD:
+            self._errors.append(message)
         else:
+            if self._error_tail is None:
+                self._error_tail = deque(maxlen=MAX_ERRORS_TAIL)
             self._error_tail.append(message)
         if self.logger:
             self.logger.error(message)
@@ -204,16 +363,17 @@ class VideoFile:
         if not self.error_count:
             return ""
         parts = list(self.error_messages)
-        dropped = self.error_count - len(self.error_messages) - len(self._error_tail)
+        tail = self._error_tail or ()
+        dropped = self.error_count - len(parts) - len(tail)
         if dropped > 0:
             parts.append(f"... {dropped} further error lines omitted ...")
-        parts.extend(self._error_tail)
+        parts.extend(tail)
         return '\n'.join(parts)
 
     def clear_errors(self):
         """Release retained error text (called once a file is done with)"""
-        self.error_messages = []
-        self._error_tail.clear()
+        self._errors = None
+        self._error_tail = None
     
     def log_info(self, message: str):
         """Log an info message"""
@@ -256,63 +416,184 @@ class VideoFile:
         return f"<VideoFile: {self.filename}>"
 
 
+class QueueDelta:
+    """
+    One edit of a FileQueue, in terms that a mirror of its list (the list view's model, the running queue) can
+    replay in place instead of copying the whole queue:
+
+        insert  files inserted as a block starting at row `first`
+        remove  the rows in `indices` (ascending, pre-edit numbering) taken out
+        move    the rows in `indices` taken out and put back as a block so the first is at `to_index`
+        reset   the list replaced by `files`
+    """
+
+    INSERT, REMOVE, MOVE, RESET = 'insert', 'remove', 'move', 'reset'
+
+    def __init__(self, kind: str, first: int = 0, files: Sequence['VideoFile'] = (),
+                 indices: Sequence[int] = (), to_index: int = 0):
+        self.kind = kind
+        self.first = first
+        self.files = list(files)
+        self.indices = sorted(set(indices))
+        self.to_index = to_index
+
+    @classmethod
+    def inserted(cls, first: int, files: Sequence['VideoFile']) -> 'QueueDelta':
+        return cls(cls.INSERT, first=first, files=files)
+
+    @classmethod
+    def removed(cls, indices: Sequence[int]) -> 'QueueDelta':
+        return cls(cls.REMOVE, indices=indices)
+
+    @classmethod
+    def moved(cls, indices: Sequence[int], to_index: int) -> 'QueueDelta':
+        return cls(cls.MOVE, indices=indices, to_index=to_index)
+
+    @classmethod
+    def reset(cls, files: Sequence['VideoFile']) -> 'QueueDelta':
+        return cls(cls.RESET, files=files)
+
+    def runs(self) -> List[range]:
+        """`indices` as contiguous ranges, last first (the order to remove them in)"""
+        runs: List[range] = []
+        for index in self.indices:
+            if runs and runs[-1].stop == index:
+                runs[-1] = range(runs[-1].start, index + 1)
+            else:
+                runs.append(range(index, index + 1))
+        return runs[::-1]
+
+    def apply(self, files: list):
+        """Replay the edit on a list that matched the queue before it"""
+        if self.kind == self.INSERT:
+            files[self.first:self.first] = self.files
+        elif self.kind == self.REMOVE:
+            for run in self.runs():
+                del files[run.start:run.stop]
+        elif self.kind == self.MOVE:
+            moving = [i for i in self.indices if i < len(files)]
+            block = [files[i] for i in moving]
+            for i in reversed(moving):
+                del files[i]
+            position = max(0, min(self.to_index, len(files)))
+            files[position:position] = block
+        elif self.kind == self.RESET:
+            files[:] = self.files
+
+    def __repr__(self) -> str:
+        if self.kind == self.INSERT:
+            return f"<QueueDelta insert {len(self.files)} at {self.first}>"
+        if self.kind == self.RESET:
+            return f"<QueueDelta reset to {len(self.files)}>"
+        target = f" to {self.to_index}" if self.kind == self.MOVE else ""
+        return f"<QueueDelta {self.kind} {len(self.indices)} rows{target}>"
+
+
 class FileQueue:
-    """Manages a queue of video files"""
+    """
+    Manages a queue of video files.
+
+    Besides the ordered list, the queue keeps an index by canonical path, so a duplicate check is a dict lookup
+    rather than a scan. Batch edits reindex once, which keeps dropping a 50k-file tree or removing thousands of
+    selected rows linear.
+    """
     
     def __init__(self):
         self.files: List[VideoFile] = []
+        self._by_canonical: Dict[str, VideoFile] = {}
     
-    def add_file(self, filepath: str) -> VideoFile:
-        """Add a file to the queue"""
-        if not self.contains(filepath):
-            video_file = VideoFile(filepath, len(self.files))
-            self.files.append(video_file)
-            return video_file
-        return None
+    def add_file(self, filepath: str) -> Optional[VideoFile]:
+        """Add a file to the queue (None if it is already queued)"""
+        added = self.add_files([filepath])
+        return added[0] if added else None
     
-    def add_files(self, filepaths: List[str]) -> List[VideoFile]:
-        """Add multiple files to the queue"""
+    def add_files(self, filepaths: List[str], at: Optional[int] = None,
+                  duplicates: Optional[List[str]] = None, keys: Optional[List[str]] = None) -> List[VideoFile]:
+        """
+        Add multiple files, appended or inserted as a block before position `at`. Paths already queued, or
+        repeated within filepaths, are skipped (and collected in `duplicates` if given). `keys` are the
+        canonical paths when the caller already resolved them (a folder scan does so off the GUI thread).
+        Returns the added files.
+        """
         added = []
-        for filepath in filepaths:
-            file = self.add_file(filepath)
-            if file:
-                added.append(file)
+        for position, filepath in enumerate(filepaths):
+            key = keys[position] if keys is not None else canonical_path(filepath)
+            if key in self._by_canonical:
+                if duplicates is not None:
+                    duplicates.append(filepath)
+                continue
+            video_file = VideoFile(filepath, len(self.files) + len(added), canonical=key)
+            self._by_canonical[key] = video_file
+            added.append(video_file)
+        if at is None or at >= len(self.files):
+            self.files.extend(added)
+        elif added:
+            position = max(0, at)
+            self.files[position:position] = added
+            self._reindex(position)
         return added
     
     def remove_file(self, filepath: str) -> bool:
         """Remove a file from the queue"""
-        for i, file in enumerate(self.files):
-            if file.filepath == filepath:
-                del self.files[i]
-                self._reindex()
-                return True
-        return False
+        file = self.get(filepath)
+        return bool(file and self.remove_indices([file.index]))
     
     def remove_at_index(self, index: int) -> bool:
         """Remove file at specific index"""
-        if 0 <= index < len(self.files):
-            del self.files[index]
-            self._reindex()
-            return True
-        return False
+        return bool(self.remove_indices([index]))
+    
+    def remove_indices(self, indices: List[int]) -> List[VideoFile]:
+        """Remove the files at the given indices (any order, out-of-range ignored); returns the removed files"""
+        doomed = {index for index in indices if 0 <= index < len(self.files)}
+        if not doomed:
+            return []
+        removed = [self.files[index] for index in sorted(doomed)]
+        for file in removed:
+            del self._by_canonical[file.canonical]
+        first = min(doomed)
+        self.files = self.files[:first] + [f for i, f in enumerate(self.files[first:], first) if i not in doomed]
+        self._reindex(first)
+        return removed
+    
+    def move(self, from_index: int, to_index: int) -> bool:
+        """Move one file so that it ends up at to_index"""
+        if not (0 <= from_index < len(self.files) and 0 <= to_index < len(self.files)) or from_index == to_index:
+            return False
+        self.move_indices([from_index], to_index)
+        return True
+    
+    def move_indices(self, indices: List[int], to_index: int):
+        """Move the files at indices, as a block in queue order, so that the first of them ends up at to_index"""
+        moving = {index for index in indices if 0 <= index < len(self.files)}
+        if not moving:
+            return
+        block = [self.files[index] for index in sorted(moving)]
+        rest = [f for i, f in enumerate(self.files) if i not in moving]
+        position = max(0, min(to_index, len(rest)))
+        self.files = rest[:position] + block + rest[position:]
+        self._reindex(min(position, min(moving)))
     
     def clear(self):
         """Clear all files from queue"""
         self.files.clear()
+        self._by_canonical.clear()
     
     def contains(self, filepath: str) -> bool:
         """Check if filepath (or another spelling of the same file) is already in queue"""
-        key = canonical_path(filepath)
-        return any(f.canonical == key for f in self.files)
+        return canonical_path(filepath) in self._by_canonical
+    
+    def get(self, filepath: str) -> Optional[VideoFile]:
+        """The queued entry for filepath (any spelling of the same file), or None"""
+        return self._by_canonical.get(canonical_path(filepath))
     
     def get_all(self) -> List[VideoFile]:
         """Get all files in queue"""
         return self.files.copy()
     
-    def _reindex(self):
-        """Reindex files after removal"""
-        for i, file in enumerate(self.files):
-            file.index = i
+    def _reindex(self, start: int = 0):
+        """Renumber files from position start on, after an edit that shifted them"""
+        for i in range(start, len(self.files)):
+            self.files[i].index = i
     
     def __len__(self) -> int:
         return len(self.files)
@@ -37,9 +37,10 @@ class AviSynthHandler:
         current_dir = os.path.dirname(os.path.abspath(__file__))
         return os.path.join(os.path.dirname(current_dir), "plugins")
     
-    def create_script(self, video_file: VideoFile) -> bool:
+    def create_script(self, video_file: VideoFile, threads: Optional[int] = None) -> bool:
         """
-        Create AviSynth script for the video file
+        Create AviSynth script for the video file. `threads` is the script's share of the CPU budget
+        (defaults to the whole 'threads' setting).
         Returns True if successful
         """
         if not video_file.avs_file:
@@ -53,8 +54,8 @@ class AviSynthHandler:
                 self._write_source(avs, video_file)
                 self._write_processing(avs)
                 self._write_custom_extras(avs)
-                self._write_deinterlacing(avs)
-                self._write_prefetch(avs)
+                self._write_deinterlacing(avs, threads)
+                self._write_prefetch(avs, threads)
             
             return True
         except Exception as e:
@@ -125,8 +126,10 @@ class AviSynthHandler:
             avs_file.write(extras + '\n')
             avs_file.write('\n')
     
-    def _requested_threads(self) -> int:
-        """The user's CPU budget, defaulting to every core"""
+    def _requested_threads(self, budget: Optional[int] = None) -> int:
+        """The script's CPU budget: the share it was given, else the user's setting, else every core"""
+        if budget:
+            return max(1, int(budget))
         try:
             threads = int(self.settings.get('threads') or self.cpu_count)
         except (TypeError, ValueError):
@@ -137,26 +140,26 @@ class AviSynthHandler:
         return bool(self.settings.get('deinterlace', False)) and \
             self.settings.get('deinterlacer', 'qtgmc') == 'qtgmc'
 
-    def _edi_threads(self) -> int:
+    def _edi_threads(self, budget: Optional[int] = None) -> int:
         """
         Threads for QTGMC's internal (nnedi3) threading. Prefetch() already runs
         several frames in parallel, so give each frame a small slice of the cores
         instead of threads*threads oversubscription.
         """
-        return max(1, min(4, self._requested_threads() // 2))
+        return max(1, min(4, self._requested_threads(budget) // 2))
 
-    def _prefetch_threads(self) -> int:
+    def _prefetch_threads(self, budget: Optional[int] = None) -> int:
         """
         How many frames to run in parallel. Concurrency here multiplies: every prefetched frame can run up to
         EdiThreads nnedi3 threads of its own, so Prefetch(N) with EdiThreads(E) asks for N x E workers on top
         of FFmpeg's own encoder threads. Divide the budget instead of spending it twice.
         """
-        threads = self._requested_threads()
+        threads = self._requested_threads(budget)
         if self._uses_qtgmc():
-            return max(1, threads // self._edi_threads())
+            return max(1, threads // self._edi_threads(budget))
         return threads
 
-    def _write_deinterlacing(self, avs_file):
+    def _write_deinterlacing(self, avs_file, budget: Optional[int] = None):
         """Write QTGMC deinterlacing section if enabled (ffmpeg handles yadif/bwdif)"""
         if not self.settings.get('deinterlace', False):
             return
@@ -173,7 +176,7 @@ class AviSynthHandler:
         
         # QTGMC deinterlacing — all presets are usable, plugins are bundled
         preset = self.settings.get('preset', 'Medium')
-        threads = self._edi_threads()
+        threads = self._edi_threads(budget)
         
         if self.settings.get('reduce_fps', False):
             # Reduce frame rate (halve FPS)
@@ -184,9 +187,9 @@ class AviSynthHandler:
         
         avs_file.write('\n')
     
-    def _write_prefetch(self, avs_file):
+    def _write_prefetch(self, avs_file, budget: Optional[int] = None):
         """Write prefetch for multi-threading"""
-        threads = self._prefetch_threads()
+        threads = self._prefetch_threads(budget)
         avs_file.write(f'# Enable multi-threaded processing\n')
         avs_file.write(f'Prefetch({threads})\n')
     
@@ -4,25 +4,51 @@ Handles file queue management and file operations
 """
 
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from PySide6.QtCore import QObject, Signal
 
-from models.file_models import VideoFile, FileQueue, canonical_path
-from config import VIDEO_EXTENSIONS
-from utils.naturalsort import natural_key, path_key
+from config import PROBE_WORKERS, PROBE_WORKERS_WHILE_ENCODING
+from models.file_models import VideoFile, FileQueue, QueueDelta, canonical_path, FINISHED_STATES
+from utils.naturalsort import path_key
+from utils.file_utils import is_video_file
+from utils.folder_scan import FolderScan
+from utils.folder_watch import FolderWatch
+from utils.probe_pool import ProbePool
 
 
 class FileManager(QObject):
     """Manages the file queue and file operations"""
     
     # Signals
-    files_updated = Signal(list)  # List of VideoFile objects
+    queue_changed = Signal(object)  # QueueDelta describing the edit that was just made
     file_count_changed = Signal(int)  # Number of files in queue
     duplicates_skipped = Signal(list)  # Paths that were already queued (or repeated in the drop)
+    file_probed = Signal(object)  # VideoFile whose media fields were just filled (emitted from a probe thread)
+    scan_progress = Signal(int)  # Video files found so far by the folder scans in progress
+    scan_finished = Signal(int, bool)  # Files a folder scan added, whether it was cancelled
+    watch_changed = Signal(str, str)  # Watched folder ('' when none), how the watch started or why it stopped
+    # Folder scans and the folder watch report from their own threads; these are queued across to the GUI thread
+    _scan_batch = Signal(object, object)  # FolderScan, [(path, canonical path)]
+    _scan_done = Signal(object)  # FolderScan
+    _watch_ready = Signal(object, object)  # FolderWatch, [paths of files that stopped growing]
+    _watch_stopped = Signal(object, str)  # FolderWatch, reason
     
     def __init__(self):
         super().__init__()
         self.queue = FileQueue()
+        # Queued files are probed in the background; the signal is queued across to the GUI thread
+        self.prober = ProbePool(PROBE_WORKERS, on_probed=self.file_probed.emit)
+        self._scans: Dict[FolderScan, int] = {}  # scans in progress -> files added so far
+        self._scan_skipped: Dict[FolderScan, List[str]] = {}  # duplicates met by each scan, reported at its end
+        self._scan_batch.connect(self._on_scan_batch)
+        self._scan_done.connect(self._on_scan_done)
+        self.watch: Optional[FolderWatch] = None
+        # Canonical output paths of each queued file a run has named one for, and how many files claim each path;
+        # the folder watch checks new files against these instead of resolving every queued file's output again
+        self._outputs: Dict[VideoFile, Tuple[str, ...]] = {}
+        self._produced: Dict[str, int] = {}
+        self._watch_ready.connect(self._on_watch_ready)
+        self._watch_stopped.connect(self._on_watch_stopped)
     
     def add_files(self, filepaths: List[str]) -> int:
         """
@@ -30,82 +56,155 @@ class FileManager(QObject):
         A file counts as a duplicate if it is already queued *or* appears twice
         in the same batch — compared by resolved, case-normalized path, so
         `C:\\Video\\a.mkv`, `c:/video/A.MKV` and a symlink to it are all one file.
-        Returns number of files added.
+        Folders are expanded in the background (see scan_folders); their files arrive later and are
+        not part of the count. Returns number of files added.
         """
-        valid_files = []
-        skipped = []
-        seen = set()
-
-        def consider(candidate: str):
-            if not self._is_valid_video_file(candidate):
-                return
-            key = canonical_path(candidate)
-            if key in seen or self.queue.contains(candidate):
-                skipped.append(candidate)
-                return
-            seen.add(key)
-            valid_files.append(candidate)
-
+        candidates, folders = [], []
         for filepath in filepaths:
-            # Dropped folders: expand recursively to the video files they contain
             if os.path.isdir(filepath):
-                for root, dirs, entries in os.walk(filepath):
-                    dirs.sort(key=natural_key)
-                    for entry in sorted(entries, key=natural_key):
-                        consider(os.path.join(root, entry))
-                continue
-            consider(filepath)
-
-        if valid_files:
-            # Multi-selects arrive in OS selection order (often lexicographic:
-            # 1, 10, 2, 20) — order each added batch naturally instead
-            if len(valid_files) > 1:
-                valid_files.sort(key=path_key)
-            self.queue.add_files(valid_files)
-            self._emit_updates()
+                folders.append(filepath)
+            elif self._is_valid_video_file(filepath):
+                candidates.append(filepath)
+        if folders:
+            self.scan_folders(sorted(folders, key=path_key))
+
+        # Multi-selects arrive in OS selection order (often lexicographic:
+        # 1, 10, 2, 20) — order each added batch naturally instead
+        if len(candidates) > 1:
+            candidates.sort(key=path_key)
+        skipped = []
+        first = len(self.queue)
+        added = self.queue.add_files(candidates, duplicates=skipped)
+        if added:
+            self._emit_updates(QueueDelta.inserted(first, added))
+            self.prober.submit(added)
 
         if skipped:
             self.duplicates_skipped.emit(skipped)
 
-        return len(valid_files)
+        return len(added)
     
-    def add_folder(self, folder_path: str) -> int:
+    def add_folder(self, folder_path: str) -> bool:
         """
-        Add all video files from a folder (recursive, natural order)
-        Returns number of files added
+        Add all video files from a folder (recursive, natural order) in the background
+        Returns whether a scan was started
         """
         if not os.path.isdir(folder_path):
-            return 0
-        return self.add_files([folder_path])
+            return False
+        self.scan_folders([folder_path])
+        return True
+
+    def scan_folders(self, folders: List[str]) -> FolderScan:
+        """
+        Expand folders to their video files on a scan thread. Files are appended directory by directory as the
+        walk reaches them, with scan_progress counting what was found and scan_finished closing the scan.
+        """
+        scan = FolderScan(folders, on_batch=lambda pairs, found: self._scan_batch.emit(scan, pairs),
+                          on_done=lambda found, cancelled: self._scan_done.emit(scan))
+        self._scans[scan] = 0
+        self._scan_skipped[scan] = []
+        self.scan_progress.emit(self._scan_found())
+        scan.start()
+        return scan
+
+    def cancel_scan(self):
+        """Stop all folder scans in progress; files they already added stay queued"""
+        for scan in self._scans:
+            scan.cancel()
+
+    def is_scanning(self) -> bool:
+        return bool(self._scans)
     
+    def restore_files(self, paths: List[str], keys: List[str], states: Dict[str, str]) -> int:
+        """
+        Put back a queue saved in the run journal: paths with their canonical keys (no path resolution, so tens of
+        thousands of entries come back at once) and each file's last state. Files that were running count as
+        unfinished; encoded and skipped ones are done, and a resumed run passes them over. Returns number of files
+        added.
+        """
+        first = len(self.queue)
+        added = self.queue.add_files(paths, keys=keys)
+        for file in added:
+            state = states.get(file.canonical)
+            if state in FINISHED_STATES or state == 'failed':
+                file.status = state
+        if added:
+            self._emit_updates(QueueDelta.inserted(first, added))
+            self.prober.submit(added)
+        return len(added)
+
+    def watch_folder(self, folder: str) -> bool:
+        """
+        Queue video files that appear in *folder* from now on, once they have finished copying. They go through
+        add_files like a drop, so a running queue picks them up. Replaces the current watch, if any.
+        """
+        if not os.path.isdir(folder):
+            return False
+        self.stop_watch()
+        watch = FolderWatch(folder, on_ready=lambda paths: self._watch_ready.emit(watch, paths),
+                            on_stopped=lambda reason: self._watch_stopped.emit(watch, reason))
+        self.watch = watch
+        watch.start()
+        self.watch_changed.emit(watch.folder, f"watching {watch.folder} ({watch.mode})")
+        return True
+
+    def stop_watch(self):
+        """Stop the folder watch; files already queued stay"""
+        if self.watch:
+            self.watch.stop()
+            folder, self.watch = self.watch.folder, None
+            self.watch_changed.emit('', f"stopped watching {folder}")
+
+    def note_output(self, file: Optional[VideoFile]):
+        """
+        A run named the output of a queued file: the folder watch must not queue that output, nor the copy of the
+        original that oversize_copy leaves under the output name when the encode is abandoned
+        """
+        if file is None or not file.output_name:
+            return
+        keys = (canonical_path(file.get_full_output_path()), canonical_path(file.get_kept_original_path()))
+        keys = tuple(key for key in dict.fromkeys(keys) if key != file.canonical)
+        if self._outputs.get(file) == keys:
+            return
+        self._forget_outputs([file])
+        self._outputs[file] = keys
+        for key in keys:
+            self._produced[key] = self._produced.get(key, 0) + 1
+
     def remove_files(self, indices: List[int]) -> int:
         """
         Remove files at specified indices
         Returns number of files removed
         """
-        removed_count = 0
-        
-        # Sort indices in reverse order to avoid index shifting
-        for index in sorted(indices, reverse=True):
-            if self.queue.remove_at_index(index):
-                removed_count += 1
+        removed = self.queue.remove_indices(indices)
+        removed_count = len(removed)
+        self.prober.discard(removed)
+        self._forget_outputs(removed)
         
         if removed_count > 0:
-            self._emit_updates()
+            # Removed entries keep the index they had, which is exactly what the delta needs
+            self._emit_updates(QueueDelta.removed([file.index for file in removed]))
         
         return removed_count
     
     def remove_file_by_path(self, filepath: str) -> bool:
         """Remove a specific file by its path"""
-        if self.queue.remove_file(filepath):
-            self._emit_updates()
+        file = self.queue.get(filepath)
+        if file and self.queue.remove_at_index(file.index):
+            self.prober.discard([file])
+            self._forget_outputs([file])
+            self._emit_updates(QueueDelta.removed([file.index]))
             return True
         return False
     
     def clear_queue(self):
         """Clear all files from the queue"""
+        self.cancel_scan()
+        self.prober.discard()
+        self._outputs.clear()
+        self._produced.clear()
         self.queue.clear()
-        self._emit_updates()
+        self._emit_updates(QueueDelta.reset([]))
     
     def get_queue(self) -> List[VideoFile]:
         """Get all files in the queue"""
@@ -126,15 +225,32 @@ class FileManager(QObject):
         return bool(self.queue)
     
     def move_file(self, from_index: int, to_index: int) -> bool:
-        """Move a file within the queue (list drag-and-drop reordering)"""
-        files = self.queue.files
-        if not (0 <= from_index < len(files) and 0 <= to_index < len(files)) or from_index == to_index:
+        """Move a file within the queue"""
+        if not self.queue.move(from_index, to_index):
+            return False
+        self._emit_updates(QueueDelta.moved([from_index], to_index))
+        return True
+
+    def move_files(self, indices: List[int], to_index: int) -> bool:
+        """Move files as a block so the first lands at to_index (list drag-and-drop reordering)"""
+        indices = sorted({i for i in indices if 0 <= i < len(self.queue)})
+        if not indices:
             return False
-        files.insert(to_index, files.pop(from_index))
-        self.queue._reindex()
-        self._emit_updates()
+        self.queue.move_indices(indices, to_index)
+        self._emit_updates(QueueDelta.moved(indices, to_index))
         return True
 
+    def set_encoding(self, encoding: bool):
+        """Throttle background probing while a run is encoding, so it never competes with the encode"""
+        self.prober.set_limit(PROBE_WORKERS_WHILE_ENCODING if encoding else PROBE_WORKERS)
+
+    def shutdown(self):
+        """Stop background probing, folder scans and the folder watch (application exit)"""
+        self.cancel_scan()
+        if self.watch:
+            self.watch.stop()
+        self.prober.close()
+
     def get_total_size_mb(self) -> float:
         """Get total size of all files in queue (MB)"""
         total_size = 0
@@ -144,13 +260,52 @@ class FileManager(QObject):
     
     def _is_valid_video_file(self, filepath: str) -> bool:
         """Check if file is a valid video file"""
-        if not os.path.isfile(filepath):
-            return False
-        
-        ext = os.path.splitext(filepath)[1].lower()
-        return ext in VIDEO_EXTENSIONS
+        return is_video_file(filepath)
     
-    def _emit_updates(self):
+    def _on_scan_batch(self, scan: FolderScan, pairs):
+        """One or more scanned directories' files, in walk order: append them like a drop would"""
+        if scan not in self._scans or scan.cancelled:
+            return
+        first = len(self.queue)
+        added = self.queue.add_files([path for path, _ in pairs], duplicates=self._scan_skipped[scan],
+                                     keys=[key for _, key in pairs])
+        if added:
+            self._scans[scan] += len(added)
+            self._emit_updates(QueueDelta.inserted(first, added))
+            self.prober.submit(added)
+        self.scan_progress.emit(self._scan_found())
+
+    def _on_scan_done(self, scan: FolderScan):
+        added = self._scans.pop(scan, 0)
+        skipped = self._scan_skipped.pop(scan, [])
+        if skipped:
+            self.duplicates_skipped.emit(skipped)
+        self.scan_finished.emit(added, scan.cancelled)
+
+    def _on_watch_ready(self, watch: FolderWatch, paths: List[str]):
+        """Files in the watched folder stopped growing: queue the ones that are neither queued nor our outputs"""
+        if watch is not self.watch:
+            return
+        fresh = [p for p in paths if not self.queue.contains(p) and canonical_path(p) not in self._produced]
+        if fresh:
+            self.add_files(fresh)
+
+    def _on_watch_stopped(self, watch: FolderWatch, reason: str):
+        if watch is self.watch:
+            self.watch = None
+            self.watch_changed.emit('', f"stopped watching {watch.folder}: {reason}")
+
+    def _forget_outputs(self, files: List[VideoFile]):
+        for file in files:
+            for key in self._outputs.pop(file, ()):
+                left = self._produced.pop(key) - 1
+                if left:
+                    self._produced[key] = left
+
+    def _scan_found(self) -> int:
+        return sum(scan.found for scan in self._scans)
+
+    def _emit_updates(self, delta: QueueDelta):
         """Emit signals to notify about queue changes"""
-        self.files_updated.emit(self.queue.get_all())
+        self.queue_changed.emit(delta)
         self.file_count_changed.emit(len(self.queue))
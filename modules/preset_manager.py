@@ -9,7 +9,7 @@ from typing import Dict, Any, List, Optional
 from PySide6.QtCore import QObject
 from PySide6.QtWidgets import QInputDialog, QMessageBox, QFileDialog
 
-from config import QUALITY_PRESETS, DEFAULT_SETTINGS, DEFAULTS_FILE, APP_VERSION
+from config import QUALITY_PRESETS, DEFAULT_SETTINGS, DEFAULTS_FILE, APP_VERSION, DEFAULT_OVERSIZE_PERCENT
 
 
 class PresetManager(QObject):
@@ -153,6 +153,12 @@ class PresetManager(QObject):
             ui.controls['abr'].setValue(settings['abr'])
         if 'threads' in settings:
             ui.controls['threads'].setValue(settings['threads'])
+        if 'workers' in settings:
+            ui.controls['workers'].setValue(int(settings['workers'] or 1))
+        if 'chunk_jobs' in settings:
+            ui.controls['chunk_jobs'].setValue(int(settings['chunk_jobs'] or 1))
+        if 'oversize_percent' in settings:
+            ui.controls['oversize_percent'].setValue(int(settings['oversize_percent'] or DEFAULT_OVERSIZE_PERCENT))
         
         # Combo boxes
         if 'preset' in settings:
@@ -216,7 +222,8 @@ class PresetManager(QObject):
             'stereo', 'deinterlace', 'tff', 'reduce_fps',
             'use_avisynth', 'use_ffms2', 'transcode_video',
             'transcode_audio', 'corrupt_fix', 'replace_files', 'delete_source',
-            'calculate_vmaf', 'no_upscale'
+            'calculate_vmaf', 'no_upscale', 'chunked', 'skip_encoded', 'resumable',
+            'abort_oversize', 'oversize_copy'
         ]
         
         for field in checkbox_fields:
@@ -0,0 +1,158 @@
+"""
+Queue list model for videer
+Shows the FileQueue in a QListView without rebuilding it: row-level inserts, removals, moves and changes
+"""
+
+from typing import Any, Dict, List, Optional
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QSize
+from PySide6.QtGui import QBrush, QColor
+
+from models.file_models import VideoFile, QueueDelta
+from modules.process_manager import format_duration
+
+
+class QueueListModel(QAbstractListModel):
+    """
+    A mirror of the FileManager's queue, kept in step by replaying each QueueDelta.
+
+    The view only asks for the rows it shows, so a file's size (a stat that may go to a network share) is looked up
+    the first time its row is painted and cached until the file finishes.
+    """
+
+    _STATE_COLORS = {
+        'running': QColor(255, 244, 179),   # soft yellow
+        'success': QColor(200, 240, 200),   # soft green
+        'failed': QColor(250, 200, 200),    # soft red
+        'skipped': QColor(225, 225, 225),   # light grey
+    }
+    _STATE_GLYPHS = {
+        'running': '▶  ',
+        'success': '✔  ',
+        'failed': '✖  ',
+        'skipped': '↷  ',
+    }
+    _ROW_SIZE = QSize(0, 32)
+    # Removing more separate runs of rows than this is announced as a single layout change
+    _MAX_REMOVE_RUNS = 16
+
+    def __init__(self, files: Optional[List[VideoFile]] = None, parent=None):
+        super().__init__(parent)
+        self._files: List[VideoFile] = list(files or [])
+        self._sizes: Dict[int, float] = {}      # id(file) -> MB
+
+    # ---- Qt model interface ------------------------------------------------
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._files)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid() or not 0 <= index.row() < len(self._files):
+            return None
+        file = self._files[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._STATE_GLYPHS.get(file.status, '') + self._label(file)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{file.filepath}\n{file.describe_media()}" if file.probed else file.filepath
+        if role == Qt.ItemDataRole.BackgroundRole:
+            color = self._STATE_COLORS.get(file.status)
+            return QBrush(color) if color else None
+        if role == Qt.ItemDataRole.SizeHintRole:
+            return self._ROW_SIZE
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.ItemFlag.ItemIsDropEnabled
+        return (Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsDragEnabled)
+
+    def supportedDropActions(self) -> Qt.DropAction:
+        return Qt.DropAction.MoveAction | Qt.DropAction.CopyAction
+
+    # ---- queue edits -----------------------------------------------------------
+    def apply_delta(self, delta: QueueDelta):
+        """Replay one FileManager edit with the matching row notifications"""
+        root = QModelIndex()
+        if delta.kind == QueueDelta.INSERT and delta.files:
+            self.beginInsertRows(root, delta.first, delta.first + len(delta.files) - 1)
+            delta.apply(self._files)
+            self.endInsertRows()
+        elif delta.kind == QueueDelta.REMOVE:
+            for file in (self._files[i] for i in delta.indices if i < len(self._files)):
+                self._sizes.pop(id(file), None)
+            runs = delta.runs()
+            if len(runs) > self._MAX_REMOVE_RUNS:
+                self._relayout(delta)
+                return
+            for run in runs:
+                self.beginRemoveRows(root, run.start, run.stop - 1)
+                del self._files[run.start:run.stop]
+                self.endRemoveRows()
+        elif delta.kind == QueueDelta.MOVE:
+            self._move(delta)
+        elif delta.kind == QueueDelta.RESET:
+            self.beginResetModel()
+            delta.apply(self._files)
+            self._sizes.clear()
+            self.endResetModel()
+
+    def _move(self, delta: QueueDelta):
+        runs = delta.runs()
+        if len(runs) == 1:
+            run = runs[0]
+            rest = len(self._files) - len(run)
+            position = max(0, min(delta.to_index, rest))
+            destination = position if position <= run.start else position + len(run)
+            if run.start <= destination <= run.stop:
+                return      # already there
+            self.beginMoveRows(QModelIndex(), run.start, run.stop - 1, QModelIndex(), destination)
+            delta.apply(self._files)
+            self.endMoveRows()
+            return
+        self._relayout(delta)
+
+    def _relayout(self, delta: QueueDelta):
+        """
+        Apply a scattered edit (rows from all over the list) as one layout change, with the selection and current
+        row carried along, instead of one notification per contiguous run of rows
+        """
+        self.layoutAboutToBeChanged.emit()
+        old_rows = {id(file): row for row, file in enumerate(self._files)}
+        delta.apply(self._files)
+        new_rows = {old_rows[id(file)]: row for row, file in enumerate(self._files)}
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent, [self.index(new_rows[i.row()]) if i.row() in new_rows else QModelIndex() for i in persistent])
+        self.layoutChanged.emit()
+
+    # ---- row refreshes -----------------------------------------------------------
+    def file_at(self, row: int) -> Optional[VideoFile]:
+        return self._files[row] if 0 <= row < len(self._files) else None
+
+    def row_of(self, file: VideoFile) -> Optional[int]:
+        """Row of a file: its queue index when that still matches, otherwise a search"""
+        if 0 <= file.index < len(self._files) and self._files[file.index] is file:
+            return file.index
+        return next((row for row, f in enumerate(self._files) if f is file), None)
+
+    def refresh_row(self, row: int, size_changed: bool = False):
+        """Repaint one row after its file changed (state, VMAF, probe results)"""
+        file = self.file_at(row)
+        if file is None:
+            return
+        if size_changed:
+            self._sizes.pop(id(file), None)
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def _label(self, file: VideoFile) -> str:
+        size = self._sizes.get(id(file))
+        if size is None:
+            size = self._sizes[id(file)] = file.get_file_size_mb()
+        label = f"{file.filename} ({size:.1f} MB)"
+        if file.probed:
+            media = [f"{file.width}x{file.height}" if file.width and file.height else None,
+                     file.codec, format_duration(file.duration) if file.duration else None]
+            label += " | " + " · ".join(part for part in media if part)
+        if file.vmaf_score is not None:
+            label += f" | VMAF: {file.vmaf_score:.1f}"
+        return label
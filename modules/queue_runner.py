@@ -0,0 +1,1742 @@
+"""
+Queue runner for videer
+The encoding engine without the GUI: claims files from a shared queue, runs and supervises FFmpeg, and reports
+through plain callbacks. ProcessManager drives it from a QThread; the command-line runner drives it directly.
+Nothing here may import Qt.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+import re
+import psutil
+import shlex
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from typing import List, Dict, Any, Optional, Callable, Tuple, Set, NamedTuple
+
+from models.file_models import VideoFile, QueueDelta, FINISHED_STATES
+from utils.ffmpeg_utils import FFmpegCommandBuilder, probe_media, probe_has_audio, probe_keyframes
+from modules.avisynth_handler import AviSynthHandler
+from utils.file_utils import FileOperations
+from utils.cpu_budget import CpuBudget, ThreadShare
+from utils.probe_cache import get_probe_cache
+from utils.encode_manifest import get_encode_manifest, settings_fingerprint, source_fingerprint
+from utils.process_supervisor import ProcessSupervisor, Watch, EXITED, STALLED, STUCK, WEDGED
+from utils import childproc
+from config import (CONTAINER_VIDEO_CODECS, CONTAINER_AUDIO_CODECS, MAX_THREADS, CHUNK_TARGET_SECONDS,
+                    CHUNK_MIN_DURATION, DEFAULT_CHUNK_JOBS, PIPELINE_BUFFER, HEADWAY_MIN_SECONDS, HEADWAY_FACTOR,
+                    DEFAULT_OVERSIZE_PERCENT, OVERSIZE_MIN_PROGRESS, OVERSIZE_MARGIN)
+
+
+# FFmpeg run with -progress pipe:1 reports continuously while it is working. Total silence for this long means
+# the step is wedged (a known AviSynth+ MT failure mode), not slow — kill it rather than let it hold the queue
+# and the CPU forever. Generous on purpose: a false positive costs the user an encode. It is also how long a step
+# may take to make its first headway; after that the much shorter headway deadline (see _Headway) applies.
+STALL_TIMEOUT = 30 * 60
+
+# How long to let a process linger after it has closed its output before killing it.
+EXIT_TIMEOUT = 60
+
+
+class _Headway:
+    """
+    Whether one FFmpeg step is getting anywhere, judged from its -progress blocks: it advances when out_time, frame
+    or total_size passes the furthest value seen. Each advance tells the watch, with a deadline that adapts to the
+    pace of this step: HEADWAY_FACTOR times the longest wait between two advances so far, between
+    HEADWAY_MIN_SECONDS and STALL_TIMEOUT. Runs on the supervisor's loop.
+    """
+
+    FIELDS = ('out_time_us', 'frame', 'total_size')
+
+    def __init__(self, runner: 'QueueRunner'):
+        self.watch: Optional[Watch] = None      # set once supervised; the first blocks may arrive before that
+        self.timeout: float = STALL_TIMEOUT
+        self._runner = runner
+        self._furthest = [0.0] * len(self.FIELDS)
+        self._last: Optional[float] = None
+        self._pauses = 0
+        self._longest = 0.0
+
+    def block(self, block: Dict[str, str]):
+        advanced = False
+        for n, key in enumerate(self.FIELDS):
+            value = QueueRunner._to_float(block.get(key))
+            if value is not None and value > self._furthest[n]:
+                self._furthest[n] = value
+                advanced = True
+        if not advanced or self.watch is None:
+            return
+        now = time.monotonic()
+        pauses = self._runner._pauses
+        if self._last is not None and pauses == self._pauses:   # a wait that spans a pause says nothing of the pace
+            self._longest = max(self._longest, now - self._last)
+        self._last, self._pauses = now, pauses
+        self.timeout = min(STALL_TIMEOUT, max(HEADWAY_MIN_SECONDS, HEADWAY_FACTOR * self._longest))
+        self.watch.headway(self.timeout)
+
+
+class QueueWork(NamedTuple):
+    """The work of a run in media seconds; a file of unknown duration counts as `typical`"""
+    done: float         # finished files, plus the finished part of running ones
+    pending: float      # files no worker has claimed yet
+    total: float
+    typical: float      # mean of the known durations (1.0 when none is known, which reduces to counting files)
+
+
+class RunQueue:
+    """
+    The files of one run and the claim cursor the workers pull from (thread-safe).
+
+    The claim cursor — not anything a GUI tracks through queued slots — is the authority for where the queue
+    may be edited: a GUI-side index is written by a queued slot, so any modal dialog freezes it, and splicing
+    against a stale value pushes already-encoded files back into the pending tail to be encoded a second time.
+    """
+
+    def __init__(self, files: Optional[List[VideoFile]] = None):
+        self._lock = threading.RLock()       # reentrant: held() wraps a GUI edit whose delta comes back here
+        self._files: List[VideoFile] = list(files or [])
+        self._next_index = 0                 # claim cursor: everything below it is running or done
+        self._in_flight: Set[int] = set()
+        self._reserved: Set[int] = set()     # claimed ahead by the prepare stage, no encoder has started them yet
+        self._resume = False                 # skip files a previous run already finished
+        self._passed: Set[int] = set()       # ... and the ones it did skip
+        # Media seconds for work(), kept up to date as files are added, removed, probed and finished, so that a
+        # progress update costs the files in flight rather than the whole queue. By id(file): 0.0 = not known.
+        self._seconds: Dict[int, float] = {}
+        self._known = 0.0                    # sum of the known durations ...
+        self._known_count = 0                # ... over this many files
+        self._done: Set[int] = set()         # files finished (or passed over by a resumed run)
+        self._done_known = 0.0
+        self._done_unknown = 0
+        self._track_all()
+
+    def reset(self, files: List[VideoFile], resume: bool = False):
+        """
+        Start over with a new list (nothing claimed yet). With resume, files a restored run already finished
+        (status 'success' or 'skipped') are passed over, so the run continues from the first unfinished file.
+        """
+        with self._lock:
+            self._files = list(files)
+            self._next_index = 0
+            self._in_flight = set()
+            self._reserved = set()
+            self._resume = resume
+            self._passed = set()
+            self._track_all()
+
+    def _track_all(self):
+        self._seconds, self._known, self._known_count = {}, 0.0, 0
+        self._done, self._done_known, self._done_unknown = set(), 0.0, 0
+        for file in self._files:
+            self._track(file)
+            if self._resume and file.status in FINISHED_STATES:
+                self._settle(file)
+
+    def _track(self, file: VideoFile):
+        seconds = file.duration if file.duration and file.duration > 0 else 0.0
+        self._seconds[id(file)] = seconds
+        if seconds:
+            self._known += seconds
+            self._known_count += 1
+
+    def _untrack(self, file: VideoFile):
+        seconds = self._seconds.pop(id(file), None)
+        if seconds is None:
+            return
+        if seconds:
+            self._known -= seconds
+            self._known_count -= 1
+        if id(file) in self._done:
+            self._done.discard(id(file))
+            if seconds:
+                self._done_known -= seconds
+            else:
+                self._done_unknown -= 1
+
+    def _settle(self, file: VideoFile):
+        seconds = self._seconds.get(id(file))
+        if seconds is None or id(file) in self._done:
+            return
+        self._done.add(id(file))
+        if seconds:
+            self._done_known += seconds
+        else:
+            self._done_unknown += 1
+
+    def note_probed(self, file: VideoFile):
+        """A file's duration became known (a probe finished, on any thread): count it from now on"""
+        with self._lock:
+            if id(file) not in self._seconds:
+                return
+            done = id(file) in self._done
+            self._untrack(file)
+            self._track(file)
+            if done:
+                self._settle(file)
+
+    def claim_next(self) -> Optional[Tuple[int, VideoFile]]:
+        """Called from a worker thread to take the next pending file: (index, file), or None when nothing is left."""
+        with self._lock:
+            if self._resume:
+                while (self._next_index < len(self._files)
+                       and self._files[self._next_index].status in FINISHED_STATES):
+                    self._passed.add(self._next_index)
+                    self._next_index += 1
+            if self._next_index >= len(self._files):
+                return None
+            index = self._next_index
+            self._next_index += 1
+            self._in_flight.add(index)
+            self._reserved.add(index)
+            return index, self._files[index]
+
+    def commit(self, index: int):
+        """An encoder took the claimed file, or it was settled while preparing: it can no longer be handed back"""
+        with self._lock:
+            self._reserved.discard(index)
+
+    def hand_back(self, first: int) -> List[int]:
+        """
+        Undo the claims from `first` on, so the GUI can remove or move those files: only possible while no encoder
+        has started any of them (files a resumed run passes over are not claims). Returns the indices given back.
+        """
+        with self._lock:
+            span = range(max(0, first), self._next_index)
+            if not span or any(i not in self._reserved and i not in self._passed for i in span):
+                return []
+            given = [i for i in span if i in self._reserved]
+            self._next_index = span.start
+            self._reserved.difference_update(given)
+            self._in_flight.difference_update(given)
+            self._passed.difference_update(span)
+            return given
+
+    def work(self, fractions: Dict[int, float]) -> QueueWork:
+        """
+        How far the run is, weighted by duration: finished files count whole, running ones by their fraction in
+        `fractions` (index -> 0..1), unclaimed ones not at all (except those a resumed run will pass over). A
+        three-hour film is worth ninety two-minute clips, not one. Files not probed yet count as the typical
+        (mean known) duration. Costs the files in flight: the queue-wide sums are kept as it changes.
+        """
+        with self._lock:
+            typical = self._known / self._known_count if self._known_count else 1.0
+            total = self._known + (len(self._files) - self._known_count) * typical
+            finished = self._done_known + self._done_unknown * typical
+            done, running = finished, 0.0
+            for index in self._in_flight:
+                seconds = self._seconds.get(id(self._files[index])) or typical
+                running += seconds
+                done += seconds * max(0.0, min(1.0, fractions.get(index, 0.0)))
+        return QueueWork(done, max(0.0, total - finished - running), total, typical)
+
+    def release_index(self, index: int):
+        """Called from a worker thread once it is completely done with a claimed file."""
+        with self._lock:
+            self._in_flight.discard(index)
+            if index < len(self._files):
+                self._settle(self._files[index])
+
+    def apply_delta(self, delta: QueueDelta) -> bool:
+        """
+        Replay an edit of the UI queue on the not-yet-claimed tail, in place (handles files added, removed and
+        moved while encoding). Files that any worker has claimed — running or finished — are never touched: the
+        parts of an edit that would reach them are refused, and False is returned so the caller can say so.
+        """
+        with self._lock:
+            keep = self._next_index
+            files = self._files
+            if delta.kind == QueueDelta.INSERT:
+                first = max(keep, min(delta.first, len(files)))
+                files[first:first] = delta.files
+                for file in delta.files:
+                    self._track(file)
+                return first == delta.first
+            if delta.kind == QueueDelta.REMOVE:
+                pending = [i for i in delta.indices if keep <= i < len(files)]
+                if pending:
+                    for i in pending:
+                        self._untrack(files[i])
+                    QueueDelta.removed(pending).apply(files)
+                return len(pending) == len(delta.indices)
+            if delta.kind == QueueDelta.MOVE:
+                moving = [i for i in delta.indices if i < len(files)]
+                if not moving or moving[0] < keep or delta.to_index < keep:
+                    return False
+                delta.apply(files)
+                return True
+            if delta.kind == QueueDelta.RESET:
+                self._replace_tail(delta.files[keep:])
+                return len(delta.files) >= keep
+            return False
+
+    def resync(self, files: List[VideoFile]) -> bool:
+        """
+        Make the pending tail match the UI queue again after apply_delta refused part of an edit, so the next
+        deltas and the per-index state reports land on the right files. Claimed files stay where they are; the
+        tail becomes the UI's files that are not among them, in the UI's order. Returns whether the two lists
+        are now the same row for row (False if the UI no longer has the claimed files where the run does).
+        """
+        with self._lock:
+            keep = self._next_index
+            claimed = self._files[:keep]
+            if len(files) >= keep and all(ui is run for ui, run in zip(files, claimed)):
+                self._replace_tail(files[keep:])
+                return True
+            taken = {id(file) for file in claimed}
+            self._replace_tail([file for file in files if id(file) not in taken])
+            return False
+
+    def _replace_tail(self, tail: List[VideoFile]):
+        """Swap the unclaimed files for `tail` (a file in both keeps what is known of it)"""
+        keep = self._next_index
+        for file in self._files[keep:]:
+            self._untrack(file)
+        self._files[keep:] = tail
+        for file in tail:
+            self._track(file)
+            if self._resume and file.status in FINISHED_STATES:
+                self._settle(file)
+
+    def held(self) -> threading.RLock:
+        """
+        The queue's lock, for a GUI edit to hold while it checks current_file_index and changes the list: no
+        worker can claim a file in between, so an edit judged safe is still safe when its delta arrives.
+        """
+        return self._lock
+
+    def get_file_at(self, index: int) -> Optional[VideoFile]:
+        """Retrieve file at index, or None if out of range."""
+        with self._lock:
+            return self._files[index] if index < len(self._files) else None
+
+    def get_total_file_count(self) -> int:
+        with self._lock:
+            return len(self._files)
+
+    def get_pending_count(self) -> int:
+        """Files no worker has claimed yet."""
+        with self._lock:
+            return max(0, len(self._files) - self._next_index)
+
+    @property
+    def current_file_index(self) -> int:
+        """
+        Highest index an encoder has taken or that is settled — safe to compare removal indices against. Files
+        claimed ahead above it can still be handed back (see hand_back).
+        """
+        with self._lock:
+            index = self._next_index - 1
+            while index in self._reserved:
+                index -= 1
+            return index
+
+    @property
+    def running_indices(self) -> List[int]:
+        """Indices currently being processed, in queue order."""
+        with self._lock:
+            return sorted(self._in_flight)
+
+
+class RunnerEvents:
+    """
+    What a QueueRunner reports. Every method is called on a worker thread; the defaults do nothing.
+    The GUI forwards them to Qt signals, the command-line runner prints them as JSON lines.
+    """
+
+    def progress(self, snapshot: Dict[str, Any]):
+        """Structured progress snapshot of one running file"""
+
+    def info(self, message: str):
+        """Human-readable notice"""
+
+    def file_started(self, index: int):
+        pass
+
+    def file_finished(self, index: int, success: bool):
+        pass
+
+    def file_skipped(self, index: int, output: str):
+        """
+        The file was not encoded: the manifest has an output of this source with these settings, or the encode
+        was abandoned as oversize and `output` is the kept original (or its copy)
+        """
+
+    def vmaf_calculated(self, index: int, score: float):
+        pass
+
+    def finished(self, success_count: int, total_count: int):
+        """The run is over, on every exit path"""
+
+
+class _Job:
+    """
+    One file in flight. Everything the worker used to keep on the thread for "the current file" — the child
+    processes and their psutil handles, the file and phase clocks — lives here instead, so that several files
+    can be encoded at the same time, each with its own supervision, pause/stop handling and ETA. A chunked
+    encode runs several children for one file at once.
+    """
+
+    def __init__(self, index: int, file: VideoFile):
+        self.index = index
+        self.file = file
+        self.processes: Dict[subprocess.Popen, Optional[psutil.Process]] = {}
+        self.file_start: float = time.time()
+        self.phase_start: Optional[float] = None
+        self.eta_file: Optional[float] = None
+        self.fraction = 0.0                          # of the step now running, for the run's overall progress
+        self.encode_start: Optional[float] = None    # when an encoder took the file, and how long it held it
+        self.encode_seconds: Optional[float] = None
+        self.share: Optional[ThreadShare] = None     # CPU slice held by the step now running
+        self.source: Optional[str] = None            # source fingerprint, taken before anything touched the file
+        self.source_size: Optional[int] = None
+        self.abort: Optional[str] = None             # why the encode was abandoned (abort_oversize)
+        self.paths: Set[str] = set()                 # what processing it writes; see QueueRunner._admit
+        self.cancelled = False                       # handed back to the queue before an encoder took it
+
+
+class _ChunkProgress:
+    """
+    Folds the -progress blocks of chunks encoding side by side into one block for the whole file, so the
+    usual snapshot/ETA code sees a single encode: position is the media time finished across all chunks,
+    speed and fps are the sums over the chunks running right now.
+    """
+
+    def __init__(self, lengths: List[float]):
+        self._lengths = lengths
+        self._done = [0.0] * len(lengths)
+        self._sizes = [0.0] * len(lengths)
+        self._frames = [0] * len(lengths)
+        self._rates: Dict[int, Tuple[float, float]] = {}   # running chunk -> (speed, fps)
+        self._lock = threading.Lock()
+        self._last_emit = 0.0
+        self.threads = 0                                    # budget held by the running chunks
+
+    def update(self, n: int, block: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """Record one chunk's block; returns the combined block when one is due (throttled)"""
+        us = QueueRunner._to_float(block.get('out_time_us') or block.get('out_time_ms'))
+        speed = QueueRunner._to_float((block.get('speed') or '').rstrip('x')) or 0.0
+        fps = QueueRunner._to_float(block.get('fps')) or 0.0
+        with self._lock:
+            if us is not None:
+                self._done[n] = max(0.0, min(self._lengths[n], us / 1_000_000.0))
+            self._sizes[n] = QueueRunner._to_float(block.get('total_size')) or self._sizes[n]
+            try:
+                self._frames[n] = int(block.get('frame') or self._frames[n])
+            except ValueError:
+                pass
+            if block.get('progress') == 'end':
+                self._done[n] = self._lengths[n]
+                self._rates.pop(n, None)
+            else:
+                self._rates[n] = (speed, fps)
+            now = time.time()
+            if now - self._last_emit < 0.25:
+                return None
+            self._last_emit = now
+            return self._combined()
+
+    def complete(self, n: int, size: float):
+        """Chunk n was finished by an earlier, interrupted attempt"""
+        with self._lock:
+            self._done[n] = self._lengths[n]
+            self._sizes[n] = size
+
+    def hold(self, threads: int):
+        """A chunk took (or, negative, gave back) this many threads of the budget"""
+        with self._lock:
+            self.threads += threads
+
+    def _combined(self) -> Dict[str, str]:
+        return {
+            'out_time_us': str(int(sum(self._done) * 1_000_000)),
+            'speed': f"{sum(rate[0] for rate in self._rates.values()):.3f}x",
+            'fps': f"{sum(rate[1] for rate in self._rates.values()):.2f}",
+            'total_size': str(int(sum(self._sizes))),
+            'frame': str(sum(self._frames)),
+            'progress': 'continue',
+        }
+
+
+class QueueRunner:
+    """
+    Processes a RunQueue: claims files, encodes them (several at once with 'workers' > 1) and reports through
+    RunnerEvents. Preparing, encoding and finishing a file are pipelined stages, so they overlap across files.
+    run() blocks until the queue is drained or stopped; stop/pause/resume may be called from any other thread.
+    """
+
+    # Pre-compiled regex patterns
+    _DURATION_RE = re.compile(r'Duration: (\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?')
+    _VMAF_RE = re.compile(r'VMAF score\s*[:=]\s*([\d.]+)', re.IGNORECASE)
+    _ERROR_KEYWORDS = ("error", "invalid", "failed")
+
+    def __init__(self, queue: 'RunQueue', settings: Dict[str, Any], events: Optional['RunnerEvents'] = None):
+        self._queue = queue
+        self.events = events or RunnerEvents()
+        self.settings = settings
+        self.should_stop = False
+        self._stop_requested: Optional[float] = None    # time.monotonic() of the first stop()
+        self.paused = False
+        self._unpaused = threading.Event()          # the pause gate: set while running, and once stopped
+        self._unpaused.set()
+        self._pause_started: Optional[float] = None
+        self._pauses = 0                            # pauses so far; see _Headway
+        self.start_time: Optional[float] = None
+        self.success_count = 0
+        self.skipped_count = 0
+        self.oversize_count = 0
+
+        # How many files are encoded at once. Each worker claims the next pending file from the shared queue.
+        try:
+            self.workers = max(1, int(settings.get('workers') or 1))
+        except (TypeError, ValueError):
+            self.workers = 1
+
+        # Files in flight, by queue index. Guarded by _lock together with the counters below: the workers,
+        # the GUI thread (pause/stop) and every progress emission read them.
+        self._jobs: Dict[int, _Job] = {}
+        self._lock = threading.Lock()
+        self._retired = threading.Condition(self._lock)     # a job left _jobs, or an abandoned one was dropped
+        self._abandoned: List[_Job] = []            # handed back, intermediates not removed yet
+
+        # Timing bookkeeping for ETA: (duration, seconds an encoder spent on it) of each file encoded so far
+        self._completed: List[Tuple[Optional[float], float]] = []
+
+        # The 'threads' setting is the budget for the whole run, split across whatever runs at once
+        try:
+            budget = int(settings.get('threads') or 0)
+        except (TypeError, ValueError):
+            budget = 0
+        self.cpu_budget = CpuBudget(budget if budget > 0 else MAX_THREADS, slots=self.workers)
+
+        self.command_builder = FFmpegCommandBuilder(settings)
+        self.avisynth_handler = AviSynthHandler(settings) if settings.get('use_avisynth') else None
+        self.file_ops = FileOperations()
+
+        # One event loop reads the output of every FFmpeg this run starts and keeps their deadlines
+        self.supervisor = ProcessSupervisor()
+
+        # Successful encodes are recorded by source fingerprint and job hash; with skip_encoded a file whose
+        # recorded output still exists is passed over
+        self.manifest = get_encode_manifest()
+        self.job_hash = settings_fingerprint(settings)
+        self.skip_encoded = bool(settings.get('skip_encoded'))
+
+        # An encode whose output is going to be larger than this share of its source is abandoned
+        self.abort_oversize = bool(settings.get('abort_oversize'))
+        try:
+            self.oversize_percent = float(settings.get('oversize_percent') or DEFAULT_OVERSIZE_PERCENT)
+        except (TypeError, ValueError):
+            self.oversize_percent = float(DEFAULT_OVERSIZE_PERCENT)
+
+    # ------------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------------
+    def run(self):
+        """
+        Thread entry point. The queue loop lives in _run_queue(); this wrapper exists so that
+        processing_finished is emitted on *every* exit path. It is the only signal that clears the app's
+        "processing" state — if an unexpected error escaped here, the UI would stay locked in a run that has
+        already ended, and closing the app would keep asking about a thread that is long dead.
+        """
+        try:
+            self._run_queue()
+            if self.skipped_count:
+                self.events.info(f"Skipped {self.skipped_count} file(s) already encoded with these settings")
+            if self.oversize_count:
+                self.events.info(f"Kept the original of {self.oversize_count} file(s): the encode would have "
+                                 f"exceeded {self.oversize_percent:g}% of the source size (see each file's log)")
+            self.events.info(get_probe_cache().describe())
+        except BaseException as exc:                      # noqa: BLE001 - last line of defence for the thread
+            try:
+                self.events.info(f"Processing aborted: {type(exc).__name__}: {exc}")
+            except Exception:
+                pass
+        finally:
+            try:
+                total = self._queue.get_total_file_count()
+            except Exception:
+                total = 0
+            self.supervisor.close()
+            if self._stop_requested is not None:
+                # Every stage has unwound, so every FFmpeg this run started has been reaped
+                self.events.info(f"Stopped {time.monotonic() - self._stop_requested:.2f}s after Stop "
+                                 f"(last FFmpeg reaped)")
+            self.events.finished(self.success_count, total)
+
+    def _run_queue(self):
+        """
+        Run the queue as a pipeline of three stages joined by bounded buffers: one thread prepares files (manifest
+        check, probe, raw pre-transcode), `workers` threads encode them, one thread finishes them (VMAF,
+        replace/timestamps/delete, cleanup). File N+1 is probed and pre-transcoded while file N encodes and file
+        N-1 is measured and finalized. A full buffer blocks the stage feeding it, so at most PIPELINE_BUFFER
+        prepared files — and their intermediates — wait for an encoder.
+        """
+        self.start_time = time.time()
+        self.success_count = 0
+
+        prepared: Queue = Queue(maxsize=PIPELINE_BUFFER)     # _Job, or None once preparing is over
+        encoded: Queue = Queue(maxsize=PIPELINE_BUFFER)      # (_Job, success), or None once encoding is over
+        preparer = threading.Thread(target=self._prepare_stage, args=(prepared, encoded), name="prepare",
+                                    daemon=True)
+        encoders = [threading.Thread(target=self._encode_stage, args=(prepared, encoded), name=f"worker-{n + 1}",
+                                     daemon=True) for n in range(self.workers)]
+        finisher = threading.Thread(target=self._finish_stage, args=(encoded,), name="finish", daemon=True)
+        for thread in [preparer, finisher] + encoders:
+            thread.start()
+        preparer.join()
+        for thread in encoders:
+            thread.join()
+        encoded.put(None)
+        finisher.join()
+
+    def _hold_while_paused(self):
+        self._unpaused.wait()
+
+    def _prepare_stage(self, prepared: Queue, encoded: Queue):
+        """Claim files in queue order and get them ready to encode; blocks while the encoders are all busy"""
+        try:
+            while not self.should_stop:
+                # Paused between files: hold before pulling the next entry
+                self._hold_while_paused()
+                if self.should_stop:
+                    break
+
+                claimed = self._queue.claim_next()
+                if claimed is None:
+                    break
+
+                job = _Job(*claimed)
+                with self._lock:
+                    self._jobs[job.index] = job
+                if not self._admit(job):
+                    if job.cancelled:
+                        continue
+                    self._retire(job)           # stopped while waiting: the file stays pending
+                    break
+                try:
+                    ready = self._prepare_job(job)
+                except Exception as exc:
+                    job.file.add_error(f"Could not prepare {job.file.filename}: {exc}")
+                    ready = False
+                if ready is None:
+                    self._retire(job)
+                elif ready and not job.cancelled:
+                    prepared.put(job)
+                elif job.cancelled:
+                    self._discard(job)
+                elif self.should_stop:
+                    # cut short by Stop (a killed pre-transcode), not a failure: the file stays pending
+                    self._discard(job)
+                    self._retire(job)
+                elif self._settle(job):
+                    encoded.put((job, False))
+                else:
+                    self._discard(job)
+        except Exception as exc:
+            # The stage dying must not take the encoders (or processing_finished) with it
+            self.events.info(f"Preparing stopped: {type(exc).__name__}: {exc}")
+        finally:
+            for _ in range(self.workers):
+                prepared.put(None)
+
+    def _encode_stage(self, prepared: Queue, encoded: Queue):
+        """
+        One encoder: take the next prepared file, encode it, pass it on. A file handed back while it waited, or
+        still waiting (for an encoder or for cores) when Stop came, is not encoded and reports nothing: its intermediates are dropped and it
+        stays pending.
+        """
+        while True:
+            job = prepared.get()
+            if job is None:
+                break
+            self._hold_while_paused()
+            if not self._take(job):
+                self._discard(job)
+                if not job.cancelled:
+                    self._retire(job)
+                continue
+            success = False
+            try:
+                success = self._process_file(job)
+                if job.encode_start is not None:
+                    job.encode_seconds = time.time() - job.encode_start
+            except Exception as exc:
+                self.events.info(f"Worker error on {job.file.filename}: {type(exc).__name__}: {exc}")
+            finally:
+                self._drop_intermediate(job.file)
+                if job.encode_start is None and self.should_stop:
+                    # Stop came while it waited for cores: it never ran and stays pending
+                    self._discard(job)
+                    self._retire(job)
+                else:
+                    self._started(job)      # failed before it got a share: report it ran, then failed
+                    encoded.put((job, success))
+
+    def _finish_stage(self, encoded: Queue):
+        """Finish encoded (or failed) files one at a time, in the order their encodes ended"""
+        while True:
+            item = encoded.get()
+            if item is None:
+                break
+            job, success = item
+            try:
+                self._finish_job(job, success)
+            except Exception as exc:
+                self.events.info(f"Finishing {job.file.filename} failed: {type(exc).__name__}: {exc}")
+            finally:
+                self._retire(job)
+
+    def _admit(self, job: _Job) -> bool:
+        """
+        Put a claimed job in flight. Two sources that differ only in extension (clip1.avi, clip1.mkv) share their
+        output, .part, log and intermediates; encoding them side by side would have each overwrite the other's
+        files, so a job whose paths overlap those of a job in flight waits for that one to finish — the pair runs
+        one after the other, as with a single worker. Returns False if the run was stopped, or the job handed
+        back, while waiting.
+        """
+        try:
+            job.file.set_output_name(self.settings)
+            job.paths = job.file.working_paths()
+        except Exception:
+            job.paths = set()           # _prepare_job fails the file with the reason
+        announced = False
+        with self._lock:
+            while True:
+                other = next((other for other in list(self._jobs.values()) + self._abandoned
+                              if other is not job and other.paths & job.paths), None)
+                if other is None:
+                    return True
+                if self.should_stop or job.cancelled:
+                    return False
+                if not announced:
+                    announced = True
+                    self.events.info(f"{job.file.filename} writes the same files as {other.file.filename} "
+                                     f"({os.path.basename(min(other.paths & job.paths))}); it starts once "
+                                     f"that one has finished")
+                self._retired.wait(timeout=1.0)
+
+    def _retire(self, job: _Job):
+        with self._lock:
+            if self._jobs.get(job.index) is job:
+                del self._jobs[job.index]
+            self._retired.notify_all()
+        with self._queue.held():
+            if not job.cancelled:       # a handed-back index may already belong to another claim
+                self._queue.release_index(job.index)
+
+    def _take(self, job: _Job) -> bool:
+        """An encoder takes a prepared file: from here on it is no longer handed back"""
+        with self._queue.held():
+            if job.cancelled or self.should_stop:
+                return False
+            self._queue.commit(job.index)
+        return True
+
+    def _started(self, job: _Job):
+        """
+        The file's encode got its CPU share: report it running from here on (once, whichever chunk gets there
+        first). A file still waiting for cores is not running yet and does not count towards the ETA.
+        """
+        with self._lock:
+            if job.encode_start is not None or self.should_stop:
+                return
+            job.encode_start = time.time()
+        self.events.file_started(job.index)
+        self.events.info(f"Processing {job.index + 1}/{self._queue.get_total_file_count()}: {job.file.filename}")
+
+    def _settle(self, job: _Job) -> bool:
+        """
+        The prepare stage is done with a file that will not be encoded (skipped, or it could not be prepared):
+        commit its claim before reporting it. False if it was handed back meanwhile; it then reports nothing.
+        """
+        with self._queue.held():
+            if job.cancelled:
+                return False
+            self._queue.commit(job.index)
+            return True
+
+    def hand_back(self, first: int) -> List[int]:
+        """
+        Give the files claimed ahead from index `first` on (being prepared, or prepared and waiting for an
+        encoder) back to the queue, so the GUI can remove or move them. Their preparation is abandoned — a
+        pre-transcode is killed and its output removed — and they report nothing; whatever is still queued is
+        claimed again in its new place. Called from the GUI thread; returns the indices given back.
+        """
+        with self._queue.held():
+            indices = self._queue.hand_back(first)
+            with self._lock:
+                jobs = [self._jobs.pop(index) for index in indices if index in self._jobs]
+                for job in jobs:
+                    job.cancelled = True
+                    self._abandoned.append(job)
+        if jobs:
+            threading.Thread(target=lambda: [self._kill_process(job) for job in jobs], name="hand back",
+                             daemon=True).start()
+        return indices
+
+    def _discard(self, job: _Job):
+        """Drop what preparing a file that is not going to be encoded left behind: intermediates and errors"""
+        file = job.file
+        self._drop_intermediate(file)
+        try:
+            file.cleanup_temp_files()
+        except Exception:
+            pass
+        file.close_logger()
+        file.clear_errors()
+        file.has_error, file.error_count = False, 0
+        with self._lock:
+            if job in self._abandoned:
+                self._abandoned.remove(job)
+                self._retired.notify_all()
+
+    @staticmethod
+    def _drop_intermediate(file: VideoFile):
+        """The raw pre-transcode is only read by the encode; free its disk space before VMAF and finishing"""
+        if file.transcode_name and os.path.exists(file.transcode_name):
+            try:
+                os.remove(file.transcode_name)
+                file.log_info(f"Removed temp file: {file.transcode_name}")
+            except OSError as e:
+                file.log_info(f"Failed to remove temp file {file.transcode_name}: {e}")
+
+    def _prepare_job(self, job: _Job) -> Optional[bool]:
+        """
+        Everything before the encode: manifest check, output name, probe, raw pre-transcode. Returns None when
+        the file is skipped as already encoded, otherwise whether it is ready to encode. The file is not
+        reported as started here: that happens when an encoder takes it (see _take).
+        """
+        file, index = job.file, job.index
+        total_count = self._queue.get_total_file_count()
+
+        job.source = source_fingerprint(file.filepath)
+        try:
+            job.source_size = os.path.getsize(file.filepath)
+        except OSError:
+            job.source_size = None
+        output = self.manifest.done(job.source, self.job_hash) if self.skip_encoded else None
+        if output:
+            try:
+                file.set_output_name(self.settings)
+            except Exception:
+                pass
+            if not self._settle(job):
+                return False
+            with self._lock:
+                self.skipped_count += 1
+            self.events.file_skipped(index, output)
+            self.events.info(f"Skipping {index + 1}/{total_count}: {file.filename} (already encoded: {output})")
+            return None
+
+        # Preparing a file can fail on its own (read-only directory, locked log, over-long Windows path,
+        # a preset with a non-numeric size). That must fail this file, not kill the whole queue.
+        try:
+            file.create_logger()
+            file.set_output_name(self.settings)
+            if not file.probed and file.apply_probe(probe_media(file.filepath)):
+                self._queue.note_probed(file)
+            file.log_info(f"Source: {file.describe_media()}")
+            prepared = True
+            if file.probed and not file.video_streams:
+                file.add_error(f"{file.filename} has no video stream")
+                prepared = False
+        except Exception as exc:
+            file.add_error(f"Could not prepare {file.filename}: {exc}")
+            prepared = False
+
+        if prepared and (self.settings.get('transcode_video') or self.settings.get('transcode_audio')):
+            prepared = self._transcode(job)
+        return prepared
+
+    def _finish_job(self, job: _Job, success: bool):
+        """Everything after the encode: VMAF, replace/timestamps/delete, cleanup and the file_finished event"""
+        file, index, source = job.file, job.index, job.source
+        kept = None
+        if job.abort:
+            kept = self._keep_original(job)
+            with self._lock:
+                self.oversize_count += 1
+            self.events.info(f"{file.filename}: kept the original — {job.abort}")
+        elif success:
+            with self._lock:
+                self.success_count += 1
+
+            # Calculate VMAF before any file replacement (needs original as reference)
+            if (self.settings.get('calculate_vmaf')
+                    and self.settings.get('video_codec') != 'copy'):
+                self._calculate_vmaf(job, file.get_full_output_path())
+
+            output_path = file.get_full_output_path()
+            delete_source = bool(self.settings.get('delete_source'))
+            if self.settings.get('replace_files'):
+                # With delete_source the .old backup is dropped as well
+                if self.file_ops.replace_file(output_path, file.filepath, file.logger,
+                                              keep_backup=not delete_source):
+                    # The encode now sits under the source's name: a re-run finds it done by either fingerprint
+                    self.manifest.record(source, self.job_hash, file.filepath, file.filepath)
+                    self.manifest.record(source_fingerprint(file.filepath), self.job_hash, file.filepath,
+                                         file.filepath)
+            else:
+                self.manifest.record(source, self.job_hash, output_path, file.filepath)
+                self.file_ops.preserve_timestamps(file.filepath, output_path, file.logger)
+                if delete_source:
+                    # Free space as we go: remove this source right after its
+                    # encode is verified, before moving on to the next file
+                    if self.file_ops.delete_source(file.filepath, output_path, file.logger):
+                        self.events.info(f"Deleted source: {file.filename}")
+
+        try:
+            file.cleanup_temp_files()
+        except Exception as exc:
+            self.events.info(f"Cleanup failed for {file.filename}: {exc}")
+        if kept is not None:
+            self.events.file_skipped(index, kept)
+        else:
+            if success and job.encode_seconds:
+                # only real encodes say how fast this run gets through media; a file that failed early does not
+                with self._lock:
+                    self._completed.append((file.duration, job.encode_seconds))
+            self.events.file_finished(index, success)
+
+        if file.error_count:
+            self.events.info(f"Errors in {file.filename} ({file.error_count} total):\n"
+                                  + file.get_error_report())
+        # Retained error text has served its purpose; don't carry it for the rest of the batch
+        file.clear_errors()
+
+    def _process_file(self, job: _Job) -> bool:
+        """Process a single file"""
+        file = job.file
+        try:
+            if self.settings.get('transcode_video') or self.settings.get('transcode_audio'):
+                input_file = file.transcode_name        # written by the prepare stage
+            else:
+                input_file = file.filepath
+
+            use_avisynth = bool(self.settings.get('use_avisynth') and self.avisynth_handler)
+            temp_output = file.get_temp_output_path()
+            final_output = file.get_full_output_path()
+
+            return_code = None
+            if self._chunking_applies(file, use_avisynth):
+                return_code = self._encode_chunked(job, input_file, temp_output)
+
+            if return_code is None:
+                share = self._acquire_share(job, "Encoding", avisynth=use_avisynth)
+                self._started(job)
+                try:
+                    if use_avisynth:
+                        if self.avisynth_handler.create_script(file, threads=share.avisynth):
+                            input_file = file.avs_file
+                        else:
+                            file.add_error("Failed to create AviSynth script")
+                            return False
+
+                    command = self.command_builder.build_main_command(
+                        input_file, temp_output, self.settings.get('use_avisynth', False), threads=share)
+
+                    return_code = self._execute_command(command, job, phase="Encoding")
+                finally:
+                    self._release_share(job)
+            ok = (return_code == 0 and not self.should_stop and not job.abort
+                  and self.file_ops.output_is_usable(temp_output))
+            if ok:
+                # only now does the file appear under its real name; a stopped / failed encode never does
+                if os.path.exists(final_output):
+                    os.remove(final_output)
+                os.replace(temp_output, final_output)
+            else:
+                try:
+                    if os.path.exists(temp_output):
+                        os.remove(temp_output)
+                except OSError:
+                    pass
+            return ok
+
+        except Exception as e:
+            file.add_error(f"Processing error: {str(e)}")
+            return False
+
+    # ------------------------------------------------------------------
+    # Chunked encoding
+    # ------------------------------------------------------------------
+    def _chunking_applies(self, file: VideoFile, use_avisynth: bool) -> bool:
+        """
+        Chunked and resumable modes are for long re-encodes; stream copy and AviSynth+ scripts are encoded in
+        one piece. Resumable alone encodes the same keyframe-aligned pieces one at a time.
+        """
+        if not (self.settings.get('chunked') or self.settings.get('resumable')) or use_avisynth:
+            return False
+        if self.settings.get('video_codec') == 'copy':
+            return False
+        return bool(file.duration and file.duration >= CHUNK_MIN_DURATION)
+
+    @staticmethod
+    def _chunk_bounds(targets: List[float], keyframes: List[float], duration: float) -> List[float]:
+        """Pick the keyframe nearest each target cut; returns [0, cut, ..., duration]"""
+        min_gap = CHUNK_TARGET_SECONDS / 4
+        bounds = [0.0]
+        for target in targets:
+            candidates = [k for k in keyframes if bounds[-1] + min_gap <= k <= duration - min_gap]
+            if candidates:
+                bounds.append(min(candidates, key=lambda k: abs(k - target)))
+        bounds.append(duration)
+        return bounds
+
+    def _encode_chunked(self, job: _Job, input_file: str, temp_output: str) -> Optional[int]:
+        """
+        Encode a long file as independent pieces side by side and join them into `temp_output`.
+
+        The source is cut at keyframes, so every piece starts on a frame that decodes on its own and the
+        pieces join without re-encoding. Video chunks run `chunk_jobs` at a time (one at a time when only
+        resumable mode asked for pieces), each with its own slice of the CPU budget; the audio is encoded once,
+        alongside them. Returns the join's return code, or None when the file cannot be split (the caller then
+        encodes it in one piece).
+
+        In resumable mode each piece is written as <piece>.part and renamed when complete, and the pieces of
+        a stopped or crashed encode are kept in <output>.part.chunks next to the plan they belong to. The next
+        attempt at the same source with the same settings encodes only what is missing. The joined file still
+        goes through temp_output, so nothing shows up under the final name before the join has succeeded.
+        """
+        file = job.file
+        duration = file.duration
+        resumable = bool(self.settings.get('resumable'))
+        chunk_dir = os.path.splitext(temp_output)[0] + '.chunks'
+        plan_file = os.path.join(chunk_dir, "plan.json")
+        identity = self._source_identity(input_file)
+
+        bounds = self._load_plan(plan_file, identity) if resumable else None
+        if bounds is None:
+            shutil.rmtree(chunk_dir, ignore_errors=True)        # pieces of another source or other settings
+            count = max(2, int(round(duration / CHUNK_TARGET_SECONDS)))
+            targets = [duration * k / count for k in range(1, count)]
+            bounds = self._chunk_bounds(targets, probe_keyframes(input_file, targets), duration)
+        if len(bounds) < 3:
+            file.log_info("No keyframes to split at; encoding in one piece")
+            return None
+
+        pieces = list(zip(bounds[:-1], bounds[1:]))
+        try:
+            parallel = int(self.settings.get('chunk_jobs') or DEFAULT_CHUNK_JOBS)
+        except (TypeError, ValueError):
+            parallel = DEFAULT_CHUNK_JOBS
+        if not self.settings.get('chunked'):
+            parallel = 1
+        parallel = max(1, min(parallel, len(pieces)))
+
+        os.makedirs(chunk_dir, exist_ok=True)
+        if resumable:
+            with open(plan_file, 'w', encoding='utf-8') as handle:
+                json.dump({'source': identity, 'job': self.job_hash, 'bounds': bounds}, handle)
+        outputs = [os.path.join(chunk_dir, f"chunk_{n:05d}.mkv") for n in range(len(pieces))]
+        has_audio = bool(file.audio_streams) if file.probed else probe_has_audio(input_file)
+        audio_output = os.path.join(chunk_dir, "audio.mka") if has_audio else None
+
+        progress = _ChunkProgress([end - start for start, end in pieces])
+        done = set()
+        if resumable:
+            done = {n for n, output in enumerate(outputs) if self.file_ops.output_is_usable(output)}
+            for n in done:
+                progress.complete(n, os.path.getsize(outputs[n]))
+        audio_done = bool(resumable and audio_output and self.file_ops.output_is_usable(audio_output))
+        file.log_info(f"{'Chunked' if self.settings.get('chunked') else 'Segmented'} encode: "
+                      f"{len(pieces)} chunks, {parallel} at a time" + ("" if audio_output else ", no audio")
+                      + (f", resuming with {len(done)} done" if done or audio_done else ""))
+        failed = threading.Event()
+        job.phase_start = time.time()
+
+        def on_line(line):
+            lower = line.lower()
+            if any(keyword in lower for keyword in self._ERROR_KEYWORDS):
+                file.add_error(line)
+
+        def on_progress(n, block):
+            combined = progress.update(n, block)
+            if combined is not None:
+                self._emit_progress(job, f"Encoding ({len(pieces)} chunks)", combined, duration,
+                                    threads=progress.threads)
+
+        def run_step(n):
+            """Chunk n, or the audio when n is None"""
+            self._hold_while_paused()
+            if self.should_stop or failed.is_set() or job.abort:
+                return False
+            label = "Audio" if n is None else f"Chunk {n + 1}/{len(pieces)}"
+            final = audio_output if n is None else outputs[n]
+            # A resumable piece is written under a .part name and renamed once complete, so a piece that
+            # exists under its real name is always whole
+            output = self._part_path(final) if resumable else final
+            share = self._acquire_chunk_share(job, label, parallel)
+            self._started(job)
+            progress.hold(share.threads)
+            try:
+                if n is None:
+                    command = self.command_builder.build_audio_command(input_file, output, threads=share)
+                    return_code = self._run_monitored(command, job, label, duration, on_line,
+                                                      on_progress=lambda block: None)
+                else:
+                    start, end = pieces[n]
+                    # the last chunk runs to the end of the stream, whatever the container's duration says
+                    length = end - start if n < len(pieces) - 1 else None
+                    command = self.command_builder.build_main_command(
+                        input_file, output, threads=share, segment=(start, length))
+                    return_code = self._run_monitored(command, job, label, end - start, on_line,
+                                                      on_progress=lambda block: on_progress(n, block))
+            finally:
+                progress.hold(-share.threads)
+                self.cpu_budget.release(share)
+            ok = return_code == 0 and not self.should_stop and self.file_ops.output_is_usable(output)
+            if output != final:
+                if ok:
+                    os.replace(output, final)
+                else:
+                    try:
+                        os.remove(output)       # a cut-off piece is encoded again from its start
+                    except OSError:
+                        pass
+            if not ok and not self.should_stop and not failed.is_set() and not job.abort:
+                failed.set()
+                file.add_error(f"{label} failed; stopping the other chunks")
+                self._kill_process(job)
+            return ok
+
+        keep = False
+        try:
+            steps: List[Optional[int]] = (([None] if audio_output and not audio_done else [])
+                                          + [n for n in range(len(pieces)) if n not in done])
+            with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="chunk") as pool:
+                results = list(pool.map(run_step, steps))
+            if self.should_stop and resumable:
+                keep = True
+                file.log_info(f"Stopped: {len(pieces) - sum(not self.file_ops.output_is_usable(o) for o in outputs)}"
+                              f" of {len(pieces)} chunks kept in {chunk_dir} for the next attempt")
+            if not all(results) or self.should_stop:
+                return 1
+
+            list_file = os.path.join(chunk_dir, "chunks.txt")
+            with open(list_file, 'w', encoding='utf-8') as handle:
+                for output in outputs:
+                    escaped = os.path.basename(output).replace("'", "'\\''")
+                    handle.write(f"file '{escaped}'\n")
+            command = self.command_builder.build_join_command(list_file, audio_output, input_file, temp_output)
+            return_code = self._execute_command(command, job, phase="Joining chunks")
+            # A join cut short by Stop is redone from the kept pieces next time
+            keep = resumable and self.should_stop
+            return return_code
+        finally:
+            if not keep:
+                shutil.rmtree(chunk_dir, ignore_errors=True)
+
+    @staticmethod
+    def _part_path(path: str) -> str:
+        stem, ext = os.path.splitext(path)
+        return f"{stem}.part{ext}"
+
+    @staticmethod
+    def _source_identity(path: str) -> Optional[List[int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    def _load_plan(self, plan_file: str, identity: Optional[List[int]]) -> Optional[List[float]]:
+        """Chunk bounds kept by an interrupted attempt, if it was the same source with the same settings"""
+        try:
+            with open(plan_file, 'r', encoding='utf-8') as handle:
+                plan = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if identity is None or plan.get('source') != identity or plan.get('job') != self.job_hash:
+            return None
+        bounds = plan.get('bounds')
+        return bounds if isinstance(bounds, list) and len(bounds) >= 2 else None
+
+    def _acquire_chunk_share(self, job: _Job, label: str, parallel: int) -> ThreadShare:
+        """A slice for one chunk: the job's own slot is divided between the chunks running at once"""
+        others = self._expected_steps(job, label) - 1
+        self.cpu_budget.set_slots(others + parallel)
+        share = self.cpu_budget.acquire(f"{job.index + 1} {label}")
+        job.file.log_info(f"CPU share for {label}: {share.describe()} ({self.cpu_budget.describe()})")
+        return share
+
+    def _transcode(self, job: _Job) -> bool:
+        """Transcode to raw format"""
+        file = job.file
+        file.log_info("Starting transcoding...")
+        share = self._acquire_share(job, "Transcoding")
+        try:
+            command = self.command_builder.build_transcode_command(
+                file.filepath, file.transcode_name,
+                self.settings.get('transcode_video', False),
+                self.settings.get('transcode_audio', False), threads=share)
+
+            return_code = self._execute_command(command, job, phase="Transcoding")
+        finally:
+            self._release_share(job)
+        success = return_code == 0 and not self.should_stop
+        if success:
+            file.log_info("Transcoding completed successfully")
+        else:
+            file.add_error("Transcoding failed")
+        return success
+
+    def _expected_steps(self, job: _Job, phase: str) -> int:
+        """
+        Steps expected to run side by side with this one: an encode for every file in flight or pending, at
+        most one per worker, plus — while other files are in the pipeline — the pre-transcode of a file still
+        to be encoded and the VMAF pass of one already encoded. Those run next to the encodes and get a slot of
+        their own; otherwise an encode takes the whole budget and the other stages wait for it to end.
+        """
+        with self._lock:
+            others = [other for other in self._jobs.values() if other is not job]
+        pending = self._queue.get_pending_count()
+        steps = min(self.workers, len(others) + 1 + pending)
+        if not (others or pending):
+            return steps
+        if self.settings.get('transcode_video') or self.settings.get('transcode_audio'):
+            steps += bool(phase == "Transcoding" or pending
+                          or any(other.encode_start is None for other in others))
+        if self.settings.get('calculate_vmaf') and self.settings.get('video_codec') != 'copy':
+            steps += bool(phase == "VMAF" or any(other.encode_start is not None for other in others))
+        return steps
+
+    def _acquire_share(self, job: _Job, phase: str, avisynth: bool = False) -> ThreadShare:
+        """Take this step's slice of the CPU budget and record what it got in the file's log"""
+        self.cpu_budget.set_slots(self._expected_steps(job, phase))
+        qtgmc = avisynth and bool(self.avisynth_handler) and self.avisynth_handler._uses_qtgmc()
+        job.share = self.cpu_budget.acquire(f"{job.index + 1} {phase}", avisynth=avisynth, qtgmc=qtgmc)
+        job.file.log_info(f"CPU share for {phase}: {job.share.describe()} ({self.cpu_budget.describe()})")
+        return job.share
+
+    def _release_share(self, job: _Job):
+        self.cpu_budget.release(job.share)
+        job.share = None
+
+    # ------------------------------------------------------------------
+    # Subprocess handling
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _format_command(command: List[str]) -> str:
+        """Human-readable command line for logging"""
+        if os.name == 'nt':
+            return subprocess.list2cmdline(command)
+        return ' '.join(shlex.quote(arg) for arg in command)
+
+    def _start_subprocess(self, command: List[str]) -> subprocess.Popen:
+        """Start FFmpeg without a shell so paths with spaces/quotes are passed verbatim"""
+        kwargs = dict(
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            bufsize=0,              # the supervisor reads and decodes the raw pipe
+        )
+        if os.name == 'nt':
+            # Plugins that pull in runtime DLLs via LoadLibrary (fft3dfilter ->
+            # libfftw3f-3.dll) resolve them through PATH, so expose plugins/.
+            if self.avisynth_handler:
+                env = dict(os.environ)
+                env['PATH'] = self.avisynth_handler.plugins_path + os.pathsep + env.get('PATH', '')
+                kwargs['env'] = env
+        return childproc.popen(command, **kwargs)
+
+    @staticmethod
+    def _to_float(value: str) -> Optional[float]:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def _run_monitored(self, command: List[str], job: _Job, phase: str,
+                       duration: Optional[float],
+                       on_line: Optional[Callable[[str], None]] = None,
+                       on_progress: Optional[Callable[[Dict[str, str]], None]] = None) -> int:
+        """
+        Run an FFmpeg command started with `-progress pipe:1`, log its output and
+        emit structured progress snapshots (or hand each -progress block to
+        `on_progress` instead). Returns the return code (1 if stopped or failed to launch).
+        """
+        file = job.file
+        if self.should_stop or job.cancelled:      # came while this step was waiting for its CPU share
+            return 1
+        file.log_info(f"Executing: {self._format_command(command)}")
+
+        try:
+            process = self._start_subprocess(command)
+        except Exception as e:
+            file.add_error(f"Command execution error: {str(e)}")
+            return 1
+
+        # Keep a local reference: stop() runs on the GUI thread and drops
+        # the job's processes while this thread is still waiting on the watch.
+        with self._lock:
+            job.processes[process] = None
+
+        # Everything from here runs under the try: once the child exists, no path may leave this method
+        # without the finally having disposed of it.
+        try:
+            # The psutil handle is only for platforms where the tree is reached by walking it, not by its group
+            handle = None if childproc.has_group(process) else self._psutil_handle(process.pid)
+            with self._lock:
+                if process in job.processes:
+                    job.processes[process] = handle
+            if on_progress is None:
+                job.phase_start = time.time()
+            if self.paused:  # pause hit while the process was being spawned
+                self._signal_tree(job, suspend=True)
+            if job.cancelled:   # handed back while the process was being spawned
+                self._kill_process(job, process)
+
+            # The supervisor's loop reads the output and keeps the stall and exit deadlines; this thread just
+            # waits for the outcome, which a Stop delivers at once.
+            headway = _Headway(self)
+            watch = self.supervisor.watch(process,
+                                          self._output_handler(job, phase, duration, on_line, on_progress, headway),
+                                          stall_timeout=STALL_TIMEOUT, exit_timeout=EXIT_TIMEOUT,
+                                          headway_timeout=STALL_TIMEOUT)
+            headway.watch = watch
+            outcome = watch.wait()
+
+            if outcome == STALLED:
+                minutes = int(STALL_TIMEOUT // 60)
+                file.add_error(f"No output from FFmpeg for {minutes} minutes during {phase} — "
+                               f"treating it as wedged and stopping it")
+                self.events.info(f"{file.filename}: {phase} produced no output for {minutes} minutes; "
+                                      f"stopping that step")
+            elif outcome == STUCK:
+                # Still printing (errors, or -progress blocks with a frozen position), but going nowhere
+                minutes = headway.timeout / 60
+                file.add_error(f"FFmpeg made no progress for {minutes:.0f} minutes during {phase} although it "
+                               f"kept printing — treating it as stuck and stopping it")
+                self.events.info(f"{file.filename}: {phase} made no progress for {minutes:.0f} minutes; "
+                                 f"stopping that step")
+            elif outcome == WEDGED:
+                # A closed stdout does not mean the process exited: an AviSynth+ MT teardown can spin its
+                # worker threads indefinitely after the last frame.
+                file.add_error(f"FFmpeg closed its output but did not exit within {int(EXIT_TIMEOUT)}s "
+                               f"— killing it")
+                self.events.info(f"{file.filename}: FFmpeg would not exit; killed it")
+            if outcome != EXITED:
+                self._kill_process(job, process)
+                return 1
+            return_code = watch.returncode
+        finally:
+            # release(), never forget(): forgetting a still-running child hides it from both the Stop button
+            # and kill_all(), leaving an encoder burning every core with nothing able to reach it.
+            childproc.release(process)
+            with self._lock:
+                job.processes.pop(process, None)
+
+        file.log_info(f"Process completed with return code: {return_code}")
+        return return_code
+
+    def _output_handler(self, job: _Job, phase: str, duration: Optional[float],
+                        on_line: Optional[Callable[[str], None]],
+                        on_progress: Optional[Callable[[Dict[str, str]], None]],
+                        headway: Optional[_Headway] = None) -> Callable[[str], None]:
+        """
+        The per-line interpretation of FFmpeg's output, run on the supervisor's loop: -progress blocks become
+        progress snapshots (or go to `on_progress`) and are checked for headway, everything else is logged and
+        handed to `on_line`.
+        """
+        file = job.file
+        block: Dict[str, str] = {}
+        last_emit = 0.0
+
+        def handle(raw_line: str):
+            nonlocal block, last_emit, duration
+            line = raw_line.strip()
+            if not line:
+                return
+
+            # -progress key=value blocks, terminated by progress=continue|end
+            if '=' in line and ' ' not in line.split('=', 1)[0]:
+                key, _, value = line.partition('=')
+                block[key] = value.strip()
+                if key == 'progress':
+                    if headway is not None:
+                        headway.block(block)
+                    now = time.time()
+                    if value.strip() == 'end' or now - last_emit >= 0.25:
+                        if on_progress is not None:
+                            on_progress(block)
+                        else:
+                            self._emit_progress(job, phase, block, duration)
+                        last_emit = now
+                    block = {}
+                return
+
+            file.log_info(line)
+
+            if duration is None:
+                match = self._DURATION_RE.search(line)
+                if match:
+                    h, m, sec, frac = match.groups()
+                    duration = int(h) * 3600 + int(m) * 60 + int(sec) + \
+                        (float(f"0.{frac}") if frac else 0.0)
+
+            if on_line:
+                on_line(line)
+
+        return handle
+
+    def _emit_progress(self, job: _Job, phase: str, block: Dict[str, str],
+                       duration: Optional[float], threads: Optional[int] = None):
+        """
+        Turn a -progress block into a snapshot dict for the UI. `threads` overrides the job's own share
+        when several processes work on the file (chunked encoding).
+        """
+        if job.cancelled:
+            return
+        file = job.file
+        phase_start = job.phase_start or time.time()
+        out_time = None
+        us = self._to_float(block.get('out_time_us') or block.get('out_time_ms'))
+        if us is not None:
+            out_time = us / 1_000_000.0
+
+        speed = self._to_float((block.get('speed') or '').rstrip('x'))
+        fps = self._to_float(block.get('fps'))
+        bitrate = (block.get('bitrate') or '').strip()
+        size = self._to_float(block.get('total_size'))
+        frame = block.get('frame')
+
+        share = job.share
+        percent = None
+        eta_file = None
+        elapsed = time.time() - phase_start
+        if duration and out_time is not None and duration > 0:
+            percent = max(0.0, min(100.0, out_time / duration * 100.0))
+            remaining_media = max(0.0, duration - out_time)
+            if speed and speed > 0:
+                eta_file = remaining_media / speed
+            elif percent > 0:
+                eta_file = elapsed * (100.0 - percent) / percent
+        else:
+            # No duration (raw streams, some transport streams): fall back to the probed frame count
+            expected = self._expected_frames(job.file, phase)
+            done = self._to_float(frame)
+            if expected and done is not None:
+                percent = max(0.0, min(100.0, done / expected * 100.0))
+                if 0 < percent < 100.0:
+                    eta_file = elapsed * (100.0 - percent) / percent
+
+        if self.abort_oversize and phase.startswith("Encoding"):
+            self._check_oversize(job, size, 100.0 if block.get('progress') == 'end' else percent)
+
+        if block.get('progress') == 'end':
+            percent = 100.0
+            eta_file = 0.0
+
+        # Queue-level progress and ETA by media duration, not file count: what the running files still need,
+        # plus the media seconds nobody is working on yet at the pace this run has shown (seconds of media per wall
+        # second of one worker, over the files encoded so far and the running ones), shared out across the
+        # workers. The pace is live, so a run of short clips after a long film corrects itself as files finish.
+        total_files = self._queue.get_total_file_count()
+        now = time.time()
+        with self._lock:
+            job.eta_file = eta_file
+            job.fraction = (percent or 0.0) / 100.0
+            fractions = {j.index: j.fraction for j in self._jobs.values()}
+            running_etas = [j.eta_file for j in self._jobs.values() if j.eta_file is not None]
+            # claimed, but not reporting yet (probing, or waiting for an encoder): what is left of them
+            waiting = [(1.0 - j.fraction, j.file.duration) for j in self._jobs.values() if j.eta_file is None]
+            # (duration, seconds, fraction) of the files an encoder holds right now, then of those it is done with
+            encoding = [(j.file.duration, now - j.encode_start, j.fraction) for j in self._jobs.values()
+                        if j.encode_start is not None and j.encode_seconds is None]
+            encoded = [(duration, seconds, 1.0) for duration, seconds in self._completed]
+        work = self._queue.work(fractions)
+        unstarted = work.pending + sum(left * (duration or work.typical) for left, duration in waiting)
+        media = sum(fraction * (duration or work.typical) for duration, _, fraction in encoding + encoded)
+        wall = sum(seconds for _, seconds, _ in encoding + encoded)
+        pace = media / wall if media > 0 and wall > 0 else None
+        eta_total = None
+        if eta_file is not None and (pace is not None or unstarted == 0):
+            queued = sum(running_etas) + (unstarted / pace if pace else 0.0)
+            eta_total = max(max(running_etas, default=eta_file), queued / self.workers)
+        overall = max(0.0, min(100.0, work.done / work.total * 100.0)) if work.total > 0 else None
+
+        self.events.progress({
+            'file_index': job.index,
+            'total_files': total_files,
+            'file_name': file.filename,
+            'phase': phase,
+            'percent': percent,
+            'fps': fps,
+            'speed': speed,
+            'bitrate': bitrate if bitrate and bitrate != 'N/A' else None,
+            'size': size,
+            'frame': frame,
+            'out_time': out_time,
+            'duration': duration,
+            'eta_file': eta_file,
+            'eta_total': eta_total,
+            'overall_percent': overall,
+            'threads': threads if threads is not None else (share.threads if share else None),
+            'cpu': (f"{threads} across chunks" if threads is not None
+                    else (share.describe() if share else None)),
+            'elapsed_file': time.time() - (job.file_start or phase_start),
+            'elapsed_total': time.time() - (self.start_time or phase_start),
+        })
+
+    def _check_oversize(self, job: _Job, size: Optional[float], percent: Optional[float]):
+        """
+        abort_oversize: abandon an encode whose output is going to be larger than oversize_percent of the source.
+        The final size is projected linearly from the size so far once OVERSIZE_MIN_PROGRESS of the file is done;
+        it has to pass the limit by OVERSIZE_MARGIN, because the start of a file is not always typical of the
+        rest. An output already past the limit is abandoned whatever the progress. Runs on the supervisor's loop,
+        so the kill happens on a thread of its own.
+        """
+        if job.abort or not size or not job.source_size:
+            return
+        limit = job.source_size * self.oversize_percent / 100.0
+        source_mb = job.source_size / (1024 * 1024)
+        if size >= limit:
+            reason = (f"the output already reached {size / (1024 * 1024):.1f} MB, "
+                      f"{size / job.source_size:.0%} of the {source_mb:.1f} MB source")
+        elif (percent and percent >= OVERSIZE_MIN_PROGRESS * 100.0
+              and size * 100.0 / percent >= limit * OVERSIZE_MARGIN):
+            projected = size * 100.0 / percent
+            reason = (f"after {percent:.0f}% the output is projected at {projected / (1024 * 1024):.1f} MB, "
+                      f"{projected / job.source_size:.0%} of the {source_mb:.1f} MB source")
+        else:
+            return
+        job.abort = f"{reason} (limit {self.oversize_percent:g}%)"
+        job.file.log_info(f"Abandoning the encode: {job.abort}")
+        threading.Thread(target=self._kill_process, args=(job,), name="abort", daemon=True).start()
+
+    def _keep_original(self, job: _Job) -> str:
+        """
+        After an oversize abort: with oversize_copy, copy the source to the output folder (under the output name,
+        with the source's own extension) and return the copy; otherwise, or when that is not possible, the
+        source itself. With replace_files the original simply stays where it is.
+        """
+        file = job.file
+        if not self.settings.get('oversize_copy') or self.settings.get('replace_files'):
+            return file.filepath
+        target = file.get_kept_original_path()
+        if os.path.abspath(target) == os.path.abspath(file.filepath):
+            return file.filepath
+        partial = target + '.part'
+        try:
+            shutil.copy2(file.filepath, partial)
+            os.replace(partial, target)
+        except OSError as e:
+            file.log_info(f"Could not copy the original to {target}: {e}")
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            return file.filepath
+        file.log_info(f"Copied the original to {target}")
+        return target
+
+    def _expected_frames(self, file: VideoFile, phase: str) -> Optional[int]:
+        """Frames the step will output: the source's, doubled when deinterlacing to full field rate"""
+        if not file.frame_count:
+            return None
+        if (phase == "Encoding" and self.settings.get('deinterlace')
+                and not self.settings.get('reduce_fps') and self.settings.get('video_codec') != 'copy'):
+            return file.frame_count * 2
+        return file.frame_count
+
+    def _execute_command(self, command: List[str], job: _Job, phase: str) -> int:
+        """Execute FFmpeg command, monitor progress and collect error lines"""
+        file = job.file
+
+        def on_line(line):
+            lower = line.lower()
+            if any(keyword in lower for keyword in self._ERROR_KEYWORDS):
+                file.add_error(line)
+
+        return self._run_monitored(command, job, phase, file.duration, on_line)
+
+    def _calculate_vmaf(self, job: _Job, encoded_path: str):
+        """Calculate VMAF score by comparing encoded file against original"""
+        file = job.file
+        file.log_info("Starting VMAF calculation...")
+        vmaf_score: Optional[float] = None
+
+        def on_line(line):
+            nonlocal vmaf_score
+            match = self._VMAF_RE.search(line)
+            if match:
+                vmaf_score = float(match.group(1))
+
+        share = self._acquire_share(job, "VMAF")
+        try:
+            command = self.command_builder.build_vmaf_command(encoded_path, file.filepath, threads=share)
+            self._run_monitored(command, job, "VMAF", file.duration, on_line)
+        except Exception as e:
+            file.log_info(f"VMAF calculation failed: {str(e)}")
+            return
+        finally:
+            self._release_share(job)
+
+        if vmaf_score is not None:
+            file.vmaf_score = vmaf_score
+            file.log_info(f"VMAF score: {vmaf_score}")
+            self.events.vmaf_calculated(job.index, vmaf_score)
+        else:
+            file.log_info("VMAF score could not be parsed from output")
+
+    def _running_jobs(self) -> List[_Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def stop(self):
+        """
+        Stop processing. Returns at once: the waiting steps are released through the supervisor and the
+        children are killed on a helper thread, since killing waits for each process to be reaped.
+        """
+        if self._stop_requested is None:
+            self._stop_requested = time.monotonic()
+        self.should_stop = True
+        self.supervisor.stop()
+        was_paused, self.paused = self.paused, False
+        self._unpaused.set()
+        threading.Thread(target=self._kill_all, args=(was_paused,), name="stop", daemon=True).start()
+
+    def _kill_all(self, was_paused: bool):
+        jobs = self._running_jobs()
+        if was_paused:
+            for job in jobs:
+                self._signal_tree(job, suspend=False)
+        for job in jobs:
+            self._kill_process(job)
+
+    def pause(self):
+        """Suspend every running FFmpeg process tree and hold the queue"""
+        if self.paused or self.should_stop:
+            return
+        self.paused = True
+        self._unpaused.clear()
+        self._pauses += 1
+        self._pause_started = time.time()
+        self.supervisor.pause()
+        for job in self._running_jobs():
+            self._signal_tree(job, suspend=True)
+
+    def resume(self):
+        """Resume the paused FFmpeg process trees; shift ETA clocks past the gap"""
+        if not self.paused:
+            return
+        jobs = self._running_jobs()
+        for job in jobs:
+            self._signal_tree(job, suspend=False)
+        if self._pause_started is not None:
+            delta = time.time() - self._pause_started
+            if self.start_time is not None:
+                self.start_time += delta
+            for job in jobs:
+                job.file_start += delta
+                if job.encode_start is not None:
+                    job.encode_start += delta
+                if job.phase_start is not None:
+                    job.phase_start += delta
+        self._pause_started = None
+        self.paused = False
+        self.supervisor.resume()
+        self._unpaused.set()
+
+    @staticmethod
+    def _psutil_handle(pid: int) -> Optional[psutil.Process]:
+        """
+        psutil.Process identifies a process by pid *and* creation time, so a handle taken when we spawned the
+        child can never be confused with an unrelated process that later inherits the same pid. Looking the pid
+        up again at pause time can be — and suspending a random system process is its own kind of hang.
+        """
+        try:
+            return psutil.Process(pid)
+        except psutil.Error:
+            return None
+
+    def _signal_tree(self, job: _Job, suspend: bool):
+        """Suspend or resume one job's FFmpeg processes and their children (one killpg each where possible)"""
+        with self._lock:
+            targets = list(job.processes.items())
+        for process, handle in targets:
+            if childproc.has_group(process) or handle is not None:
+                childproc.suspend(process, handle) if suspend else childproc.resume(process, handle)
+
+    def _kill_process(self, job: _Job, process: Optional[subprocess.Popen] = None):
+        """Kill one of a job's FFmpeg processes (or all of them) and their children"""
+        with self._lock:
+            targets = [process] if process is not None else list(job.processes)
+            for target in targets:
+                job.processes.pop(target, None)
+        for target in targets:
+            childproc.kill(target)
+
+
+def validate_settings(settings: Dict[str, Any]) -> List[str]:
+    """Return a list of human-readable warnings about the chosen settings"""
+    issues = []
+    video_codec = settings.get('video_codec')
+    audio_codec = settings.get('audio_codec')
+    output_format = (settings.get('output_format') or '').lower()
+
+    allowed_v = CONTAINER_VIDEO_CODECS.get(output_format)
+    if allowed_v and video_codec not in allowed_v:
+        issues.append(f"{output_format.upper()} only supports VP9/AV1 video — "
+                      f"'{video_codec}' will fail. Choose MKV/MP4 or switch codec.")
+    allowed_a = CONTAINER_AUDIO_CODECS.get(output_format)
+    if allowed_a and audio_codec not in allowed_a:
+        issues.append(f"{output_format.upper()} only supports Opus audio — "
+                      f"'{audio_codec}' will fail.")
+
+    if video_codec == 'prores_ks' and output_format not in ('mov', 'mkv'):
+        issues.append("ProRes works best in MOV or MKV containers.")
+    if video_codec == 'rawvideo' and output_format == 'mp4':
+        issues.append("Raw video cannot be stored in MP4; use AVI/MKV/MOV.")
+    if audio_codec == 'pcm_s32le' and output_format == 'mp4':
+        issues.append("MP4 does not support PCM audio; use MOV/MKV or a lossy codec.")
+
+    if settings.get('use_avisynth'):
+        if not sys.platform.startswith('win'):
+            issues.append("AviSynth+ is only available on Windows; disable it or use bwdif/yadif.")
+        missing = AviSynthHandler(settings).get_missing_plugins()
+        if missing:
+            issues.append("Missing AviSynth plugins in plugins/: " + ", ".join(missing))
+
+    if settings.get('deinterlace'):
+        if settings.get('deinterlacer', 'qtgmc') == 'qtgmc':
+            if not settings.get('use_avisynth'):
+                issues.append("QTGMC deinterlacing requires AviSynth+ to be enabled.")
+            elif not settings.get('use_ffms2'):
+                issues.append("QTGMC deinterlacing needs the FFMS2 source filter for non-AVI inputs.")
+        if video_codec == 'copy':
+            issues.append("Deinterlacing has no effect when the video stream is copied.")
+
+    if video_codec == 'copy':
+        res_mode = settings.get('resolution_mode') or ''
+        if res_mode and not res_mode.startswith('Original'):
+            issues.append("Resolution scaling is ignored when the video stream is copied.")
+
+    if settings.get('stereo') and audio_codec == 'copy':
+        issues.append("Force Stereo has no effect when the audio stream is copied.")
+    if output_format in ('avi', 'webm'):
+        issues.append(f"{output_format.upper()} cannot carry text subtitles — they will be dropped.")
+    if settings.get('transcode_video') or settings.get('transcode_audio'):
+        issues.append("Raw pre-transcode uses an AVI intermediate: subtitles are not carried over.")
+    if settings.get('delete_source'):
+        issues.append("Delete Source Files is ON: each original is permanently deleted "
+                      "as soon as its encode succeeds (no .old backup, no recycle bin).")
+    if settings.get('chunked') or settings.get('resumable'):
+        mode = "Chunked encoding" if settings.get('chunked') else "Resumable encoding"
+        if settings.get('use_avisynth'):
+            issues.append(f"{mode} is not used with AviSynth+ — files are encoded in one piece.")
+        elif video_codec == 'copy':
+            issues.append(f"{mode} has no effect when the video stream is copied.")
+    if settings.get('abort_oversize') and video_codec == 'copy':
+        issues.append("Keeping oversize originals with a copied video stream: the output is about as large as the "
+                      "source, so the encode may be abandoned.")
+    if settings.get('calculate_vmaf') and settings.get('deinterlace') and settings.get('reduce_fps'):
+        issues.append("VMAF needs matching frame rates; halving FPS while deinterlacing will make it fail.")
+
+    return issues
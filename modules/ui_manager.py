@@ -7,40 +7,45 @@ from typing import Dict, Any, List
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                               QCheckBox, QRadioButton, QPushButton, QLineEdit, 
                               QSlider, QTextEdit, QFileDialog, QButtonGroup, 
-                              QGroupBox, QListWidget, QStyle, QProgressBar, 
-                              QSplitter, QMenuBar, QMenu, QStatusBar, QListWidgetItem,
+                              QGroupBox, QListView, QAbstractItemView, QStyle, QProgressBar, 
+                              QSplitter, QMenuBar, QMenu, QStatusBar,
                               QTabWidget, QSpinBox, QComboBox, QGridLayout, QFrame,
                               QSizePolicy, QMessageBox)
-from PySide6.QtCore import Qt, Signal, QSettings, QTimer, QSize
-from PySide6.QtGui import QAction, QIcon, QDragEnterEvent, QDropEvent, QFont, QColor, QBrush
+from PySide6.QtCore import Qt, Signal, QSettings, QTimer
+from PySide6.QtGui import QAction, QIcon, QDragEnterEvent, QDragMoveEvent, QDropEvent, QFont
 
 from config import (VIDEO_CODECS, AUDIO_CODECS, OUTPUT_FORMATS, VIDEO_EXTENSIONS,
                    ENCODING_PRESETS, PAR_PRESETS, DAR_PRESETS, DEINTERLACERS,
                    RESOLUTION_PRESETS, SCALE_ALGORITHMS, DEFAULT_SCALE_ALGORITHM,
                    DEFAULT_CRF, DEFAULT_ABR, MAX_THREADS, DEFAULT_SETTINGS,
-                   QUALITY_PRESETS, APP_NAME, APP_VERSION)
+                   DEFAULT_WORKERS, MAX_WORKERS, DEFAULT_CHUNK_JOBS, CHUNK_MIN_DURATION,
+                   DEFAULT_OVERSIZE_PERCENT, QUALITY_PRESETS, APP_NAME, APP_VERSION)
 from modules.process_manager import format_duration, format_size
+from modules.queue_model import QueueListModel
 
 
-class FileListWidget(QListWidget):
-    """Custom list widget with drag and drop support"""
+class FileListView(QListView):
+    """Queue list with drag and drop support: files and folders from outside, reordering within"""
     
     files_dropped = Signal(list)
+    rows_moved = Signal(list, int)   # dragged rows, the row the first of them should end up at
     
     def __init__(self):
         super().__init__()
         self.setAcceptDrops(True)
-        self.setDragDropMode(QListWidget.DragDropMode.InternalMove)
-        self.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        self.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
+        self.setDefaultDropAction(Qt.DropAction.MoveAction)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.setAlternatingRowColors(False)
+        self.setUniformItemSizes(True)   # rows are laid out without asking the model for each one
         self.setSpacing(2)
         self._setup_style()
     
     def _setup_style(self):
         # Note: no ::item box rules here — a styled ::item makes Qt ignore the
-        # per-item background brush used for running/success/failed colouring.
+        # per-row background brush used for running/success/failed colouring.
         self.setStyleSheet("""
-            QListWidget {
+            QListView {
                 border: 2px solid #aaa;
                 border-radius: 5px;
                 padding: 5px;
@@ -54,6 +59,12 @@ class FileListWidget(QListWidget):
         else:
             super().dragEnterEvent(event)
     
+    def dragMoveEvent(self, event: QDragMoveEvent):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+        else:
+            super().dragMoveEvent(event)
+    
     def dropEvent(self, event: QDropEvent):
         if event.mimeData().hasUrls():
             event.accept()
@@ -61,8 +72,26 @@ class FileListWidget(QListWidget):
             for url in event.mimeData().urls():
                 links.append(url.toLocalFile())
             self.files_dropped.emit(links)
+        elif event.source() is self and self.dragDropMode() == QAbstractItemView.DragDropMode.InternalMove:
+            rows = sorted(index.row() for index in self.selectionModel().selectedRows())
+            target = self._drop_row(event)
+            # The queue moves the rows and the model follows; a MoveAction would make the view delete the
+            # dragged rows from the model itself once the drag ends.
+            event.setDropAction(Qt.DropAction.CopyAction)
+            event.accept()
+            if rows:
+                self.rows_moved.emit(rows, target - sum(1 for row in rows if row < target))
         else:
-            super().dropEvent(event)
+            event.ignore()
+    
+    def _drop_row(self, event: QDropEvent) -> int:
+        """Row the drop lands before"""
+        index = self.indexAt(event.position().toPoint())
+        if not index.isValid():
+            return self.model().rowCount()
+        if self.dropIndicatorPosition() == QAbstractItemView.DropIndicatorPosition.BelowItem:
+            return index.row() + 1
+        return index.row()
 
 
 class UIManager(QWidget):
@@ -75,7 +104,9 @@ class UIManager(QWidget):
     files_added = Signal(list)
     files_removed = Signal(list)
     queue_cleared = Signal()
-    files_reordered = Signal(int, int)   # from_index, to_index
+    scan_cancelled = Signal()
+    watch_requested = Signal(str)  # folder to watch, '' to stop watching
+    files_reordered = Signal(list, int)  # dragged indices, index the first of them ends up at
     
     def __init__(self, main_window):
         super().__init__()
@@ -98,6 +129,8 @@ class UIManager(QWidget):
         
         self._add_action(file_menu, 'Add Files', 'Ctrl+O', self._on_add_files)
         self._add_action(file_menu, 'Add Folder', 'Ctrl+Shift+O', self._on_add_folder)
+        self.watch_action = self._add_action(file_menu, 'Watch Folder…', None, self._on_watch_folder)
+        self.watch_action.setCheckable(True)
         file_menu.addSeparator()
         self._add_action(file_menu, 'Clear Queue', None, self._on_clear_queue)
         file_menu.addSeparator()
@@ -170,9 +203,11 @@ class UIManager(QWidget):
         self.file_count_label = QLabel("0 files in queue")
         files_layout.addWidget(self.file_count_label)
         
-        self.file_list = FileListWidget()
+        self.queue_model = QueueListModel(self.main_window.file_manager.get_queue(), self)
+        self.file_list = FileListView()
+        self.file_list.setModel(self.queue_model)
         self.file_list.files_dropped.connect(self.files_added)
-        self.file_list.model().rowsMoved.connect(self._on_rows_moved)
+        self.file_list.rows_moved.connect(self._on_rows_moved)
         files_layout.addWidget(self.file_list)
         
         # File controls
@@ -190,10 +225,15 @@ class UIManager(QWidget):
         self.controls['clear_files'] = QPushButton("Clear All")
         self.controls['clear_files'].clicked.connect(self._on_clear_queue)
         
+        self.controls['cancel_scan'] = QPushButton("Cancel Scan")
+        self.controls['cancel_scan'].clicked.connect(self.scan_cancelled)
+        self.controls['cancel_scan'].setVisible(False)   # shown while a dropped folder is being scanned
+        
         file_controls.addWidget(self.controls['add_files'])
         file_controls.addWidget(self.controls['add_folder'])
         file_controls.addWidget(self.controls['remove_files'])
         file_controls.addWidget(self.controls['clear_files'])
+        file_controls.addWidget(self.controls['cancel_scan'])
         
         files_layout.addLayout(file_controls)
         files_group.setLayout(files_layout)
@@ -322,6 +362,13 @@ class UIManager(QWidget):
         header.addWidget(self.counter_label)
         layout.addLayout(header)
 
+        # Other files in flight when several jobs run at once
+        self.jobs_label = QLabel("")
+        self.jobs_label.setStyleSheet("color: #666; font-size: 11px;")
+        self.jobs_label.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Preferred)
+        self.jobs_label.setVisible(False)
+        layout.addWidget(self.jobs_label)
+
         # Current file bar + ETA line
         self.file_progress_bar = QProgressBar()
         self.file_progress_bar.setRange(0, 100)
@@ -365,7 +412,9 @@ class UIManager(QWidget):
         self.stat_bitrate = self._make_stat_tile("Bitrate")
         self.stat_size = self._make_stat_tile("Output size")
         self.stat_position = self._make_stat_tile("Position")
-        for tile in (self.stat_fps, self.stat_speed, self.stat_bitrate, self.stat_size, self.stat_position):
+        self.stat_threads = self._make_stat_tile("Threads")
+        for tile in (self.stat_fps, self.stat_speed, self.stat_bitrate, self.stat_size, self.stat_position,
+                     self.stat_threads):
             tiles.addWidget(tile.tile, 1)
         layout.addLayout(tiles)
 
@@ -733,6 +782,42 @@ class UIManager(QWidget):
         self.controls['threads'].setRange(1, MAX_THREADS)
         self.controls['threads'].setValue(MAX_THREADS)
         perf_layout.addWidget(self.controls['threads'], 0, 1)
+
+        perf_layout.addWidget(QLabel("Concurrent Jobs:"), 1, 0)
+        self.controls['workers'] = QSpinBox()
+        self.controls['workers'].setRange(1, MAX_WORKERS)
+        self.controls['workers'].setValue(DEFAULT_WORKERS)
+        self.controls['workers'].setToolTip(
+            "How many files are encoded at the same time.\n"
+            "A single 480p/720p encode cannot keep a many-core machine busy;\n"
+            "running several files side by side can."
+        )
+        perf_layout.addWidget(self.controls['workers'], 1, 1)
+
+        self.controls['chunked'] = QCheckBox("Split long files into chunks and encode them in parallel")
+        self.controls['chunked'].setToolTip(
+            f"Files of {CHUNK_MIN_DURATION // 60} minutes or more are cut at keyframes, the pieces are encoded\n"
+            "side by side and joined without re-encoding. One x265/AV1 encoder stops\n"
+            "scaling long before a big machine runs out of cores.\n"
+            "Not used with AviSynth+ or video stream copy."
+        )
+        perf_layout.addWidget(self.controls['chunked'], 2, 0, 1, 2)
+
+        perf_layout.addWidget(QLabel("Parallel Chunks:"), 3, 0)
+        self.controls['chunk_jobs'] = QSpinBox()
+        self.controls['chunk_jobs'].setRange(1, max(DEFAULT_CHUNK_JOBS, MAX_THREADS))
+        self.controls['chunk_jobs'].setValue(DEFAULT_CHUNK_JOBS)
+        self.controls['chunk_jobs'].setToolTip("How many chunks of one file are encoded at the same time")
+        perf_layout.addWidget(self.controls['chunk_jobs'], 3, 1)
+
+        self.controls['resumable'] = QCheckBox("Keep finished segments so a stopped encode can resume")
+        self.controls['resumable'].setToolTip(
+            f"Files of {CHUNK_MIN_DURATION // 60} minutes or more are encoded in keyframe-aligned segments\n"
+            "(one at a time unless chunked encoding is on). Segments finished before a Stop,\n"
+            "crash or power cut are kept, and the next run of the same file with the same\n"
+            "settings encodes only the rest before joining them without re-encoding."
+        )
+        perf_layout.addWidget(self.controls['resumable'], 4, 0, 1, 2)
         
         perf_group.setLayout(perf_layout)
         layout.addWidget(perf_group)
@@ -781,6 +866,42 @@ class UIManager(QWidget):
             "Files', the .old backup is removed as well. There is no undo."
         )
         file_layout.addWidget(self.controls['delete_source'])
+
+        self.controls['skip_encoded'] = QCheckBox("Skip Files Already Encoded With These Settings")
+        self.controls['skip_encoded'].setToolTip(
+            "Every successful encode is remembered by a fingerprint of its source\n"
+            "(size, modification time, sampled content) and of the settings used.\n"
+            "A file encoded before with the same settings, whose output still\n"
+            "exists, is passed over — re-running a preset only does the new files."
+        )
+        file_layout.addWidget(self.controls['skip_encoded'])
+
+        oversize_layout = QHBoxLayout()
+        self.controls['abort_oversize'] = QCheckBox("Keep the Original When the Output Would Exceed")
+        self.controls['abort_oversize'].setToolTip(
+            "While a file encodes, its final size is projected from the size written so far.\n"
+            "Once the projection clearly passes this share of the source size (or the output\n"
+            "already has), the encode is abandoned and the original kept — re-encoding an\n"
+            "already efficient source only costs hours and ends up larger. The reason is\n"
+            "written to the file's log and the run summary."
+        )
+        oversize_layout.addWidget(self.controls['abort_oversize'])
+        self.controls['oversize_percent'] = QSpinBox()
+        self.controls['oversize_percent'].setRange(10, 200)
+        self.controls['oversize_percent'].setValue(DEFAULT_OVERSIZE_PERCENT)
+        self.controls['oversize_percent'].setSuffix(" % of the source")
+        oversize_layout.addWidget(self.controls['oversize_percent'])
+        oversize_layout.addStretch()
+        file_layout.addLayout(oversize_layout)
+
+        self.controls['oversize_copy'] = QCheckBox("Copy the Original to the Output Folder Instead")
+        self.controls['oversize_copy'].setToolTip(
+            "When an encode is abandoned for its size, copy the source next to the other\n"
+            "outputs (under the output name, with the source's extension), so the output\n"
+            "folder stays complete. Not done with 'Replace Original Files', where the\n"
+            "original simply stays in place."
+        )
+        file_layout.addWidget(self.controls['oversize_copy'])
         
         file_group.setLayout(file_layout)
         layout.addWidget(file_group)
@@ -856,13 +977,10 @@ class UIManager(QWidget):
             if index >= 0:
                 self.controls['deinterlacer'].setCurrentIndex(index)
 
-    def _on_rows_moved(self, _parent, start, end, _dest, row):
-        """Internal drag-and-drop in the list → reorder the real queue"""
-        if start != end:
-            return  # multi-row moves are not supported by the queue model
-        to_index = row - 1 if row > start else row
-        # Defer: the view is still inside its drop handling when rowsMoved fires
-        QTimer.singleShot(0, lambda: self.files_reordered.emit(start, to_index))
+    def _on_rows_moved(self, rows, to_index):
+        """Internal drag-and-drop in the list → reorder the real queue (the model follows its delta)"""
+        # Defer: the view is still inside its drop handling
+        QTimer.singleShot(0, lambda: self.files_reordered.emit(rows, to_index))
 
     def _on_add_files(self):
         """Add files dialog"""
@@ -882,9 +1000,20 @@ class UIManager(QWidget):
         if folder:
             self.main_window.file_manager.add_folder(folder)
     
+    def _on_watch_folder(self, checked):
+        """Start watching a folder for new files (asks which), or stop watching"""
+        if not checked:
+            self.watch_requested.emit('')
+            return
+        folder = QFileDialog.getExistingDirectory(self.main_window, "Select Folder to Watch")
+        if folder:
+            self.watch_requested.emit(folder)
+        else:
+            self.watch_action.setChecked(False)
+
     def _on_remove_files(self):
         """Remove selected files"""
-        selected = [self.file_list.row(item) for item in self.file_list.selectedItems()]
+        selected = [index.row() for index in self.file_list.selectionModel().selectedRows()]
         if selected:
             self.files_removed.emit(selected)
     
@@ -909,35 +1038,34 @@ class UIManager(QWidget):
             "Drag and drop files or folders to process."
         )
     
-    def update_file_list(self, files):
-        """Rebuild the list from the queue, keeping per-file state colours"""
-        self._files = list(files)
-        self.file_list.clear()
-        for file in files:
-            label = f"{file.filename} ({file.get_file_size_mb():.1f} MB)"
-            if file.vmaf_score is not None:
-                label += f" | VMAF: {file.vmaf_score:.1f}"
-            item = QListWidgetItem(label)
-            item.setToolTip(file.filepath)
-            item.setSizeHint(QSize(0, 32))
-            self._style_item(item, getattr(file, 'status', 'pending'))
-            self.file_list.addItem(item)
+    def update_file_info(self, file):
+        """Refresh one entry once the background probe has filled in its media fields"""
+        row = self.queue_model.row_of(file)
+        if row is not None:
+            self.queue_model.refresh_row(row)
 
     def update_file_count(self, count):
         """Update file count label"""
         self.file_count_label.setText(f"{count} files in queue")
         self.controls['start'].setEnabled(count > 0)
     
-    _FILE_STATE_COLORS = {
-        'running': QColor(255, 244, 179),   # soft yellow
-        'success': QColor(200, 240, 200),   # soft green
-        'failed': QColor(250, 200, 200),    # soft red
-    }
-    _FILE_STATE_GLYPHS = {
-        'running': '▶  ',
-        'success': '✔  ',
-        'failed': '✖  ',
-    }
+    def update_scan_progress(self, found):
+        """A folder scan is running: show how many video files it has found so far"""
+        self.controls['cancel_scan'].setVisible(True)
+        self.update_status(f"Scanning folders… {found} video file{'s' if found != 1 else ''} found")
+
+    def finish_scan(self, added, cancelled):
+        """A folder scan ended; keep the cancel button while another one is still running"""
+        if not self.main_window.file_manager.is_scanning():
+            self.controls['cancel_scan'].setVisible(False)
+        what = "Folder scan cancelled" if cancelled else "Folder scan finished"
+        self.update_status(f"{what}: added {added} file{'s' if added != 1 else ''}")
+
+    def update_watch(self, folder, message):
+        """The folder watch started or stopped"""
+        self.watch_action.setChecked(bool(folder))
+        self.watch_action.setToolTip(f"Watching {folder}" if folder else "")
+        self.update_status(message[:1].upper() + message[1:])
 
     def update_progress(self, value, maximum):
         """Update overall progress bar"""
@@ -957,7 +1085,7 @@ class UIManager(QWidget):
     def update_stats(self, snap: Dict[str, Any]):
         """Refresh the progress panel from a ProcessManager snapshot"""
         phase = snap.get('phase') or 'Working'
-        if not getattr(self, '_ui_paused', False):
+        if not (getattr(self, '_ui_paused', False) or getattr(self, '_ui_stopping', False)):
             self.phase_label.setText(phase)
             self.phase_label.setStyleSheet(
                 "QLabel { background: #d6e9ff; color: #1b4f8a; border-radius: 8px; padding: 1px 8px; font-size: 11px; font-weight: bold; }")
@@ -969,6 +1097,20 @@ class UIManager(QWidget):
         self.current_file_label.setToolTip(name)
         self.counter_label.setText(f"{snap.get('file_index', 0) + 1} / {snap.get('total_files', 0)}")
 
+        others = [job for job in snap.get('jobs') or [] if job.get('file_index') != snap.get('file_index')]
+        if others:
+            parts = []
+            for job in others:
+                pct = f"{job['percent']:.0f}%" if job.get('percent') is not None else "…"
+                threads = f" [{job['threads']} thr]" if job.get('threads') else ""
+                parts.append(f"{job['file_index'] + 1}. {job.get('file_name') or ''} — "
+                             f"{job.get('phase') or ''} {pct}{threads}")
+            text = "Also running: " + "  ·  ".join(parts)
+            self.jobs_label.setText(self.jobs_label.fontMetrics().elidedText(
+                text, Qt.TextElideMode.ElideRight, max(50, self.jobs_label.width() - 10)))
+            self.jobs_label.setToolTip("\n".join(parts))
+        self.jobs_label.setVisible(bool(others))
+
         percent = snap.get('percent')
         if percent is None:
             self.file_progress_bar.setRange(0, 0)   # busy indicator (unknown duration)
@@ -993,6 +1135,9 @@ class UIManager(QWidget):
             self.stat_position.setText(f"{pos} / {format_duration(duration)}" if duration else pos)
         else:
             self.stat_position.setText("--")
+        threads = snap.get('threads')
+        self.stat_threads.setText(str(threads) if threads else "--")
+        self.stat_threads.tile.setToolTip(f"CPU share of this step: {snap['cpu']}" if snap.get('cpu') else "")
 
     def reset_progress_panel(self, message: str = "Ready — add files and press Start"):
         """Return the panel to its idle look"""
@@ -1002,44 +1147,36 @@ class UIManager(QWidget):
         self.current_file_label.setText(message)
         self.current_file_label.setToolTip("")
         self.counter_label.setText("")
+        self.jobs_label.setText("")
+        self.jobs_label.setVisible(False)
         self.file_progress_bar.setRange(0, 100)
         self.file_progress_bar.setValue(0)
         self.file_eta_label.setText("File ETA: --")
         self.file_elapsed_label.setText("Elapsed: --")
         self.time_label.setText("Total ETA: --")
         self.total_elapsed_label.setText("Elapsed: --")
-        for tile in (self.stat_fps, self.stat_speed, self.stat_bitrate, self.stat_size, self.stat_position):
+        for tile in (self.stat_fps, self.stat_speed, self.stat_bitrate, self.stat_size, self.stat_position,
+                     self.stat_threads):
             tile.setText("--")
+        self.stat_threads.tile.setToolTip("")
 
     def set_file_state(self, index: int, state: str):
         """Colour and mark a queue entry by processing state (and remember it on the file)"""
-        files = getattr(self, '_files', [])
-        if 0 <= index < len(files):
-            files[index].status = state
-        item = self.file_list.item(index)
-        if item:
-            self._style_item(item, state)
-            if state == 'running':
-                self.file_list.clearSelection()
-                self.file_list.scrollToItem(item)
-
-    def _style_item(self, item: 'QListWidgetItem', state: str):
-        """Apply background colour and a leading glyph for the given state"""
-        color = self._FILE_STATE_COLORS.get(state)
-        if color:
-            item.setBackground(QBrush(color))
-        glyph = self._FILE_STATE_GLYPHS.get(state, '')
-        text = item.text()
-        for g in self._FILE_STATE_GLYPHS.values():
-            if text.startswith(g):
-                text = text[len(g):]
-                break
-        item.setText(glyph + text)
+        file = self.queue_model.file_at(index)
+        if file is None:
+            return
+        file.status = state
+        # A finished file may have replaced its source: look the size up again
+        self.queue_model.refresh_row(index, size_changed=state == 'success')
+        if state == 'running':
+            self.file_list.clearSelection()
+            self.file_list.scrollTo(self.queue_model.index(index))
 
     def set_file_vmaf(self, index: int, score: float):
-        item = self.file_list.item(index)
-        if item:
-            item.setText(f"{item.text()} | VMAF: {score:.1f}")
+        file = self.queue_model.file_at(index)
+        if file is not None:
+            file.vmaf_score = score
+            self.queue_model.refresh_row(index)
 
     def update_ffmpeg_status(self, available):
         """Update FFmpeg status in status bar"""
@@ -1060,10 +1197,21 @@ class UIManager(QWidget):
                 "QLabel { background: #fff3cd; color: #856404; border-radius: 8px; padding: 1px 8px; font-size: 11px; font-weight: bold; }")
         # on resume the next progress snapshot restores the phase pill
 
+    def set_stopping_state(self, stopping: bool):
+        """Stop was pressed: the run is unwinding, nothing more can be asked of it until it has"""
+        self._ui_stopping = stopping
+        if stopping:
+            self.controls['pause'].setEnabled(False)
+            self.controls['stop'].setEnabled(False)
+            self.phase_label.setText("Stopping…")
+            self.phase_label.setStyleSheet(
+                "QLabel { background: #f8d7da; color: #721c24; border-radius: 8px; padding: 1px 8px; font-size: 11px; font-weight: bold; }")
+
     def set_processing_state(self, is_processing):
         """Set UI state for processing"""
         self._processing_active = is_processing
         self._ui_paused = False
+        self._ui_stopping = False
         if is_processing:
             self.reset_progress_panel("Starting…")
         else:
@@ -1073,6 +1221,7 @@ class UIManager(QWidget):
             self.file_progress_bar.setRange(0, 100)
             self.file_eta_label.setText("File ETA: --")
             self.time_label.setText("Total ETA: --")
+            self.jobs_label.setVisible(False)
         self.controls['start'].setEnabled(not is_processing)
         self.controls['pause'].setEnabled(is_processing)
         self.controls['pause'].setText("Pause")
@@ -1086,10 +1235,10 @@ class UIManager(QWidget):
         # Disable internal drag-drop reordering during processing (prevents index corruption)
         # but keep external file drops working
         if is_processing:
-            self.file_list.setDragDropMode(QListWidget.DragDropMode.NoDragDrop)
+            self.file_list.setDragDropMode(QAbstractItemView.DragDropMode.NoDragDrop)
             self.file_list.setAcceptDrops(True)
         else:
-            self.file_list.setDragDropMode(QListWidget.DragDropMode.InternalMove)
+            self.file_list.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
             self.file_list.setAcceptDrops(True)
     
     def get_current_settings(self) -> Dict[str, Any]:
@@ -1113,7 +1262,15 @@ class UIManager(QWidget):
             'corrupt_fix': self.controls['corrupt_fix'].isChecked(),
             'replace_files': self.controls['replace_files'].isChecked(),
             'delete_source': self.controls['delete_source'].isChecked(),
+            'skip_encoded': self.controls['skip_encoded'].isChecked(),
+            'abort_oversize': self.controls['abort_oversize'].isChecked(),
+            'oversize_percent': self.controls['oversize_percent'].value(),
+            'oversize_copy': self.controls['oversize_copy'].isChecked(),
             'threads': self.controls['threads'].value(),
+            'workers': self.controls['workers'].value(),
+            'chunked': self.controls['chunked'].isChecked(),
+            'chunk_jobs': self.controls['chunk_jobs'].value(),
+            'resumable': self.controls['resumable'].isChecked(),
             'ffmpeg_extras': self.controls['ffmpeg_extras'].text(),
             'avisynth_extras': self.controls['avisynth_extras'].toPlainText(),
             'par_mode': self.controls['par_mode'].currentText(),
@@ -1156,7 +1313,8 @@ class UIManager(QWidget):
     
     def load_settings(self, qsettings: QSettings):
         """Load all settings from QSettings"""
-        int_keys = ('crf', 'abr', 'threads', 'custom_width', 'custom_height')
+        int_keys = ('crf', 'abr', 'threads', 'workers', 'chunk_jobs', 'oversize_percent', 'custom_width',
+                    'custom_height')
         settings = {}
         for key in qsettings.allKeys():
             value = qsettings.value(key)
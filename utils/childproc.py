@@ -4,23 +4,37 @@ exiftool or any other helper running.
 
     from utils.childproc import popen, kill_all
     proc = popen(cmd, ...)          # drop-in for subprocess.Popen; the process is tracked
+    suspend(proc) / resume(proc)    # the whole tree
+    kill(proc)                      # the whole tree
     kill_all()                      # called automatically at interpreter exit and on QApplication.aboutToQuit
 
 Three layers:
   * atexit + QApplication.aboutToQuit -> kill_all() on every normal quit
   * Windows: every child is assigned to a Job object with KILL_ON_JOB_CLOSE -> the OS kills the tree the moment our
     process dies, crash or Task Manager included
-  * Linux: every child gets PR_SET_PDEATHSIG=SIGKILL -> same guarantee from the kernel
+  * Linux: every child gets PR_SET_PDEATHSIG=SIGKILL -> same guarantee from the kernel. It is set by exec'ing the
+    command through `setpriv --pdeathsig KILL` (util-linux), which keeps CPython on its vfork() spawn path; a
+    preexec_fn forces a full fork() of the parent, which in a Qt process with a large heap costs milliseconds per
+    child. Without setpriv the preexec_fn is used as before.
   macOS has no parent-death signal; there the first layer applies (keep helpers stoppable).
+
+On Linux and macOS every child also starts in a session (and so a process group) of its own, with the child as
+the leader. Suspending, resuming or killing a tree is then one killpg() that the kernel applies to every member at
+once, including a grandchild spawned a moment earlier; walking the tree with psutil reads /proc once per
+descendant and misses whatever appears mid-walk. Windows, which has no process groups in this sense, keeps the
+psutil walk.
 """
 import atexit
 import os
+import shutil
+import signal
 import subprocess
 import sys
 import threading
-from typing import Optional, Set
+from typing import List, Optional, Set
 
 _procs: Set[subprocess.Popen] = set()
+_grouped: Set[subprocess.Popen] = set()      # children leading a process group of their own
 _lock = threading.Lock()
 _job = None
 
@@ -106,13 +120,130 @@ def _die_with_parent():
         pass
 
 
+_setpriv: Optional[List[str]] = None
+_setpriv_checked = False
+
+
+def _pdeathsig_prefix() -> Optional[List[str]]:
+    """`setpriv --pdeathsig KILL --` if this system's setpriv has the option (util-linux 2.33+); checked once"""
+    global _setpriv, _setpriv_checked
+    with _lock:
+        if _setpriv_checked:
+            return _setpriv
+        _setpriv_checked = True
+    prefix = None
+    path = shutil.which("setpriv")
+    if path:
+        prefix = [path, "--pdeathsig", "KILL", "--"]
+        try:
+            if subprocess.run(prefix + ["true"], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL, timeout=5).returncode != 0:
+                prefix = None
+        except (OSError, subprocess.SubprocessError):
+            prefix = None
+    with _lock:
+        _setpriv = prefix
+    return prefix
+
+
+def _with_pdeathsig(args: tuple, kwargs: dict) -> Optional[tuple]:
+    """
+    *args* with the command run through setpriv, or None when it cannot be: shell commands, an explicit
+    executable, or a program that is not found — Popen must still raise FileNotFoundError for that itself,
+    where setpriv would only exit with 127.
+    """
+    if kwargs.get("shell") or kwargs.get("executable") or not args:
+        return None
+    command = args[0]
+    if not isinstance(command, (list, tuple)) or not command:
+        return None
+    prefix = _pdeathsig_prefix()
+    if prefix is None:
+        return None
+    env = kwargs.get("env")
+    program = os.fsdecode(command[0])
+    if kwargs.get("cwd") and os.path.dirname(program) and not os.path.isabs(program):
+        return None     # relative to a cwd that is not ours
+    resolved = shutil.which(program, path=env.get("PATH") if env else None)
+    if resolved is None:
+        return None
+    return (prefix + [resolved] + list(command[1:]),) + tuple(args[1:])
+
+
 def popen(*args, **kwargs) -> subprocess.Popen:
-    """subprocess.Popen that is tracked, hidden on Windows, and dies with us on Windows (Job) and Linux (PDEATHSIG)."""
+    """
+    subprocess.Popen that is tracked, hidden on Windows, dies with us on Windows (Job) and Linux (PDEATHSIG), and
+    leads its own process group on POSIX. The session is created before PDEATHSIG is set, and setsid() does not
+    clear it, so the parent-death guarantee holds for group leaders too.
+    """
+    grouped = False
     if sys.platform == "win32":
         kwargs.setdefault("creationflags", CREATE_NO_WINDOW)
-    elif _libc is not None and "preexec_fn" not in kwargs:
-        kwargs["preexec_fn"] = _die_with_parent
-    return register(subprocess.Popen(*args, **kwargs))
+    else:
+        if sys.platform.startswith("linux") and "preexec_fn" not in kwargs:
+            wrapped = _with_pdeathsig(args, kwargs)
+            if wrapped is not None:
+                args = wrapped
+            elif _libc is not None:
+                kwargs["preexec_fn"] = _die_with_parent
+        grouped = kwargs.setdefault("start_new_session", True)
+    proc = register(subprocess.Popen(*args, **kwargs))
+    if grouped:
+        with _lock:
+            _grouped.add(proc)
+    return proc
+
+
+def _signal_group(proc: subprocess.Popen, sig: int) -> bool:
+    """
+    killpg() the child's group; False when it has none (Windows, or not started by popen()). Only while the
+    leader has not been reaped: until then its pid, and with it the group id, cannot belong to anyone else.
+    """
+    with _lock:
+        if proc not in _grouped:
+            return False
+    if proc.returncode is None:
+        try:
+            os.killpg(proc.pid, sig)
+        except OSError:
+            pass        # the whole group is gone already
+    return True
+
+
+def _signal_tree(proc: subprocess.Popen, suspend: bool, handle=None):
+    """psutil fallback for suspend()/resume(): the parent, then every descendant it has right now"""
+    try:
+        import psutil
+        parent = handle or psutil.Process(proc.pid)
+        if not parent.is_running():
+            return
+        for child in [parent] + parent.children(recursive=True):
+            try:
+                child.suspend() if suspend else child.resume()
+            except psutil.Error:
+                pass
+    except Exception:
+        pass
+
+
+def suspend(proc: subprocess.Popen, handle=None) -> None:
+    """
+    Suspend a child and everything it spawned. *handle* is the psutil.Process taken when the child was started,
+    for the fallback: looking the pid up again later could find an unrelated process that inherited it.
+    """
+    if not _signal_group(proc, signal.SIGSTOP if hasattr(signal, "SIGSTOP") else 0):
+        _signal_tree(proc, True, handle)
+
+
+def resume(proc: subprocess.Popen, handle=None) -> None:
+    if not _signal_group(proc, signal.SIGCONT if hasattr(signal, "SIGCONT") else 0):
+        _signal_tree(proc, False, handle)
+
+
+def has_group(proc: subprocess.Popen) -> bool:
+    """True when suspend/resume/kill reach the child's tree through its process group"""
+    with _lock:
+        return proc in _grouped
 
 
 def run(*args, timeout: Optional[float] = None, **kwargs) -> subprocess.CompletedProcess:
@@ -134,10 +265,18 @@ def run(*args, timeout: Optional[float] = None, **kwargs) -> subprocess.Complete
 def forget(proc: subprocess.Popen) -> None:
     with _lock:
         _procs.discard(proc)
+        _grouped.discard(proc)
 
 
 def kill(proc: subprocess.Popen) -> None:
     """Kill one process and everything it spawned."""
+    if _signal_group(proc, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM):
+        try:
+            proc.wait(timeout=5)
+        except Exception:
+            pass
+        forget(proc)
+        return
     if proc.poll() is not None:
         forget(proc)
         return
@@ -0,0 +1,126 @@
+"""
+One CPU budget shared by everything that runs at once — several files, or an encode next to a VMAF pass.
+
+    budget = CpuBudget(total=16, slots=2)
+    share = budget.acquire("3 Encoding", avisynth=False)     # ThreadShare: decoder/filter/encoder/prefetch...
+    cmd = builder.build_main_command(src, dst, threads=share)
+    ...
+    budget.release(share)
+
+The user's "threads" setting used to go verbatim into every FFmpeg's -threads, and AviSynth's Prefetch divided the
+same number again on its own. Two encodes side by side therefore asked for twice the machine. Here each running step
+is handed a slice of the budget instead; steps that start after others finish get the cores those left behind.
+"""
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+
+class ThreadShare:
+    """The threads one running step may use, split across the stages of its pipeline"""
+
+    def __init__(self, owner: str, threads: int, decoder: int, filter_threads: int, encoder: int,
+                 avisynth: int = 0):
+        self.owner = owner
+        self.threads = threads              # the slice of the budget this step holds
+        self.decoder = decoder              # -threads before -i
+        self.filter_threads = filter_threads  # -filter_threads
+        self.encoder = encoder              # -threads after -i
+        self.avisynth = avisynth            # budget for the AviSynth script (Prefetch x EdiThreads), 0 = none
+
+    def describe(self) -> str:
+        parts = [f"{self.threads} of budget", f"decoder {self.decoder}", f"filters {self.filter_threads}",
+                 f"encoder {self.encoder}"]
+        if self.avisynth:
+            parts.append(f"AviSynth {self.avisynth}")
+        return ", ".join(parts)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'owner': self.owner, 'threads': self.threads, 'decoder': self.decoder,
+                'filter_threads': self.filter_threads, 'encoder': self.encoder, 'avisynth': self.avisynth}
+
+    def __repr__(self) -> str:
+        return f"<ThreadShare {self.owner}: {self.describe()}>"
+
+
+class CpuBudget:
+    """Hands out slices of a fixed core budget to concurrently running steps (thread-safe)"""
+
+    def __init__(self, total: int, slots: int = 1):
+        self.total = max(1, int(total))
+        self._slots = max(1, int(slots))
+        self._held: List[ThreadShare] = []
+        self._waiting: Deque[object] = deque()     # steps waiting for a slice, served in arrival order
+        self._lock = threading.Lock()
+        self._freed = threading.Condition(self._lock)
+
+    def set_slots(self, slots: int):
+        """How many steps are expected to run side by side (workers, capped by the files left)"""
+        with self._lock:
+            self._slots = max(1, int(slots))
+            self._freed.notify_all()
+
+    def acquire(self, owner: str, avisynth: bool = False, qtgmc: bool = False) -> ThreadShare:
+        """
+        Take a slice for one step. The fair slice is total / (steps expected to run at once); a step that
+        starts while others still hold more than their fair slice makes do with what is free, but waits until
+        at least half of its fair slice is free rather than oversubscribing the budget. Waiting steps are served
+        first come, first served: a later step never takes the cores an earlier one is waiting for.
+        """
+        ticket = object()
+        with self._lock:
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    if self._waiting[0] is ticket:
+                        concurrent = max(self._slots, len(self._held) + 1)
+                        fair = max(1, self.total // concurrent)
+                        free = self.total - sum(share.threads for share in self._held)
+                        if free >= max(1, fair // 2):
+                            break
+                    self._freed.wait()
+            finally:
+                self._waiting.remove(ticket)
+                self._freed.notify_all()
+            share = self._split(owner, min(fair, free), avisynth, qtgmc)
+            self._held.append(share)
+            return share
+
+    def release(self, share: Optional[ThreadShare]):
+        if share is None:
+            return
+        with self._lock:
+            try:
+                self._held.remove(share)
+            except ValueError:
+                pass
+            self._freed.notify_all()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """What every running step currently holds"""
+        with self._lock:
+            return [share.as_dict() for share in self._held]
+
+    def describe(self) -> str:
+        """The snapshot as one log line: '4 of 16 free; 1 Encoding 8, 2 Transcoding 4'"""
+        held = self.snapshot()
+        free = self.total - sum(share['threads'] for share in held)
+        return f"{free} of {self.total} free; " + (", ".join(f"{share['owner']} {share['threads']}" for share in held)
+                                                   or "nothing running")
+
+    @staticmethod
+    def _split(owner: str, threads: int, avisynth: bool, qtgmc: bool) -> ThreadShare:
+        """
+        Divide one slice between the stages of an FFmpeg run so that together they use the slice and no more.
+        The encoder is where the time goes; decoding and filtering run alongside it and need a fraction. With
+        AviSynth+ the script (QTGMC in particular) is the expensive part and FFmpeg only encodes what it is handed.
+        Every stage gets at least one thread, so only a slice smaller than the number of stages is exceeded.
+        """
+        if avisynth:
+            rest = max(1, threads - 2)      # the .avs demuxer decodes, and filters nothing, on a thread each
+            script = max(1, rest * 2 // 3) if qtgmc else max(1, rest // 2)
+            encoder = max(1, rest - script)
+            return ThreadShare(owner, threads, decoder=1, filter_threads=1, encoder=encoder, avisynth=script)
+        side = max(1, threads // 8)
+        encoder = max(1, threads - 2 * side)
+        return ThreadShare(owner, threads, decoder=side, filter_threads=side, encoder=encoder)
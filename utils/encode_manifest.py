@@ -0,0 +1,164 @@
+"""
+Manifest of finished encodes.
+
+    manifest = get_encode_manifest()
+    job = settings_fingerprint(settings)            # once per run
+    source = source_fingerprint(path)               # once per file
+    if manifest.done(source, job):                  # an output made from this exact source with these settings exists
+        ...skip...
+    manifest.record(source, job, output_path, path)
+
+Re-running a preset over a library re-encoded every file, because a run had no notion of "this exact job has been
+done". Each successful encode is now recorded under a fingerprint of its source (size, mtime and a hash of a few
+sampled blocks — a few dozen KB read, whatever the file size) and a hash of the effective FFmpeg command and
+settings. A re-queued file with a matching entry whose output still exists is skipped with one indexed lookup, which
+turns a nightly re-run into an incremental pass. Like the probe cache this is an SQLite file in the app directory,
+shared by the GUI and the command line; if it cannot be used, nothing is skipped.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import ENCODE_MANIFEST_FILE, ENCODE_MANIFEST_MAX_ENTRIES
+from models.file_models import canonical_path
+from utils.ffmpeg_utils import FFmpegCommandBuilder
+
+SAMPLE_SIZE = 32 * 1024
+SAMPLES = 3                 # start, middle, end
+
+# Settings that change how fast or where a run works, not what a file encodes to
+RUN_ONLY_SETTINGS = ('threads', 'workers', 'chunked', 'chunk_jobs', 'replace_files', 'delete_source',
+                     'calculate_vmaf', 'skip_encoded', 'resumable', 'abort_oversize', 'oversize_percent',
+                     'oversize_copy')
+
+
+def source_fingerprint(filepath: str) -> Optional[str]:
+    """size:mtime_ns:hash of SAMPLES blocks spread over the file; None if it cannot be read"""
+    try:
+        st = os.stat(filepath)
+        digest = hashlib.blake2b(digest_size=16)
+        with open(filepath, 'rb') as f:
+            last = max(0, st.st_size - SAMPLE_SIZE)
+            for n in range(SAMPLES):
+                f.seek(last * n // max(1, SAMPLES - 1))
+                digest.update(f.read(SAMPLE_SIZE))
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}:{digest.hexdigest()}"
+
+
+def settings_fingerprint(settings: Dict[str, Any]) -> str:
+    """
+    Hash of what decides the output: the main FFmpeg command as this version builds it (placeholder paths, no
+    thread counts) plus every setting that is not purely about running the job
+    """
+    effective = {key: value for key, value in settings.items() if key not in RUN_ONLY_SETTINGS}
+    builder = FFmpegCommandBuilder(dict(settings, threads=0))
+    command = builder.build_main_command('{input}', '{output}', bool(settings.get('use_avisynth')))
+    payload = json.dumps({'command': command[1:], 'settings': effective}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class EncodeManifest:
+    """SQLite-backed record of successful encodes (thread-safe)"""
+
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path: str = ENCODE_MANIFEST_FILE, max_entries: int = ENCODE_MANIFEST_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._failed = False
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open lazily; a manifest that cannot be opened is disabled for the rest of the process"""
+        if self._db is not None or self._failed:
+            return self._db
+        try:
+            db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = db.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            if row is None or row[0] != str(self.SCHEMA_VERSION):
+                db.execute("DROP TABLE IF EXISTS encodes")
+                db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema', ?)",
+                           (str(self.SCHEMA_VERSION),))
+            db.execute("CREATE TABLE IF NOT EXISTS encodes ("
+                       " source TEXT NOT NULL, job TEXT NOT NULL, output TEXT NOT NULL, path TEXT,"
+                       " stored REAL NOT NULL, PRIMARY KEY (source, job))")
+            self._db = db
+            self._prune()
+        except sqlite3.Error:
+            self._failed = True
+            self._db = None
+        return self._db
+
+    def _prune(self):
+        count = self._db.execute("SELECT COUNT(*) FROM encodes").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute("DELETE FROM encodes WHERE rowid IN "
+                             "(SELECT rowid FROM encodes ORDER BY stored LIMIT ?)", (excess,))
+
+    # ------------------------------------------------------------------
+    def lookup(self, source: Optional[str], job: str) -> Optional[str]:
+        """Output recorded for this source fingerprint and job hash, or None"""
+        if not source:
+            return None
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return None
+            try:
+                row = db.execute("SELECT output FROM encodes WHERE source = ? AND job = ?", (source, job)).fetchone()
+            except sqlite3.Error:
+                return None
+        return row[0] if row else None
+
+    def done(self, source: Optional[str], job: str) -> Optional[str]:
+        """The recorded output, if there is one and it still exists (non-empty)"""
+        output = self.lookup(source, job)
+        try:
+            return output if output and os.path.getsize(output) > 0 else None
+        except OSError:
+            return None
+
+    def record(self, source: Optional[str], job: str, output: str, filepath: Optional[str] = None):
+        if not source:
+            return
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                db.execute("INSERT OR REPLACE INTO encodes (source, job, output, path, stored) "
+                           "VALUES (?, ?, ?, ?, ?)",
+                           (source, job, os.path.abspath(output), filepath and canonical_path(filepath),
+                            time.time()))
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_manifest: Optional[EncodeManifest] = None
+_manifest_lock = threading.Lock()
+
+
+def get_encode_manifest() -> EncodeManifest:
+    """The process-wide manifest"""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = EncodeManifest()
+        return _manifest
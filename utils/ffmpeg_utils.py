@@ -3,12 +3,16 @@ FFmpeg utilities for videer
 Handles FFmpeg command generation and execution
 """
 
+import json
 import os
 import shlex
 import shutil
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import subprocess
 from utils import childproc
+from utils.cpu_budget import ThreadShare
+from utils.media_header import read_header
+from utils.probe_cache import get_probe_cache
 from config import (PRESET_MAPPING, NVENC_PRESET_MAPPING, SVTAV1_PRESET_MAPPING,
                     VP9_CPU_USED_MAPPING, PAR_PRESETS, DAR_PRESETS,
                     RESOLUTION_PRESETS, DEFAULT_SCALE_ALGORITHM)
@@ -67,20 +71,103 @@ def find_ffprobe() -> Optional[str]:
     return None
 
 
+def probe_media(filepath: str) -> Optional[Dict[str, Any]]:
+    """
+    Everything ffprobe knows about the container and its streams, from one
+    `-show_format -show_streams -of json` call (or the probe cache). None if unavailable.
+    Matroska and MP4 headers are read directly (see media_header); ffprobe only runs for
+    what that reader cannot answer, including a pix_fmt it could not take from the codec
+    configuration record.
+    """
+    if not os.path.exists(filepath):
+        return None
+    data = read_header(filepath)
+    if data is not None and all(s.get('pix_fmt') for s in data['streams'] if s['codec_type'] == 'video'):
+        return data
+    cache = get_probe_cache()
+    cached = cache.get(filepath, 'media')
+    if cached is None:
+        cached = run_ffprobe_media(filepath)
+        cache.put(filepath, 'media', cached)
+    return cached if cached is not None else data
+
+
+def run_ffprobe_media(filepath: str) -> Optional[Dict[str, Any]]:
+    """The ffprobe half of probe_media: always spawns ffprobe, never consults the cache"""
+    ffprobe = find_ffprobe()
+    if not ffprobe:
+        return None
+    try:
+        result = childproc.run(
+            [ffprobe, '-v', 'error', '-show_format', '-show_streams', '-of', 'json', filepath],
+            text=True, timeout=30)
+        data = json.loads(result.stdout or '{}')
+    except (subprocess.SubprocessError, ValueError, OSError):
+        return None
+    if result.returncode != 0 or not isinstance(data, dict) or 'format' not in data:
+        return None
+    return data
+
+
 def probe_duration(filepath: str) -> Optional[float]:
     """Return media duration in seconds via ffprobe, or None if unavailable"""
-    ffprobe = find_ffprobe()
-    if not ffprobe or not os.path.exists(filepath):
+    data = probe_media(filepath)
+    try:
+        return float(data['format']['duration']) if data else None
+    except (KeyError, TypeError, ValueError):
         return None
+
+
+def probe_has_audio(filepath: str) -> bool:
+    """True if the file has at least one audio stream (assumed so when ffprobe is unavailable)"""
+    data = probe_media(filepath)
+    if data is None:
+        return True
+    return any(stream.get('codec_type') == 'audio' for stream in data.get('streams') or [])
+
+
+def _probe_start_time(ffprobe: str, filepath: str) -> float:
+    """Container start time in seconds (transport streams rarely start at 0)"""
     try:
         result = childproc.run(
-            [ffprobe, '-v', 'error', '-show_entries', 'format=duration',
+            [ffprobe, '-v', 'error', '-show_entries', 'format=start_time',
              '-of', 'default=noprint_wrappers=1:nokey=1', filepath],
             text=True, timeout=30)
         value = result.stdout.strip().splitlines()
-        return float(value[0]) if value else None
+        return float(value[0]) if value else 0.0
     except (subprocess.SubprocessError, ValueError, OSError):
-        return None
+        return 0.0
+
+
+def probe_keyframes(filepath: str, near: List[float], window: float = 10.0) -> List[float]:
+    """
+    Keyframe timestamps of the first video stream around the given times, sorted, in seconds from the start
+    of the file (what -ss expects). Only a few seconds after each seek point are read (-read_intervals), so
+    this stays fast on long files; the demuxer seeks to the keyframe at or before each point, which is the
+    one a chunk boundary wants.
+    """
+    ffprobe = find_ffprobe()
+    if not ffprobe or not near or not os.path.exists(filepath):
+        return []
+    start = _probe_start_time(ffprobe, filepath)
+    intervals = ','.join(f'{max(0.0, t) + start:.3f}%+{window:g}' for t in near)
+    try:
+        result = childproc.run(
+            [ffprobe, '-v', 'error', '-select_streams', 'v:0', '-read_intervals', intervals,
+             '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', filepath],
+            text=True, timeout=120)
+    except (subprocess.SubprocessError, OSError):
+        return []
+    found = set()
+    for line in result.stdout.splitlines():
+        fields = line.strip().split(',')
+        if len(fields) < 2 or 'K' not in fields[1]:
+            continue
+        try:
+            found.add(round(float(fields[0]) - start, 6))
+        except ValueError:
+            continue
+    return sorted(found)
 
 
 class FFmpegCommandBuilder:
@@ -120,9 +207,12 @@ class FFmpegCommandBuilder:
         return cmd
 
     def build_transcode_command(self, input_file: str, output_file: str,
-                                transcode_video: bool, transcode_audio: bool) -> List[str]:
+                                transcode_video: bool, transcode_audio: bool,
+                                threads: Optional[ThreadShare] = None) -> List[str]:
         """Build command for transcoding to raw formats"""
         cmd = self._base_command()
+        if threads is not None:
+            cmd.extend(['-threads', str(threads.decoder)])
         cmd.extend(['-i', input_file])
         # AVI intermediate: video + audio only (AVI cannot carry text subtitles)
         cmd.extend(['-map', '0:v', '-map', '0:a?', '-sn'])
@@ -139,8 +229,17 @@ class FFmpegCommandBuilder:
         return cmd
     
     def build_main_command(self, input_file: str, output_file: str,
-                          use_avisynth: bool = False) -> List[str]:
-        """Build main FFmpeg encoding command"""
+                          use_avisynth: bool = False,
+                          threads: Optional[ThreadShare] = None,
+                          segment: Optional[Tuple[float, Optional[float]]] = None) -> List[str]:
+        """
+        Build main FFmpeg encoding command. `threads` is this step's share of the CPU budget; without one the
+        plain 'threads' setting is used for the encoder as before.
+
+        `segment` = (start, length) encodes only that stretch of the first video stream into a bare Matroska
+        piece for chunked encoding (length None = to the end); audio, subtitles and metadata are added when
+        the pieces are joined.
+        """
         cmd = self._base_command()
         
         # Hardware acceleration for NVENC
@@ -152,38 +251,59 @@ class FFmpegCommandBuilder:
         if self.settings.get('corrupt_fix', False):
             cmd.extend(['-fflags', '+genpts+discardcorrupt'])
 
+        # Decoder and filter graph threads come out of the same share as the encoder. An .avs input is
+        # decoded by AviSynth itself, whose budget is written into the script.
+        if threads is not None:
+            if not use_avisynth:
+                cmd.extend(['-threads', str(threads.decoder)])
+            cmd.extend(['-filter_threads', str(threads.filter_threads)])
+
+        # Input seeking lands on the keyframe the chunk starts at; -t ends it where the next one begins
+        if segment is not None:
+            cmd.extend(['-ss', f'{segment[0]:.6f}'])
+
         # Input file
         cmd.extend(['-i', input_file, '-y'])
+        if segment is not None and segment[1] is not None:
+            cmd.extend(['-t', f'{segment[1]:.6f}'])
 
         copy_video = video_codec == 'copy'
         audio_codec = self.settings.get('audio_codec', 'aac')
-        output_format = self.settings.get('output_format', 'mkv').lower()
+        output_format = 'mkv' if segment is not None else self.settings.get('output_format', 'mkv').lower()
 
-        # Thread budget for decoder/encoder (0 = FFmpeg auto)
-        threads = int(self.settings.get('threads') or 0)
-        if threads > 0:
-            cmd.extend(['-threads', str(threads)])
+        # Encoder threads: the share's, or the plain setting (0 = FFmpeg auto)
+        if threads is not None:
+            cmd.extend(['-threads', str(threads.encoder)])
+        else:
+            setting = int(self.settings.get('threads') or 0)
+            if setting > 0:
+                cmd.extend(['-threads', str(setting)])
 
         # Encoder speed preset (name space differs per encoder)
         self._add_speed_preset(cmd, video_codec)
 
         # Mapping (subtitles only where the container can carry them)
-        cmd.extend(['-map', '0:v', '-map', '0:a?'])
-        subtitle_codec = self.SUBTITLE_CODEC_BY_CONTAINER.get(output_format, 'copy')
-        if subtitle_codec:
-            cmd.extend(['-map', '0:s?'])
+        if segment is not None:
+            cmd.extend(['-map', '0:v:0', '-an', '-sn', '-dn'])
+            subtitle_codec = None
         else:
-            cmd.append('-sn')
+            cmd.extend(['-map', '0:v', '-map', '0:a?'])
+            subtitle_codec = self.SUBTITLE_CODEC_BY_CONTAINER.get(output_format, 'copy')
+            if subtitle_codec:
+                cmd.extend(['-map', '0:s?'])
+            else:
+                cmd.append('-sn')
 
         # Stereo downmix (only possible when audio is re-encoded)
-        if self.settings.get('stereo', False) and audio_codec != 'copy':
+        if segment is None and self.settings.get('stereo', False) and audio_codec != 'copy':
             cmd.extend(['-ac', '2'])
 
         # Video codec settings
         self._add_video_codec_settings(cmd)
 
         # Audio codec settings
-        self._add_audio_codec_settings(cmd)
+        if segment is None:
+            self._add_audio_codec_settings(cmd)
 
         # Subtitle codec
         if subtitle_codec:
@@ -200,11 +320,14 @@ class FFmpegCommandBuilder:
         # Metadata: keep global tags/chapters, but drop per-stream statistics tags
         # (BPS, NUMBER_OF_BYTES, ...) written by mkvmerge for streams we re-encode —
         # otherwise media tools show the *source* bitrate for the new stream.
-        cmd.extend(['-map_metadata', '0', '-map_chapters', '0'])
-        if not copy_video:
-            self._clear_stat_tags(cmd, 'v')
-        if audio_codec != 'copy':
-            self._clear_stat_tags(cmd, 'a')
+        if segment is not None:
+            cmd.extend(['-map_metadata', '-1', '-map_chapters', '-1'])
+        else:
+            cmd.extend(['-map_metadata', '0', '-map_chapters', '0'])
+            if not copy_video:
+                self._clear_stat_tags(cmd, 'v')
+            if audio_codec != 'copy':
+                self._clear_stat_tags(cmd, 'a')
 
         # Extra FFmpeg parameters
         extra = self.settings.get('ffmpeg_extras', '').strip()
@@ -212,7 +335,8 @@ class FFmpegCommandBuilder:
             cmd.extend(shlex.split(extra, posix=(os.name != 'nt')))
 
         # Add application metadata
-        cmd.extend(['-metadata', 'comment=Made with videer'])
+        if segment is None:
+            cmd.extend(['-metadata', 'comment=Made with videer'])
 
         # Standard video settings (not applicable to stream copy / raw / ProRes)
         if video_codec in ('libx264', 'libx265', 'h264_nvenc', 'hevc_nvenc'):
@@ -220,26 +344,77 @@ class FFmpegCommandBuilder:
         if video_codec not in ('copy', 'rawvideo', 'prores_ks'):
             cmd.extend(['-pix_fmt', 'yuv420p'])
 
-        # Container-specific options
-        if output_format == 'mp4':
-            cmd.extend(['-movflags', '+faststart'])
-        
-        # Output format
-        format_mapping = {
-            'mkv': 'matroska',
-            'mp4': 'mp4',
-            'avi': 'avi',
-            'mov': 'mov',
-            'webm': 'webm'
-        }
-        
-        if output_format in format_mapping:
-            cmd.extend(['-f', format_mapping[output_format]])
-        
+        self._add_container_options(cmd, output_format)
+
         # Output file
         cmd.append(output_file)
         
         return cmd
+
+    # Output format
+    FORMAT_MAPPING = {
+        'mkv': 'matroska',
+        'mp4': 'mp4',
+        'avi': 'avi',
+        'mov': 'mov',
+        'webm': 'webm'
+    }
+
+    def _add_container_options(self, cmd: List[str], output_format: str):
+        """Container-specific options and the explicit output format"""
+        if output_format == 'mp4':
+            cmd.extend(['-movflags', '+faststart'])
+        if output_format in self.FORMAT_MAPPING:
+            cmd.extend(['-f', self.FORMAT_MAPPING[output_format]])
+
+    def build_audio_command(self, input_file: str, output_file: str,
+                            threads: Optional[ThreadShare] = None) -> List[str]:
+        """Encode just the audio streams into a Matroska piece (chunked encoding does the video separately)"""
+        cmd = self._base_command()
+        if threads is not None:
+            cmd.extend(['-threads', str(threads.decoder)])
+        cmd.extend(['-i', input_file, '-y'])
+        cmd.extend(['-map', '0:a', '-vn', '-sn', '-dn'])
+        if self.settings.get('stereo', False) and self.settings.get('audio_codec', 'aac') != 'copy':
+            cmd.extend(['-ac', '2'])
+        self._add_audio_codec_settings(cmd)
+        cmd.extend(['-map_metadata', '-1', '-f', 'matroska', output_file])
+        return cmd
+
+    def build_join_command(self, list_file: str, audio_file: Optional[str], source_file: str,
+                           output_file: str) -> List[str]:
+        """
+        Join encoded chunks (a concat demuxer list) with the separately encoded audio into the final file.
+        Everything is stream-copied; subtitles, chapters and global tags come from the source as in a
+        single-piece encode.
+        """
+        cmd = self._base_command(err_detect=False)
+        cmd.extend(['-f', 'concat', '-safe', '0', '-i', list_file])
+        if audio_file:
+            cmd.extend(['-i', audio_file])
+        source = 2 if audio_file else 1
+        cmd.extend(['-i', source_file, '-y'])
+
+        output_format = self.settings.get('output_format', 'mkv').lower()
+        cmd.extend(['-map', '0:v'])
+        if audio_file:
+            cmd.extend(['-map', '1:a'])
+        subtitle_codec = self.SUBTITLE_CODEC_BY_CONTAINER.get(output_format, 'copy')
+        if subtitle_codec:
+            cmd.extend(['-map', f'{source}:s?'])
+        cmd.extend(['-c', 'copy'])
+        if subtitle_codec:
+            cmd.extend(['-c:s', subtitle_codec])
+
+        cmd.extend(['-map_metadata', str(source), '-map_chapters', str(source)])
+        self._clear_stat_tags(cmd, 'v')
+        if audio_file and self.settings.get('audio_codec', 'aac') != 'copy':
+            self._clear_stat_tags(cmd, 'a')
+        cmd.extend(['-metadata', 'comment=Made with videer'])
+
+        self._add_container_options(cmd, output_format)
+        cmd.append(output_file)
+        return cmd
     
     def _add_speed_preset(self, cmd: List[str], video_codec: str):
         """Add the encoder-specific speed/quality trade-off option"""
@@ -408,15 +583,18 @@ class FFmpegCommandBuilder:
         if dar and self.settings.get('par_handling', 'metadata') != 'resample':
             cmd.extend(['-aspect', dar])
 
-    def build_vmaf_command(self, encoded_file, original_file):
+    def build_vmaf_command(self, encoded_file, original_file, threads: Optional[ThreadShare] = None):
         """Build FFmpeg command to calculate VMAF score"""
         cmd = self._base_command(err_detect=False)
+        if threads is not None:
+            cmd.extend(['-filter_threads', str(threads.filter_threads)])
         cmd.extend(['-i', encoded_file])   # distorted
         cmd.extend(['-i', original_file])  # reference
         # Align timestamps and scale the encode back to the reference size so
         # VMAF works after resolution/PAR changes.
+        vmaf = f'libvmaf=n_threads={threads.threads}' if threads is not None else 'libvmaf'
         graph = ('[0:v]setpts=PTS-STARTPTS[d];[1:v]setpts=PTS-STARTPTS[r];'
-                 '[d][r]scale2ref=flags=bicubic[ds][rs];[ds][rs]libvmaf')
+                 f'[d][r]scale2ref=flags=bicubic[ds][rs];[ds][rs]{vmaf}')
         cmd.extend(['-lavfi', graph])
         cmd.extend(['-f', 'null', '-'])
         return cmd
\ No newline at end of file
@@ -1,13 +1,61 @@
 """
 File utilities for videer
-Timestamp preservation and in-place file replacement
+Timestamp preservation, in-place file replacement and finding video files
 """
 
 import os
 import shutil
 import platform
 import logging
-from typing import Optional
+from typing import Callable, Iterator, List, Optional
+
+from config import VIDEO_EXTENSIONS
+from utils.naturalsort import natural_key
+
+
+def is_video_file(filepath: str) -> bool:
+    """An existing regular file with one of the known video extensions"""
+    if not os.path.isfile(filepath):
+        return False
+    return os.path.splitext(filepath)[1].lower() in VIDEO_EXTENSIONS
+
+
+def scan_video_files(folder: str, cancelled: Optional[Callable[[], bool]] = None) -> Iterator[List[str]]:
+    """
+    Video files below *folder*, one naturally sorted list per directory, in the order walk_video_files yields them.
+    Uses the type os.scandir already read with each entry, so no file is stat()ed on filesystems that report it.
+    Symlinked directories are not descended into (as os.walk); unreadable directories are skipped.
+    The walk stops early once *cancelled* returns True.
+    """
+    stack = [folder]
+    while stack:
+        if cancelled and cancelled():
+            return
+        directory = stack.pop()
+        files, subdirs = [], []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS and entry.is_file():
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        # Depth-first, files of a directory before its subdirectories: pushed in reverse so the first pops first
+        stack.extend(os.path.join(directory, name) for name in sorted(subdirs, key=natural_key, reverse=True))
+        if files:
+            files.sort(key=natural_key)
+            yield [os.path.join(directory, name) for name in files]
+
+
+def walk_video_files(folder: str) -> Iterator[str]:
+    """Video files below *folder*, recursively, folder by folder in natural order"""
+    for batch in scan_video_files(folder):
+        yield from batch
 
 
 def _set_creation_time_windows(path: str, timestamp: float) -> bool:
@@ -0,0 +1,72 @@
+"""
+Background expansion of dropped folders.
+
+    scan = FolderScan(folders, on_batch=lambda pairs, found: ..., on_done=lambda found, cancelled: ...)
+    scan.start()        # returns at once; callbacks run on the scan thread
+    scan.cancel()
+
+Dropping a folder used to walk the whole tree (plus an isfile and a realpath per entry) on the GUI thread before the
+first file showed up. The scan walks with os.scandir on its own thread, resolves each file's canonical path there, and
+hands over (path, canonical) pairs directory by directory. Small directories are coalesced so a tree of thousands of
+folders does not turn into thousands of queue edits: a batch goes out once BATCH_INTERVAL has passed since the last.
+"""
+import threading
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from models.file_models import canonical_path
+from utils.file_utils import scan_video_files
+
+BATCH_INTERVAL = 0.1      # seconds between batches handed to on_batch
+
+Pairs = List[Tuple[str, str]]
+
+
+class FolderScan:
+    """Walks folders on a daemon thread and reports the video files found, in natural order (one-shot)"""
+
+    def __init__(self, folders: Sequence[str],
+                 on_batch: Optional[Callable[[Pairs, int], None]] = None,
+                 on_done: Optional[Callable[[int, bool], None]] = None):
+        self.folders = list(folders)
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.found = 0
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._work, name="folder-scan", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        """Stop walking; the batch being built is dropped and on_done still follows"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    # ------------------------------------------------------------------
+    def _work(self):
+        pending: Pairs = []
+        last = time.monotonic()
+        try:
+            for folder in self.folders:
+                for batch in scan_video_files(folder, cancelled=self._cancelled.is_set):
+                    pending.extend((path, canonical_path(path)) for path in batch)
+                    self.found += len(batch)
+                    if time.monotonic() - last >= BATCH_INTERVAL:
+                        self._flush(pending)
+                        pending = []
+                        last = time.monotonic()
+            self._flush(pending)
+        finally:
+            if self.on_done:
+                self.on_done(self.found, self.cancelled)
+
+    def _flush(self, pairs: Pairs):
+        if pairs and not self.cancelled and self.on_batch:
+            self.on_batch(pairs, self.found)
@@ -0,0 +1,229 @@
+"""
+Watch folder: queue video files as they land in a folder.
+
+    watch = FolderWatch(folder, on_ready=lambda paths: ...)    # called on the watch thread
+    watch.start()
+    watch.stop()
+
+Capture machines drop files into a share and someone had to drag them in. The watch learns the names already in the
+folder once (a single scandir, no stat per entry, so a folder of 100k files costs one listing), then only looks at
+what changes: on Linux inotify reports each created, written or moved-in name; elsewhere, and on network mounts
+inotify cannot see into, the folder is listed again only when its own mtime changes. A new file is handed over once
+its size and mtime have stood still for WATCH_SETTLE_SECONDS, so a copy that is still running is never queued.
+
+The folder itself is watched, not its subfolders (chunk directories and the like live there). Names videer writes
+next to a source — <name>.part.<ext>, <name>.old.<ext> backups, <name>.trans.avi intermediates — are ignored here;
+finished outputs are recognised by the FileManager, which knows the queue.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from config import VIDEO_EXTENSIONS, WATCH_SETTLE_SECONDS, WATCH_POLL_INTERVAL
+from utils.naturalsort import natural_key
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+_WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+               | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct('iIII')      # wd, mask, cookie, len (then len bytes of NUL-padded name)
+
+# inotify only sees changes made through this kernel; files written by another machine arrive unannounced
+_NETWORK_FS = {'cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', '9p', 'afs', 'ceph', 'fuse.sshfs', 'fuse.rclone', 'davfs'}
+
+TICK = 1.0      # seconds between looks at files that are still settling
+_ARTIFACT_STEMS = ('.part', '.old', '.trans')
+
+
+def _is_candidate(name: str) -> bool:
+    stem, ext = os.path.splitext(name)
+    return ext.lower() in VIDEO_EXTENSIONS and not stem.lower().endswith(_ARTIFACT_STEMS)
+
+
+def _mount_type(path: str) -> Optional[str]:
+    """Filesystem type of the mount holding *path* (Linux /proc/self/mounts; None if unknown)"""
+    try:
+        with open('/proc/self/mounts', encoding='utf-8', errors='replace') as f:
+            mounts = [line.split()[1:3] for line in f if line.count(' ') >= 3]
+    except OSError:
+        return None
+    path = os.path.realpath(path)
+    best, fs_type = '', None
+    for mount_point, kind in mounts:
+        mount_point = mount_point.replace('\\040', ' ')
+        inside = path == mount_point or path.startswith(mount_point.rstrip('/') + '/')
+        if inside and len(mount_point) > len(best):
+            best, fs_type = mount_point, kind
+    return fs_type
+
+
+class _Inotify:
+    """The three inotify calls through ctypes; raises OSError where inotify is unavailable"""
+
+    def __init__(self, folder: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed: {os.strerror(errno)}")
+
+    def read(self, timeout: float) -> List[Tuple[int, str]]:
+        """(mask, name) of the events that arrive within *timeout* seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            events.append((mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatch:
+    """Reports new, finished video files in one folder from a daemon thread (one-shot: start, then stop)"""
+
+    def __init__(self, folder: str, on_ready: Callable[[List[str]], None],
+                 on_stopped: Optional[Callable[[str], None]] = None,
+                 settle: float = WATCH_SETTLE_SECONDS, poll_interval: float = WATCH_POLL_INTERVAL):
+        self.folder = os.path.abspath(folder)
+        self.on_ready = on_ready
+        self.on_stopped = on_stopped
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.mode = None                            # 'inotify' or 'polling' once started
+        self._known: Set[str] = set()               # names present (or already handed over)
+        self._settling: Dict[str, Tuple[int, int, float]] = {}     # name -> size, mtime_ns, unchanged since
+        self._dir_mtime = None
+        self._inotify: Optional[_Inotify] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._work, name="folder-watch", daemon=True)
+
+    def start(self):
+        """Pick inotify or polling (known right after this returns) and start the watch thread"""
+        if _mount_type(self.folder) not in _NETWORK_FS:
+            try:
+                self._inotify = _Inotify(self.folder)
+            except (OSError, AttributeError):
+                self._inotify = None
+        self.mode = 'inotify' if self._inotify else 'polling'
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching (takes effect within a tick); files still settling are not reported"""
+        self._stop.set()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    # ------------------------------------------------------------------
+    def _work(self):
+        reason = "stopped"
+        inotify = self._inotify
+        try:
+            # Learn what is already there after the watch is in place, so nothing slips between the two
+            self._known = self._list()
+            if inotify:
+                reason = self._watch_inotify(inotify)
+            else:
+                reason = self._watch_polling()
+        except OSError as e:
+            reason = f"folder unavailable: {e}"
+        finally:
+            if inotify:
+                inotify.close()
+            if self.on_stopped:
+                self.on_stopped(reason)
+
+    def _watch_inotify(self, inotify: _Inotify) -> str:
+        while not self._stop.is_set():
+            for mask, name in inotify.read(TICK if self._settling else 2 * TICK):
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    return "folder was removed or moved"
+                if mask & IN_Q_OVERFLOW:
+                    self._rescan()      # events were lost: fall back to one listing
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._known.discard(name)
+                    self._settling.pop(name, None)
+                elif mask & (IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO) and _is_candidate(name):
+                    self._known.add(name)
+                    self._settling.setdefault(name, (-1, -1, 0.0))
+            self._check_settling()
+        return "stopped"
+
+    def _watch_polling(self) -> str:
+        next_poll = 0.0
+        while not self._stop.wait(min(TICK, self.poll_interval)):
+            if time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + self.poll_interval
+                mtime = os.stat(self.folder).st_mtime_ns
+                if mtime != self._dir_mtime:     # entries were added, removed or renamed
+                    self._rescan()
+            self._check_settling()
+        return "stopped"
+
+    def _list(self) -> Set[str]:
+        self._dir_mtime = os.stat(self.folder).st_mtime_ns
+        with os.scandir(self.folder) as entries:
+            return {entry.name for entry in entries}
+
+    def _rescan(self):
+        names = self._list()
+        for name in names - self._known:
+            if _is_candidate(name):
+                self._settling.setdefault(name, (-1, -1, 0.0))
+        for name in self._known - names:
+            self._settling.pop(name, None)
+        self._known = names
+
+    def _check_settling(self):
+        now = time.monotonic()
+        ready = []
+        for name, (size, mtime, since) in list(self._settling.items()):
+            try:
+                st = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                del self._settling[name]        # gone again (a temp name renamed away, a deleted file)
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                del self._settling[name]
+            elif (st.st_size, st.st_mtime_ns) != (size, mtime):
+                self._settling[name] = (st.st_size, st.st_mtime_ns, now)      # still growing
+            elif st.st_size > 0 and now - since >= self.settle:
+                del self._settling[name]
+                ready.append(name)
+        if ready and not self._stop.is_set():
+            ready.sort(key=natural_key)
+            self.on_ready([os.path.join(self.folder, name) for name in ready])
@@ -0,0 +1,451 @@
+"""
+Spawn-free probing of Matroska/WebM and MP4/MOV headers.
+
+    data = read_header(path)      # same shape as `ffprobe -show_format -show_streams -of json`, or None
+
+Duration, track list, codec IDs, dimensions, aspect ratio, frame rate and the pixel format (from the codec
+configuration record) of the common containers sit in the first few kilobytes of the file (Matroska `Info`/`Tracks`,
+ISO-BMFF `moov`; Matroska's per-track NUMBER_OF_FRAMES statistics in `Tags`, found through the SeekHead), yet an
+ffprobe process per file costs tens of milliseconds before it has read a byte — minutes for a large library. These
+readers map the file and walk only the elements they need, so the page cache brings in a handful of pages. They give
+up (return None) on anything they do not understand, and the caller falls back to ffprobe: other containers,
+fragmented MP4, live-written Matroska without a duration, unknown codecs.
+"""
+import mmap
+import os
+import struct
+from fractions import Fraction
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+HEADER_EXTENSIONS = {'.mkv': 'matroska', '.webm': 'matroska',
+                     '.mp4': 'mp4', '.m4v': 'mp4', '.mov': 'mp4', '.3gp': 'mp4'}
+
+# ffprobe's codec_name for the IDs the containers store
+_MKV_CODECS = {
+    'V_MPEG4/ISO/AVC': 'h264', 'V_MPEGH/ISO/HEVC': 'hevc', 'V_AV1': 'av1', 'V_VP8': 'vp8', 'V_VP9': 'vp9',
+    'V_MPEG2': 'mpeg2video', 'V_MPEG1': 'mpeg1video', 'V_MPEG4/ISO/ASP': 'mpeg4', 'V_MPEG4/ISO/SP': 'mpeg4',
+    'V_MPEG4/ISO/AP': 'mpeg4', 'V_THEORA': 'theora', 'V_PRORES': 'prores', 'V_FFV1': 'ffv1',
+    'V_UNCOMPRESSED': 'rawvideo',
+    'A_AAC': 'aac', 'A_AC3': 'ac3', 'A_EAC3': 'eac3', 'A_DTS': 'dts', 'A_OPUS': 'opus', 'A_VORBIS': 'vorbis',
+    'A_FLAC': 'flac', 'A_MPEG/L3': 'mp3', 'A_MPEG/L2': 'mp2', 'A_TRUEHD': 'truehd', 'A_ALAC': 'alac',
+    'A_PCM/INT/LIT': 'pcm_s16le', 'A_PCM/INT/BIG': 'pcm_s16be', 'A_PCM/FLOAT/IEEE': 'pcm_f32le',
+    'S_TEXT/UTF8': 'subrip', 'S_TEXT/ASS': 'ass', 'S_TEXT/SSA': 'ass', 'S_ASS': 'ass', 'S_SSA': 'ass',
+    'S_TEXT/WEBVTT': 'webvtt', 'S_HDMV/PGS': 'hdmv_pgs_subtitle', 'S_VOBSUB': 'dvd_subtitle',
+    'S_DVBSUB': 'dvb_subtitle',
+}
+_FOURCC_CODECS = {
+    'avc1': 'h264', 'avc3': 'h264', 'h264': 'h264', 'hvc1': 'hevc', 'hev1': 'hevc', 'av01': 'av1', 'vp09': 'vp9',
+    'vp08': 'vp8', 'mp4v': 'mpeg4', 'xvid': 'mpeg4', 'divx': 'mpeg4', 'dx50': 'mpeg4', 'fmp4': 'mpeg4',
+    'apch': 'prores', 'apcn': 'prores', 'apcs': 'prores', 'apco': 'prores', 'ap4h': 'prores', 'ap4x': 'prores',
+    'mjpg': 'mjpeg', 'jpeg': 'mjpeg', 'mp1v': 'mpeg1video', 'mp2v': 'mpeg2video', 'dvh1': 'hevc', 'dvhe': 'hevc',
+    'mp4a': 'aac', 'ac-3': 'ac3', 'ec-3': 'eac3', 'opus': 'opus', 'flac': 'flac', 'alac': 'alac', '.mp3': 'mp3',
+    'sowt': 'pcm_s16le', 'twos': 'pcm_s16be', 'lpcm': 'pcm_s16le', 'ipcm': 'pcm_s16le', 'fpcm': 'pcm_f32le',
+    'tx3g': 'mov_text', 'text': 'mov_text', 'wvtt': 'webvtt', 'c608': 'eia_608', 'stpp': 'ttml',
+}
+# Matroska FieldOrder / QuickTime 'fiel' detail -> ffprobe field_order
+_FIELD_ORDERS = {0: 'progressive', 1: 'tt', 6: 'bb', 9: 'tb', 14: 'bt'}
+# vpcC chromaSubsampling -> chroma_format_idc (both 4:2:0 sitings are 1)
+_VPCC_CHROMA = {0: 1, 1: 1, 2: 2, 3: 3}
+_MP4_HANDLERS = {'vide': 'video', 'soun': 'audio', 'sbtl': 'subtitle', 'subt': 'subtitle'}
+
+
+def read_header(filepath: str) -> Optional[Dict[str, Any]]:
+    """ffprobe-shaped media info from the container header, or None if this reader cannot answer"""
+    kind = HEADER_EXTENSIONS.get(os.path.splitext(filepath)[1].lower())
+    if kind is None:
+        return None
+    try:
+        with open(filepath, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < 32:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                data = _read_matroska(buf) if kind == 'matroska' else _read_mp4(buf)
+    except (OSError, ValueError, IndexError, struct.error, UnicodeDecodeError, ZeroDivisionError, OverflowError):
+        return None
+    if not data or not _complete(data):
+        return None
+    fmt = data['format']
+    duration = fmt['duration']
+    fmt.update(duration=f"{duration:.6f}", size=str(size), bit_rate=str(int(size * 8 / duration)),
+               nb_streams=len(data['streams']), probe_source='header')
+    for index, stream in enumerate(data['streams']):
+        stream['index'] = index
+        if stream.get('duration') is not None:
+            stream['duration'] = f"{stream['duration']:.6f}"
+    return data
+
+
+def _complete(data: Dict[str, Any]) -> bool:
+    """
+    Only answer when ffprobe would have nothing more important to say. A pix_fmt the configuration record does not
+    give (VP9 in Matroska, MPEG-2, ...) is left out here; probe_media asks ffprobe for those files.
+    """
+    duration = data['format'].get('duration')
+    if not duration or duration <= 0:
+        return False
+    video = [s for s in data['streams'] if s['codec_type'] == 'video']
+    return bool(video) and all(s.get('codec_name') and s.get('width') and s.get('height') for s in video)
+
+
+def _aspect(width: int, height: int, display_width: int, display_height: int) -> Dict[str, str]:
+    """sample_aspect_ratio / display_aspect_ratio strings the way ffprobe reduces them"""
+    sar = Fraction(display_width * height, display_height * width)
+    dar = Fraction(display_width, display_height)
+    return {'sample_aspect_ratio': f"{sar.numerator}:{sar.denominator}",
+            'display_aspect_ratio': f"{dar.numerator}:{dar.denominator}"}
+
+
+def _rate(value: Fraction) -> str:
+    """A frame rate as ffprobe prints it ('24000/1001', '25/1')"""
+    value = value.limit_denominator(1001)
+    return f"{value.numerator}/{value.denominator}"
+
+
+def _pixel_format(chroma_format: Optional[int], depth: int) -> Optional[str]:
+    """ffprobe's pix_fmt for a chroma_format_idc (0 mono, 1 4:2:0, 2 4:2:2, 3 4:4:4) and bit depth"""
+    base = {0: 'gray', 1: 'yuv420p', 2: 'yuv422p', 3: 'yuv444p'}.get(chroma_format)
+    if base is None or depth not in (8, 10, 12):
+        return None
+    return base if depth == 8 else f"{base}{depth}le"
+
+
+def _pix_fmt(codec: Optional[str], private: bytes) -> Optional[str]:
+    """
+    pix_fmt from the decoder configuration record (CodecPrivate / avcC, hvcC, av1C), where it has a fixed place.
+    None when it does not: the caller asks ffprobe, which decodes the parameter sets.
+    """
+    if codec == 'h264' and len(private) >= 6:
+        profile = private[1]
+        if profile in (66, 77, 88, 100):
+            return 'yuv420p'        # Baseline, Main, Extended and High are 8-bit 4:2:0 by definition
+        # The High 10/4:2:2/4:4:4 records carry chroma_format and bit depth after the SPS and PPS lists
+        pos = 6
+        for count_mask in (0x1F, 0xFF):
+            count = private[pos - 1] & count_mask
+            for _ in range(count):
+                pos += 2 + int.from_bytes(private[pos:pos + 2], 'big')
+            pos += 1
+        if pos + 2 > len(private):
+            return None
+        return _pixel_format(private[pos - 1] & 0x3, (private[pos] & 0x7) + 8)
+    if codec == 'hevc' and len(private) >= 18:
+        return _pixel_format(private[16] & 0x3, (private[17] & 0x7) + 8)
+    if codec == 'av1' and len(private) >= 3:
+        flags = private[2]
+        depth = 12 if flags & 0x20 else 10 if flags & 0x40 else 8
+        if flags & 0x10:
+            return _pixel_format(0, depth)
+        subsampling = (flags >> 2) & 0x3
+        return _pixel_format({0x3: 1, 0x2: 2, 0x0: 3}.get(subsampling), depth)
+    return None
+
+
+# ---- Matroska / WebM -------------------------------------------------
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_SEEKHEAD, _SEEK, _SEEK_ID, _SEEK_POSITION = 0x114D9B74, 0x4DBB, 0x53AB, 0x53AC
+_INFO, _TIMESTAMP_SCALE, _DURATION = 0x1549A966, 0x2AD7B1, 0x4489
+_TRACKS, _TRACK_ENTRY, _TRACK_UID = 0x1654AE6B, 0xAE, 0x73C5
+_TAGS, _TAG, _TARGETS, _TAG_TRACK_UID = 0x1254C367, 0x7373, 0x63C0, 0x63C5
+_SIMPLE_TAG, _TAG_NAME, _TAG_LANGUAGE, _TAG_STRING = 0x67C8, 0x45A3, 0x447A, 0x4487
+_CLUSTER = 0x1F43B675
+
+
+def _vint(buf, pos: int, keep_marker: bool) -> Tuple[int, int]:
+    """EBML variable-length integer at pos -> (value, length); value -1 for the reserved 'unknown size'"""
+    first = buf[pos]
+    if not first:
+        raise ValueError("invalid EBML length")
+    length = 9 - first.bit_length()
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in buf[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = -1
+    return value, length
+
+
+def _elements(buf, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    """(id, data start, data end) of the elements between start and end"""
+    pos = start
+    while pos < end - 1:
+        element_id, id_len = _vint(buf, pos, True)
+        size, size_len = _vint(buf, pos + id_len, False)
+        data = pos + id_len + size_len
+        stop = end if size < 0 else data + size
+        if stop > end:
+            stop = end      # truncated file: take what is there
+        yield element_id, data, stop
+        pos = stop
+
+
+def _uint(buf, start: int, end: int) -> int:
+    return int.from_bytes(buf[start:end], 'big')
+
+
+def _float(buf, start: int, end: int) -> float:
+    if end - start == 4:
+        return struct.unpack('>f', buf[start:end])[0]
+    if end - start == 8:
+        return struct.unpack('>d', buf[start:end])[0]
+    raise ValueError("bad EBML float")
+
+
+def _text(buf, start: int, end: int) -> str:
+    return bytes(buf[start:end]).split(b'\0', 1)[0].decode('utf-8')
+
+
+def _read_matroska(buf) -> Optional[Dict[str, Any]]:
+    header = next(_elements(buf, 0, len(buf)), None)
+    if header is None or header[0] != _EBML:
+        return None
+    segment = next(_elements(buf, header[2], len(buf)), None)
+    if segment is None or segment[0] != _SEGMENT:
+        return None
+    base, seg_end = segment[1], segment[2]
+
+    found: Dict[int, Tuple[int, int]] = {}
+    seek: Dict[int, int] = {}
+    for element_id, start, end in _elements(buf, base, seg_end):
+        if element_id in (_INFO, _TRACKS, _TAGS):
+            found[element_id] = (start, end)
+        elif element_id == _SEEKHEAD:
+            for entry_id, entry_start, entry_end in _elements(buf, start, end):
+                if entry_id != _SEEK:
+                    continue
+                target = position = None
+                for child_id, child_start, child_end in _elements(buf, entry_start, entry_end):
+                    if child_id == _SEEK_ID:
+                        target = _uint(buf, child_start, child_end)
+                    elif child_id == _SEEK_POSITION:
+                        position = _uint(buf, child_start, child_end)
+                if target is not None and position is not None:
+                    seek[target] = base + position
+        if len(found) == 3 or element_id == _CLUSTER:
+            break
+    # Muxers that write Tracks (and mkvmerge its statistics Tags) after the clusters leave a SeekHead pointing at them
+    for element_id in (_INFO, _TRACKS, _TAGS):
+        if element_id not in found and element_id in seek:
+            located = next(_elements(buf, seek[element_id], seg_end), None)
+            if located and located[0] == element_id:
+                found[element_id] = (located[1], located[2])
+    if _INFO not in found or _TRACKS not in found:
+        return None
+
+    scale, duration = 1_000_000, None
+    for element_id, start, end in _elements(buf, *found[_INFO]):
+        if element_id == _TIMESTAMP_SCALE:
+            scale = _uint(buf, start, end)
+        elif element_id == _DURATION:
+            duration = _float(buf, start, end)
+    streams = [_matroska_track(buf, start, end)
+               for element_id, start, end in _elements(buf, *found[_TRACKS]) if element_id == _TRACK_ENTRY]
+    streams = [stream for stream in streams if stream]
+    if _TAGS in found:
+        _matroska_tags(buf, *found[_TAGS], {stream['uid']: stream for stream in streams if stream.get('uid')})
+    for stream in streams:
+        stream.pop('uid', None)
+    return {'format': {'format_name': 'matroska,webm', 'format_long_name': 'Matroska / WebM',
+                       'duration': duration * scale / 1e9 if duration else None},
+            'streams': streams}
+
+
+def _matroska_track(buf, start: int, end: int) -> Optional[Dict[str, Any]]:
+    """One TrackEntry as an ffprobe stream; None for track types ffprobe does not list as streams"""
+    track: Dict[int, Tuple[int, int]] = {}
+    for element_id, child_start, child_end in _elements(buf, start, end):
+        track[element_id] = (child_start, child_end)
+    kind = {1: 'video', 2: 'audio', 17: 'subtitle'}.get(_uint(buf, *track[0x83]) if 0x83 in track else 0)
+    if kind is None:
+        return None
+    codec_id = _text(buf, *track[0x86]) if 0x86 in track else ''
+    codec = _MKV_CODECS.get(codec_id) or _MKV_CODECS.get(codec_id.split('/')[0])
+    if codec_id == 'V_MS/VFW/FOURCC' and 0x63A2 in track:
+        # BITMAPINFOHEADER: biCompression at offset 16
+        fourcc_start = track[0x63A2][0] + 16
+        codec = _FOURCC_CODECS.get(bytes(buf[fourcc_start:fourcc_start + 4]).decode('latin-1').lower())
+    stream: Dict[str, Any] = {'codec_type': kind, 'codec_name': codec,
+                              'disposition': {'default': _uint(buf, *track[0x88]) if 0x88 in track else 1,
+                                              'attached_pic': 0},
+                              'uid': _uint(buf, *track[_TRACK_UID]) if _TRACK_UID in track else None}
+    tags = {}
+    if 0x22B59D in track:
+        tags['language'] = _text(buf, *track[0x22B59D])
+    elif 0x22B59C in track:
+        tags['language'] = _text(buf, *track[0x22B59C])
+    if 0x536E in track:
+        tags['title'] = _text(buf, *track[0x536E])
+    if tags:
+        stream['tags'] = tags
+    if 0x23E383 in track:
+        default_duration = _uint(buf, *track[0x23E383])
+        if default_duration:
+            stream['r_frame_rate'] = stream['avg_frame_rate'] = _rate(Fraction(1_000_000_000, default_duration))
+
+    if kind == 'video' and 0xE0 in track:
+        video = {element_id: (s, e) for element_id, s, e in _elements(buf, *track[0xE0])}
+        width = _uint(buf, *video[0xB0]) if 0xB0 in video else 0
+        height = _uint(buf, *video[0xBA]) if 0xBA in video else 0
+        stream.update(width=width, height=height)
+        unit = _uint(buf, *video[0x54B2]) if 0x54B2 in video else 0
+        display_width = _uint(buf, *video[0x54B0]) if 0x54B0 in video else width
+        display_height = _uint(buf, *video[0x54BA]) if 0x54BA in video else height
+        if width and height and display_width and display_height and unit in (0, 3):
+            stream.update(_aspect(width, height, display_width, display_height))
+        if 0x63A2 in track:
+            stream['pix_fmt'] = _pix_fmt(codec, bytes(buf[track[0x63A2][0]:track[0x63A2][1]]))
+        interlaced = _uint(buf, *video[0x9A]) if 0x9A in video else 0
+        if interlaced == 2:
+            stream['field_order'] = 'progressive'
+        elif interlaced == 1 and 0x9D in video:
+            stream['field_order'] = _FIELD_ORDERS.get(_uint(buf, *video[0x9D]))
+    elif kind == 'audio' and 0xE1 in track:
+        audio = {element_id: (s, e) for element_id, s, e in _elements(buf, *track[0xE1])}
+        stream['channels'] = _uint(buf, *audio[0x9F]) if 0x9F in audio else 1
+        stream['sample_rate'] = str(int(_float(buf, *audio[0xB5]))) if 0xB5 in audio else '8000'
+    return stream
+
+
+def _matroska_tags(buf, start: int, end: int, by_uid: Dict[int, Dict[str, Any]]):
+    """Per-track SimpleTags into the streams' tags, named as ffprobe names them (NUMBER_OF_FRAMES, BPS-eng, ...)"""
+    for element_id, tag_start, tag_end in _elements(buf, start, end):
+        if element_id != _TAG:
+            continue
+        children = list(_elements(buf, tag_start, tag_end))
+        uids = [_uint(buf, s, e) for child_id, target_start, target_end in children if child_id == _TARGETS
+                for uid_id, s, e in _elements(buf, target_start, target_end) if uid_id == _TAG_TRACK_UID]
+        streams = [by_uid[uid] for uid in uids if uid in by_uid]
+        if not streams:
+            continue
+        for child_id, simple_start, simple_end in children:
+            if child_id != _SIMPLE_TAG:
+                continue
+            simple = {simple_id: (s, e) for simple_id, s, e in _elements(buf, simple_start, simple_end)}
+            if _TAG_NAME not in simple or _TAG_STRING not in simple:
+                continue
+            name = _text(buf, *simple[_TAG_NAME])
+            language = _text(buf, *simple[_TAG_LANGUAGE]) if _TAG_LANGUAGE in simple else 'und'
+            if language != 'und':
+                name = f"{name}-{language}"
+            for stream in streams:
+                stream.setdefault('tags', {})[name] = _text(buf, *simple[_TAG_STRING])
+
+
+# ---- MP4 / MOV (ISO base media) ---------------------------------------
+def _boxes(buf, start: int, end: int) -> Iterator[Tuple[str, int, int]]:
+    """(type, payload start, box end) of the boxes between start and end"""
+    pos = start
+    while pos + 8 <= end:
+        size, = struct.unpack_from('>I', buf, pos)
+        box_type = bytes(buf[pos + 4:pos + 8]).decode('latin-1')
+        header = 8
+        if size == 1:
+            size, = struct.unpack_from('>Q', buf, pos + 8)
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            raise ValueError("invalid box size")
+        yield box_type, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _child(buf, start: int, end: int, *path: str) -> Optional[Tuple[int, int]]:
+    """Payload span of the first box at the given path below start..end"""
+    for name in path:
+        for box_type, child_start, child_end in _boxes(buf, start, end):
+            if box_type == name:
+                start, end = child_start, child_end
+                break
+        else:
+            return None
+    return start, end
+
+
+def _read_mp4(buf) -> Optional[Dict[str, Any]]:
+    moov = _child(buf, 0, len(buf), 'moov')
+    if moov is None or _child(buf, *moov, 'mvex'):
+        return None     # no index yet, or fragmented: the header does not carry the duration
+    mvhd = _child(buf, *moov, 'mvhd')
+    if mvhd is None:
+        return None
+    if buf[mvhd[0]] == 1:
+        timescale, duration = struct.unpack_from('>IQ', buf, mvhd[0] + 20)
+    else:
+        timescale, duration = struct.unpack_from('>II', buf, mvhd[0] + 12)
+    streams = [_mp4_track(buf, start, end)
+               for box_type, start, end in _boxes(buf, *moov) if box_type == 'trak']
+    return {'format': {'format_name': 'mov,mp4,m4a,3gp,3g2,mj2', 'format_long_name': 'QuickTime / MOV',
+                       'duration': duration / timescale if timescale else None},
+            'streams': [stream for stream in streams if stream]}
+
+
+def _mp4_track(buf, start: int, end: int) -> Optional[Dict[str, Any]]:
+    """One trak as an ffprobe stream; None for handlers that are not video, audio or subtitles"""
+    hdlr = _child(buf, start, end, 'mdia', 'hdlr')
+    kind = _MP4_HANDLERS.get(bytes(buf[hdlr[0] + 8:hdlr[0] + 12]).decode('latin-1')) if hdlr else None
+    mdhd = _child(buf, start, end, 'mdia', 'mdhd')
+    stsd = _child(buf, start, end, 'mdia', 'minf', 'stbl', 'stsd')
+    if kind is None or mdhd is None or stsd is None:
+        return None
+    if buf[mdhd[0]] == 1:
+        timescale, duration = struct.unpack_from('>IQ', buf, mdhd[0] + 20)
+    else:
+        timescale, duration = struct.unpack_from('>II', buf, mdhd[0] + 12)
+
+    entry_start = stsd[0] + 8
+    entry_size, = struct.unpack_from('>I', buf, entry_start)
+    entry_end = min(entry_start + entry_size, stsd[1])
+    fourcc = bytes(buf[entry_start + 4:entry_start + 8]).decode('latin-1')
+    stream: Dict[str, Any] = {'codec_type': kind, 'codec_name': _FOURCC_CODECS.get(fourcc.lower()),
+                              'codec_tag_string': fourcc, 'disposition': {'default': 1, 'attached_pic': 0},
+                              'duration': duration / timescale if timescale else None}
+    tkhd = _child(buf, start, end, 'tkhd')
+    if tkhd is not None:
+        enabled = struct.unpack_from('>I', buf, tkhd[0])[0] & 0x1
+        stream['disposition']['default'] = int(bool(enabled))
+
+    if kind == 'video':
+        width, height = struct.unpack_from('>HH', buf, entry_start + 32)
+        stream.update(width=width, height=height)
+        # Children of a visual sample entry follow its fixed 78-byte body
+        sar = Fraction(1)
+        for box_type, child_start, child_end in _boxes(buf, entry_start + 86, entry_end):
+            if box_type == 'pasp':
+                h_spacing, v_spacing = struct.unpack_from('>II', buf, child_start)
+                if h_spacing and v_spacing:
+                    sar = Fraction(h_spacing, v_spacing)
+            elif box_type == 'fiel':
+                fields, detail = buf[child_start], buf[child_start + 1]
+                stream['field_order'] = 'progressive' if fields == 1 else _FIELD_ORDERS.get(detail)
+            elif box_type in ('avcC', 'hvcC', 'av1C'):
+                stream['pix_fmt'] = _pix_fmt(stream['codec_name'], bytes(buf[child_start:child_end]))
+            elif box_type == 'vpcC' and child_end - child_start >= 7:
+                # FullBox: version/flags, profile, level, then bitDepth(4) chromaSubsampling(3) fullRange(1)
+                packed = buf[child_start + 6]
+                stream['pix_fmt'] = _pixel_format(_VPCC_CHROMA.get((packed >> 1) & 0x7), packed >> 4)
+        if width and height:
+            stream.update(_aspect(width, height, int(width * sar.numerator), int(height * sar.denominator)))
+        stts = _child(buf, start, end, 'mdia', 'minf', 'stbl', 'stts')
+        if stts is not None and timescale:
+            entries, = struct.unpack_from('>I', buf, stts[0] + 4)
+            counts: List[Tuple[int, int]] = [struct.unpack_from('>II', buf, stts[0] + 8 + 8 * i)
+                                             for i in range(entries)]
+            frames = sum(count for count, _ in counts)
+            ticks = sum(count * delta for count, delta in counts)
+            if frames and ticks:
+                stream['nb_frames'] = str(frames)
+                stream['avg_frame_rate'] = _rate(Fraction(frames * timescale, ticks))
+                common = max(counts, key=lambda entry: entry[0])[1]
+                if common:
+                    stream['r_frame_rate'] = _rate(Fraction(timescale, common))
+    elif kind == 'audio':
+        version, = struct.unpack_from('>H', buf, entry_start + 16)
+        if version == 2:
+            sample_rate, channels = struct.unpack_from('>dI', buf, entry_start + 40)
+        else:
+            channels, = struct.unpack_from('>H', buf, entry_start + 24)
+            sample_rate = struct.unpack_from('>I', buf, entry_start + 32)[0] >> 16
+        stream.update(channels=channels, sample_rate=str(int(sample_rate)))
+    return stream
@@ -0,0 +1,164 @@
+"""
+Persistent cache of ffprobe results.
+
+    cache = get_probe_cache()
+    value = cache.get(path, 'media')             # None on a miss
+    if value is None:
+        value = run_ffprobe(...)
+        cache.put(path, 'media', value)
+
+Entries are keyed by canonical path and result kind, and are only returned while the file's size and mtime still
+match what they were when the result was stored — a re-encoded or replaced file is probed again automatically.
+The cache is an SQLite file next to presets/, shared by the GUI and any number of command-line runs; if it cannot
+be opened or written, probing simply goes uncached.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config import PROBE_CACHE_FILE, PROBE_CACHE_MAX_ENTRIES
+from models.file_models import canonical_path
+
+
+class ProbeCache:
+    """SQLite-backed probe result cache with hit/miss counters (thread-safe)"""
+
+    # Bump when the shape of stored results changes; older caches are dropped on open
+    SCHEMA_VERSION = 2
+
+    def __init__(self, path: str = PROBE_CACHE_FILE, max_entries: int = PROBE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._failed = False
+
+    # ------------------------------------------------------------------
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open lazily; a cache that cannot be opened is disabled for the rest of the process"""
+        if self._db is not None or self._failed:
+            return self._db
+        try:
+            db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = db.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            if row is None or row[0] != str(self.SCHEMA_VERSION):
+                db.execute("DROP TABLE IF EXISTS probes")
+                db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema', ?)",
+                           (str(self.SCHEMA_VERSION),))
+            db.execute("CREATE TABLE IF NOT EXISTS probes ("
+                       " path TEXT NOT NULL, kind TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+                       " result TEXT NOT NULL, stored REAL NOT NULL, PRIMARY KEY (path, kind))")
+            self._db = db
+            self._prune()
+        except sqlite3.Error:
+            self._failed = True
+            self._db = None
+        return self._db
+
+    def _prune(self):
+        """Keep the file bounded: drop the oldest entries (mostly files long gone) past max_entries"""
+        count = self._db.execute("SELECT COUNT(*) FROM probes").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute("DELETE FROM probes WHERE rowid IN "
+                             "(SELECT rowid FROM probes ORDER BY stored LIMIT ?)", (excess,))
+
+    @staticmethod
+    def _identity(filepath: str) -> Optional[Tuple[str, int, int]]:
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        return canonical_path(filepath), st.st_size, st.st_mtime_ns
+
+    # ------------------------------------------------------------------
+    def get(self, filepath: str, kind: str) -> Optional[Any]:
+        """The stored result, or None if absent or the file changed since it was stored"""
+        identity = self._identity(filepath)
+        with self._lock:
+            db = self._connect()
+            row = None
+            if db is not None and identity is not None:
+                try:
+                    row = db.execute("SELECT size, mtime_ns, result FROM probes WHERE path = ? AND kind = ?",
+                                     (identity[0], kind)).fetchone()
+                except sqlite3.Error:
+                    row = None
+            if row is None or (row[0], row[1]) != identity[1:]:
+                self.misses += 1
+                return None
+            try:
+                value = json.loads(row[2])
+            except ValueError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return value
+
+    def put(self, filepath: str, kind: str, value: Any):
+        """Store a result for the file as it is now (None results are not cached)"""
+        if value is None:
+            return
+        identity = self._identity(filepath)
+        if identity is None:
+            return
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                db.execute("INSERT OR REPLACE INTO probes (path, kind, size, mtime_ns, result, stored) "
+                           "VALUES (?, ?, ?, ?, ?, ?)",
+                           (identity[0], kind, identity[1], identity[2], json.dumps(value), time.time()))
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        with self._lock:
+            db = self._connect()
+            if db is not None:
+                try:
+                    db.execute("DELETE FROM probes")
+                except sqlite3.Error:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters since this process started"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                    'enabled': not self._failed}
+
+    def describe(self) -> str:
+        stats = self.stats()
+        if not stats['enabled']:
+            return "Probe cache: unavailable"
+        return f"Probe cache: {stats['hits']} hits, {stats['misses']} misses"
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache: Optional[ProbeCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_probe_cache() -> ProbeCache:
+    """The process-wide cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ProbeCache()
+        return _cache
@@ -0,0 +1,119 @@
+"""
+Background probing of queued files.
+
+    pool = ProbePool(on_probed=lambda file: ...)     # called on a pool thread once a file's fields are filled
+    pool.submit(files)                               # returns at once; files already probed are skipped
+    pool.set_limit(PROBE_WORKERS_WHILE_ENCODING)     # while an encode runs
+    pool.discard(removed_files)
+
+Files used to be probed one by one right before their encode, so ffprobe latency sat on the critical path and the
+queue showed nothing but name and size until a file was reached. The pool probes them as they are queued, oldest
+first, with at most `limit` ffprobe processes at a time; the runner only probes a file itself if it gets there first.
+"""
+import threading
+from collections import deque
+from typing import Callable, Deque, Iterable, List, Optional
+
+from config import PROBE_WORKERS
+from models.file_models import VideoFile
+from utils.ffmpeg_utils import probe_media
+
+
+class ProbePool:
+    """A fixed set of daemon threads probing VideoFiles in submission order (thread-safe)"""
+
+    def __init__(self, workers: int = PROBE_WORKERS,
+                 on_probed: Optional[Callable[[VideoFile], None]] = None):
+        self.workers = max(1, int(workers))
+        self.on_probed = on_probed
+        self._limit = self.workers
+        self._pending: Deque[VideoFile] = deque()
+        self._queued = set()            # id() of the files pending or being probed
+        self._active = 0
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def submit(self, files: Iterable[VideoFile]) -> int:
+        """Queue files for probing; returns how many were queued (already probed or queued ones are skipped)"""
+        added = 0
+        with self._cond:
+            if self._closed:
+                return 0
+            for file in files:
+                if file.probed or id(file) in self._queued:
+                    continue
+                self._pending.append(file)
+                self._queued.add(id(file))
+                added += 1
+            if added:
+                self._start_threads()
+                self._cond.notify_all()
+        return added
+
+    def discard(self, files: Optional[Iterable[VideoFile]] = None):
+        """Drop files (all, if None) that have not been picked up yet; a probe already running finishes"""
+        with self._cond:
+            if files is None:
+                self._queued -= {id(f) for f in self._pending}
+                self._pending.clear()
+                return
+            dropped = {id(file) for file in files}
+            kept = deque(f for f in self._pending if id(f) not in dropped)
+            if len(kept) != len(self._pending):
+                self._queued -= {id(f) for f in self._pending} - {id(f) for f in kept}
+                self._pending = kept
+
+    def set_limit(self, limit: int):
+        """How many probes may run at once (1..workers); takes effect as running probes finish"""
+        with self._cond:
+            self._limit = max(1, min(self.workers, int(limit)))
+            self._cond.notify_all()
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending) + self._active
+
+    def close(self):
+        """Stop picking up new files (threads exit after their current probe)"""
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._queued.clear()
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    def _start_threads(self):
+        # Called with the lock held. Threads are started on first use, never more than `workers`.
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < min(self.workers, len(self._pending) + self._active):
+            thread = threading.Thread(target=self._work, name=f"probe-{len(self._threads) + 1}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next(self) -> Optional[VideoFile]:
+        with self._cond:
+            while not self._closed and (not self._pending or self._active >= self._limit):
+                self._cond.wait()
+            if self._closed:
+                return None
+            file = self._pending.popleft()
+            self._active += 1
+            return file
+
+    def _work(self):
+        while True:
+            file = self._next()
+            if file is None:
+                return
+            try:
+                # The runner may have reached the file in the meantime and probed it itself
+                if not file.probed and file.apply_probe(probe_media(file.filepath)) and self.on_probed:
+                    self.on_probed(file)
+            except Exception:
+                pass    # an unreadable file is simply left unprobed; the runner reports it when it gets there
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._queued.discard(id(file))
+                    self._cond.notify_all()
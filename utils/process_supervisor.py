@@ -0,0 +1,351 @@
+"""
+One event loop supervising every running FFmpeg child.
+
+    supervisor = ProcessSupervisor()
+    watch = supervisor.watch(process, on_line, stall_timeout=STALL_TIMEOUT, exit_timeout=EXIT_TIMEOUT)
+    watch.headway(timeout)          # from on_line: the child advanced; it is STUCK if it then does not for timeout s
+    outcome = watch.wait()          # blocks the calling thread; one of EXITED/STOPPED/STALLED/STUCK/WEDGED
+    supervisor.pause() / resume()   # stall clocks stand still while the children are suspended
+    supervisor.stop()               # every watch (also any started later) ends as STOPPED at once
+    supervisor.close()
+
+Each encode used to get a reader thread for its stdout plus a watchdog loop on the calling thread that woke every
+0.2 s to look at the stop flag and the stall clock, and a 0.25 s poll for the exit once stdout closed. A Stop could
+take a fifth of a second to be noticed per step, and forty chunks cost eighty threads. Here one asyncio loop on a
+daemon thread reads the output of all children as it becomes readable, the stall and exit deadlines are loop
+timers, and stop/pause are calls into the loop that take effect immediately. On Linux a child's exit is observed
+through a pidfd, so nothing polls; elsewhere the exit wait runs on the loop's executor.
+
+Windows pipes cannot be watched by a selector, so there each child's stdout is read by a small thread that hands
+the data to the loop; deadlines, stop and pause still work the same way.
+"""
+import asyncio
+import codecs
+import os
+import re
+import subprocess
+import threading
+import time
+from typing import Callable, Optional, Set
+
+EXITED = 'exited'       # the child closed its output and exited; see Watch.returncode
+STOPPED = 'stopped'     # supervisor.stop() was called
+STALLED = 'stalled'     # no output for stall_timeout seconds
+STUCK = 'stuck'         # output, but no headway reported for the headway timeout
+WEDGED = 'wedged'       # output closed, but the child did not exit within exit_timeout seconds
+
+_NEWLINES = re.compile(r'\r\n|\r|\n')
+_READ_SIZE = 64 * 1024
+
+
+class Watch:
+    """One supervised child: its line callback, its deadlines and, once done, its outcome"""
+
+    def __init__(self, supervisor: 'ProcessSupervisor', process: subprocess.Popen,
+                 on_line: Callable[[str], None], stall_timeout: float, exit_timeout: float,
+                 headway_timeout: float = 0):
+        self.process = process
+        self.returncode: Optional[int] = None
+        self.outcome: Optional[str] = None
+        self._supervisor = supervisor
+        self._on_line = on_line
+        self._stall_timeout = stall_timeout
+        self._exit_timeout = exit_timeout
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._pending = ''
+        self._last_output = time.monotonic()
+        self._last_headway = self._last_output
+        self._headway_timeout: Optional[float] = headway_timeout or None
+        self._stall_timer: Optional[asyncio.TimerHandle] = None
+        self._exit_timer: Optional[asyncio.TimerHandle] = None
+        self._fd: Optional[int] = None            # stdout, while the loop is reading it
+        self._pidfd: Optional[int] = None
+        self._done = threading.Event()
+
+    def wait(self) -> str:
+        """Block until the watch is over; returns its outcome"""
+        self._done.wait()
+        return self.outcome
+
+    # Everything below runs on the loop thread
+    # ------------------------------------------------------------------
+    def headway(self, timeout: Optional[float] = None):
+        """
+        Called from on_line when the child made real progress. From then on it must make more within the headway
+        timeout (`timeout`, if given, replaces it) or the watch ends as STUCK, however much it keeps printing.
+        """
+        self._last_headway = time.monotonic()
+        if timeout is not None and timeout != self._headway_timeout:
+            self._headway_timeout = timeout
+            if not self._supervisor._paused and self._exit_timer is None:   # the armed deadline may be too late
+                self._cancel_stall()
+                self._arm_stall()
+
+    def _feed(self, data: bytes):
+        if self.outcome:
+            return
+        self._last_output = time.monotonic()
+        text = self._pending + self._decoder.decode(data)
+        lines = _NEWLINES.split(text)
+        self._pending = lines.pop()
+        for line in lines:
+            self._line(line)
+
+    def _line(self, line: str):
+        try:
+            self._on_line(line)
+        except Exception:
+            pass            # one line the caller could not handle must not stop the reading
+
+    def _output_closed(self):
+        if self.outcome:
+            return
+        tail = self._pending + self._decoder.decode(b'', final=True)
+        self._pending = ''
+        if tail:
+            self._line(tail)
+        self._cancel_stall()
+        loop = self._supervisor._loop
+        self._exit_timer = loop.call_later(self._exit_timeout, self._finish, WEDGED)
+        if self._supervisor._watch_exit(self):
+            return
+        # No pidfd: wait for the exit on the executor; the exit timer still bounds it
+        future = loop.run_in_executor(None, self.process.wait)
+        future.add_done_callback(lambda _: self._exited())
+
+    def _exited(self):
+        if not self.outcome:
+            self.returncode = self.process.poll()
+            self._finish(EXITED)
+
+    def _arm_stall(self):
+        if self.outcome:
+            return
+        deadlines = []
+        if self._stall_timeout:
+            deadlines.append(self._last_output + self._stall_timeout)
+        if self._headway_timeout:
+            deadlines.append(self._last_headway + self._headway_timeout)
+        if deadlines:
+            delay = max(0.0, min(deadlines) - time.monotonic())
+            self._stall_timer = self._supervisor._loop.call_later(delay, self._check_stall)
+
+    def _check_stall(self):
+        self._stall_timer = None
+        now = time.monotonic()
+        if self._stall_timeout and now - self._last_output >= self._stall_timeout:
+            self._finish(STALLED)
+        elif self._headway_timeout and now - self._last_headway >= self._headway_timeout:
+            self._finish(STUCK)
+        else:
+            self._arm_stall()       # output or headway arrived since the timer was set
+
+    def _cancel_stall(self):
+        if self._stall_timer is not None:
+            self._stall_timer.cancel()
+            self._stall_timer = None
+
+    def _finish(self, outcome: str):
+        if self.outcome:
+            return
+        self.outcome = outcome
+        self._cancel_stall()
+        if self._exit_timer is not None:
+            self._exit_timer.cancel()
+        self._supervisor._forget(self)
+        self._done.set()
+
+
+class ProcessSupervisor:
+    """An asyncio loop on a daemon thread that watches any number of children (started on first use)"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._watches: Set[Watch] = set()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._paused = False
+
+    def watch(self, process: subprocess.Popen, on_line: Callable[[str], None],
+              stall_timeout: float = 0, exit_timeout: float = 60, headway_timeout: float = 0) -> Watch:
+        """
+        Supervise a child started with stdout=PIPE (binary). on_line gets each decoded line on the loop thread and
+        must not block, and may call watch.headway(); stall_timeout 0 disables the stall deadline, headway_timeout
+        0 the headway deadline until on_line sets one.
+        """
+        watch = Watch(self, process, on_line, stall_timeout, exit_timeout, headway_timeout)
+        with self._lock:
+            stopped = self._stopped
+            if not stopped:
+                loop = self._ensure_loop()
+                self._watches.add(watch)
+        if stopped:
+            watch._finish(STOPPED)
+        else:
+            loop.call_soon_threadsafe(self._start, watch)
+        return watch
+
+    def stop(self):
+        """End every watch as STOPPED now; watches started afterwards end at once (killing is the caller's job)"""
+        with self._lock:
+            self._stopped = True
+        self._call(self._finish_all, STOPPED)
+
+    def pause(self):
+        """The children were suspended: hold every stall and headway clock"""
+        self._call(self._set_paused, True)
+
+    def resume(self):
+        self._call(self._set_paused, False)
+
+    def close(self):
+        """Stop the loop thread (any watch still open ends as STOPPED)"""
+        with self._lock:
+            self._stopped = True
+            loop, thread = self._loop, self._thread
+        if loop is not None:
+            loop.call_soon_threadsafe(self._finish_all, STOPPED)
+            loop.call_soon_threadsafe(loop.stop)
+            if thread is not threading.current_thread():
+                thread.join(timeout=5)
+        with self._lock:
+            self._loop = self._thread = None
+
+    # ------------------------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            # A selector loop everywhere: its add_reader is what the pipes are watched with
+            self._loop = asyncio.SelectorEventLoop()
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run_loop, args=(self._loop, ready),
+                                            name="supervisor", daemon=True)
+            self._thread.start()
+            ready.wait()
+        return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def _call(self, callback, *args):
+        with self._lock:
+            loop = self._loop
+        try:
+            if loop is not None:
+                loop.call_soon_threadsafe(callback, *args)
+                return
+        except RuntimeError:
+            pass            # closed meanwhile
+        callback(*args)
+
+    def _start(self, watch: Watch):
+        if watch.outcome:
+            return
+        stdout = watch.process.stdout
+        if os.name == 'nt':
+            threading.Thread(target=self._read_blocking, args=(watch, stdout), name="ffmpeg-reader",
+                             daemon=True).start()
+        else:
+            watch._fd = stdout.fileno()
+            os.set_blocking(watch._fd, False)
+            self._loop.add_reader(watch._fd, self._readable, watch, watch._fd)
+        if not self._paused:
+            watch._arm_stall()
+
+    def _readable(self, watch: Watch, fd: int):
+        try:
+            data = os.read(fd, _READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if data:
+            watch._feed(data)
+        else:
+            self._loop.remove_reader(fd)
+            watch._fd = None
+            watch._output_closed()
+
+    def _read_blocking(self, watch: Watch, stdout):
+        """Windows: read on this thread, interpret on the loop"""
+        loop = self._loop
+        try:
+            while True:
+                data = stdout.read1(_READ_SIZE) if hasattr(stdout, 'read1') else stdout.read(_READ_SIZE)
+                if not data:
+                    break
+                loop.call_soon_threadsafe(watch._feed, data)
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                loop.call_soon_threadsafe(watch._output_closed)
+            except RuntimeError:
+                pass        # loop already closed
+
+    def _watch_exit(self, watch: Watch) -> bool:
+        """Linux: have the loop report the child's exit through a pidfd; False where that is not available"""
+        if not hasattr(os, 'pidfd_open'):
+            return False
+        try:
+            watch._pidfd = os.pidfd_open(watch.process.pid)
+        except OSError:
+            return False
+        if watch.process.poll() is not None:
+            self._close_pidfd(watch)
+            watch._exited()
+            return True
+        self._loop.add_reader(watch._pidfd, self._pidfd_ready, watch)
+        return True
+
+    def _pidfd_ready(self, watch: Watch):
+        self._close_pidfd(watch)
+        watch.process.wait()
+        watch._exited()
+
+    def _close_pidfd(self, watch: Watch):
+        if watch._pidfd is not None:
+            try:
+                self._loop.remove_reader(watch._pidfd)
+            except (ValueError, RuntimeError):
+                pass
+            os.close(watch._pidfd)
+            watch._pidfd = None
+
+    def _forget(self, watch: Watch):
+        """A watch is over: stop listening to it (loop thread, or the caller of watch() when never started)"""
+        if watch._fd is not None:
+            try:
+                self._loop.remove_reader(watch._fd)
+            except (ValueError, RuntimeError, AttributeError):
+                pass
+            watch._fd = None
+        if watch._pidfd is not None:
+            self._close_pidfd(watch)
+        with self._lock:
+            self._watches.discard(watch)
+
+    def _finish_all(self, outcome: str):
+        with self._lock:
+            watches = list(self._watches)
+        for watch in watches:
+            watch._finish(outcome)
+
+    def _set_paused(self, paused: bool):
+        self._paused = paused
+        with self._lock:
+            watches = list(self._watches)
+        for watch in watches:
+            if paused:
+                watch._cancel_stall()
+            elif watch._exit_timer is None:
+                watch._cancel_stall()
+                # a suspended encoder was neither a stalled nor a stuck one
+                watch._last_output = watch._last_headway = time.monotonic()
+                watch._arm_stall()
@@ -0,0 +1,159 @@
+"""
+Crash-safe journal of the current run.
+
+    journal = RunJournal()
+    journal.begin(files, settings)           # run started: queue and settings (resume=True: and what was done)
+    journal.record_delta(delta)              # the queue was edited while running
+    journal.record_state(file, 'success')    # a file started or finished (fsynced)
+    journal.close(complete=True)             # nothing left to resume: the journal is removed
+
+    state = RunJournal.load()                # at startup: None, or what the interrupted run left behind
+
+A reboot in the middle of a batch used to lose the queue and every file's state, so the next run started from
+zero. The journal is an append-only JSON-lines file next to the probe cache: the queue once, then one line per
+queue edit and per state change. A state change is fsynced before the GUI moves on, so a finished output is never
+forgotten; a torn last line (power cut mid-write) is ignored on load. Files are identified by canonical path, so
+states survive edits that shifted their rows.
+"""
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from config import RUN_JOURNAL_FILE
+from models.file_models import FINISHED_STATES, QueueDelta, VideoFile
+
+
+class JournalState:
+    """What an interrupted run left behind: its settings and queue, and the last state of each file"""
+
+    def __init__(self, settings: Dict[str, Any], paths: List[str], keys: List[str],
+                 states: Dict[str, str], started: float):
+        self.settings = settings
+        self.paths = paths
+        self.keys = keys
+        self.states = states            # canonical path -> 'running' | 'success' | 'failed' | 'skipped'
+        self.started = started
+
+    @property
+    def finished_count(self) -> int:
+        return sum(1 for key in self.keys if self.states.get(key) in FINISHED_STATES)
+
+    @property
+    def unfinished_count(self) -> int:
+        return len(self.keys) - self.finished_count
+
+
+class RunJournal:
+    """Append-only JSON-lines journal of one run (GUI thread only)"""
+
+    VERSION = 1
+
+    def __init__(self, path: str = RUN_JOURNAL_FILE):
+        self.path = path
+        self._file = None
+
+    def begin(self, files: List[VideoFile], settings: Dict[str, Any], resume: bool = False):
+        """
+        Start a new journal (replacing any old one) with the run's queue and settings; raises OSError. A resumed
+        run carries over the files the interrupted one finished, or a second crash would lose them.
+        """
+        self.close(complete=False)
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._write({'t': 'run', 'v': self.VERSION, 'started': time.time(), 'settings': settings})
+        self._write({'t': 'queue', 'paths': [f.filepath for f in files], 'keys': [f.canonical for f in files]})
+        for file in files if resume else ():
+            if file.status in FINISHED_STATES:
+                self._write({'t': 'state', 'key': file.canonical, 'state': file.status})
+        self._sync()
+
+    def record_delta(self, delta: QueueDelta):
+        """A queue edit (flushed, not fsynced: states are what must survive, and they carry their own path)"""
+        entry = {'t': 'delta', 'kind': delta.kind}
+        if delta.kind in (QueueDelta.INSERT, QueueDelta.RESET):
+            entry.update(first=delta.first, paths=[f.filepath for f in delta.files],
+                         keys=[f.canonical for f in delta.files])
+        else:
+            entry.update(indices=delta.indices, to=delta.to_index)
+        self._write(entry)
+
+    def record_state(self, file: VideoFile, state: str):
+        self._write({'t': 'state', 'key': file.canonical, 'state': state}, sync=True)
+
+    def close(self, complete: bool):
+        """Stop writing; a complete run has nothing to resume, so its journal is removed"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        if complete:
+            self.discard(self.path)
+
+    @staticmethod
+    def discard(path: str = RUN_JOURNAL_FILE):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _sync(self):
+        if self._file is None:
+            return
+        try:
+            os.fsync(self._file.fileno())
+        except (OSError, ValueError):
+            self._file = None
+
+    def _write(self, entry: Dict[str, Any], sync: bool = False):
+        if self._file is None:
+            return
+        try:
+            self._file.write(json.dumps(entry, separators=(',', ':'), default=str) + '\n')
+            self._file.flush()
+        except (OSError, ValueError):
+            self._file = None       # disk full or gone: the run goes on unjournaled
+            return
+        if sync:
+            self._sync()
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def load(path: str = RUN_JOURNAL_FILE) -> Optional[JournalState]:
+        """Replay a journal left by an interrupted run; None if there is none or it holds no queue"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except (OSError, UnicodeDecodeError):
+            return None
+        try:
+            # One parse for the whole file; line by line only when a line is torn
+            entries = json.loads('[' + ','.join(line for line in lines if line.strip()) + ']')
+        except ValueError:
+            entries = []
+            for line in lines:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue            # torn write
+        settings, started = None, 0.0
+        items: List[tuple] = []         # (path, key) in queue order
+        states: Dict[str, str] = {}
+        for entry in entries:
+            kind = entry.get('t')
+            if kind == 'run':
+                if entry.get('v') != RunJournal.VERSION:
+                    return None
+                settings, started = entry.get('settings') or {}, entry.get('started') or 0.0
+            elif kind == 'queue':
+                items = list(zip(entry['paths'], entry['keys']))
+            elif kind == 'delta':
+                files = list(zip(entry.get('paths', ()), entry.get('keys', ())))
+                QueueDelta(entry['kind'], first=entry.get('first', 0), files=files,
+                           indices=entry.get('indices', ()), to_index=entry.get('to', 0)).apply(items)
+            elif kind == 'state':
+                states[entry['key']] = entry['state']
+        if settings is None or not items:
+            return None
+        return JournalState(settings, [p for p, _ in items], [k for _, k in items], states, started)
@@ -0,0 +1,3 @@
+@echo off
+rem Headless batch runner: videer-cli [-p preset.json] [--set key=value] files/folders...
+python "%~dp0cli.py" %*